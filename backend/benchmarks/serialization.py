@@ -0,0 +1,135 @@
+"""Per-row serialization cost of the listing endpoints, before and after the fast path.
+
+"before" is what the routes used to do: validate each row into its model, then let
+FastAPI re-validate it against response_model and encode it with jsonable_encoder and
+JSONResponse. "after" is what they do now (see modules/responses.py). Both outputs are
+decoded and compared, so a difference in the JSON fails the run.
+
+Run from backend/:  python -m benchmarks.serialization [--rows 100] [--repeat 50]
+(or as a script:     python benchmarks/serialization.py ...)
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+from uuid import uuid4
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+# backend/ is not on sys.path when this file is run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.bookings.models import BookingResponse, booking_payload
+from modules.bookings.repository import BookingRecord
+from modules.providers.models import ProviderInDB
+from modules.users.models import UserInDB
+from modules.responses import model_response, payload_response
+
+
+def _timestamps(count: int) -> List[str]:
+    start = datetime(2025, 1, 1, 8, 0, 0, 123456)
+    return [str(start + timedelta(minutes=i)) for i in range(count)]
+
+
+def booking_records(count: int) -> List[BookingRecord]:
+    return [
+        BookingRecord(
+            str(uuid4()), str(uuid4()), str(uuid4()), "2025-06-02", "10:00", 60, "Cape Town",
+            "Leaking kitchen tap", "pending", [f"/uploads/{i:04d}.jpg"] * (i % 3), stamp, stamp,
+            "customer@example.com", "provider@example.com", "Tap Masters"
+        )
+        for i, stamp in enumerate(_timestamps(count))
+    ]
+
+
+def provider_rows(count: int) -> List[dict]:
+    return [
+        {
+            "id": str(uuid4()), "email": f"provider{i}@example.com", "full_name": "Sam Provider",
+            "password": "$2b$12$" + "x" * 53, "phone": "0821234567", "business_name": "Tap Masters",
+            "service_type": "Plumbing", "hourly_rate": 350.0, "location": "Cape Town",
+            "working_hours": "Mon-Fri 08:00-17:00", "rating": 4.5, "reviews_count": 12,
+            "is_verified": 1, "image": "/images/placeholder.jpg", "created_at": stamp,
+            "updated_at": stamp, "is_active": 1, "sa_front_id": None, "sa_back_id": None,
+            "profile_photo": "/uploads/photo.jpg",
+        }
+        for i, stamp in enumerate(_timestamps(count))
+    ]
+
+
+def user_rows(count: int) -> List[dict]:
+    return [
+        {
+            "id": str(uuid4()), "email": f"user{i}@example.com", "full_name": "Alex Customer",
+            "password": "$2b$12$" + "x" * 53, "created_at": stamp, "updated_at": stamp, "is_active": 1,
+        }
+        for i, stamp in enumerate(_timestamps(count))
+    ]
+
+
+_loop = asyncio.new_event_loop()
+
+
+def _fastapi_response(field, content) -> bytes:
+    """The default route path: re-validate against response_model, jsonable_encoder, JSONResponse"""
+    encoded = _loop.run_until_complete(serialize_response(field=field, response_content=content))
+    return JSONResponse(encoded).body
+
+
+def cases(rows: int):
+    bookings = booking_records(rows)
+    providers = provider_rows(rows)
+    users = user_rows(rows)
+    booking_field = create_response_field("Response_bookings", List[BookingResponse])
+    provider_field = create_response_field("Response_providers", List[ProviderInDB])
+    user_field = create_response_field("Response_users", List[UserInDB])
+    return [
+        (
+            "GET /api/me/bookings",
+            lambda: _fastapi_response(booking_field, [BookingResponse.model_validate(r) for r in bookings]),
+            lambda: payload_response([booking_payload(r) for r in bookings]).body,
+        ),
+        (
+            "GET /api/providers/",
+            lambda: _fastapi_response(provider_field, [ProviderInDB(**row) for row in providers]),
+            lambda: model_response(List[ProviderInDB], [ProviderInDB.from_row(row) for row in providers]).body,
+        ),
+        (
+            "GET /api/users/",
+            lambda: _fastapi_response(user_field, [UserInDB(**row) for row in users]),
+            lambda: model_response(List[UserInDB], [UserInDB.from_row(row) for row in users]).body,
+        ),
+    ]
+
+
+def per_row_us(func, rows: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best / rows * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100, help="rows per response (default 100)")
+    parser.add_argument("--repeat", type=int, default=50, help="timed runs per case; the best is kept")
+    args = parser.parse_args()
+
+    print(f"{'endpoint':<22}{'before us/row':>15}{'after us/row':>15}{'speedup':>10}")
+    for name, before, after in cases(args.rows):
+        if json.loads(before()) != json.loads(after()):
+            raise SystemExit(f"{name}: fast path output differs from the validated response")
+        slow = per_row_us(before, args.rows, args.repeat)
+        fast = per_row_us(after, args.rows, args.repeat)
+        print(f"{name:<22}{slow:>15.1f}{fast:>15.1f}{slow / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
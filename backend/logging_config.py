@@ -0,0 +1,79 @@
+import contextvars
+import json
+import logging
+import os
+import random
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Logging configuration
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # "text" (key=value) or "json"
+# Fraction of result rows written at DEBUG level; 0 disables row-level output entirely
+LOG_ROW_SAMPLE_RATE = float(os.getenv("LOG_ROW_SAMPLE_RATE", "0"))
+
+# Correlation ID of the request being handled; set by the middleware in main.py
+request_id_var = contextvars.ContextVar("request_id", default="-")
+
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+def _extra_fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RESERVED}
+
+
+class KeyValueFormatter(logging.Formatter):
+    def format(self, record):
+        line = f"{self.formatTime(record)} {record.levelname} {record.name} request_id={record.request_id} {record.getMessage()}"
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value!r}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": record.request_id,
+            "message": record.getMessage(),
+            **_extra_fields(record),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level=None):
+    """Install the structured handler on the root logger (idempotent)"""
+    root = logging.getLogger()
+    root.setLevel(level or LOG_LEVEL)
+    for handler in root.handlers:
+        if getattr(handler, "_structured", False):
+            return
+    handler = logging.StreamHandler()
+    handler._structured = True
+    handler.addFilter(RequestIdFilter())
+    handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else KeyValueFormatter())
+    root.addHandler(handler)
+
+
+def log_rows(logger, event, rows):
+    """Write a sampled subset of rows at DEBUG level; costs nothing unless DEBUG and sampling are on"""
+    if LOG_ROW_SAMPLE_RATE <= 0 or not logger.isEnabledFor(logging.DEBUG):
+        return
+    for row in rows:
+        if LOG_ROW_SAMPLE_RATE >= 1 or random.random() < LOG_ROW_SAMPLE_RATE:
+            logger.debug(event, extra={"row": row._asdict() if hasattr(row, "_asdict") else dict(row)})
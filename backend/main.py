@@ -1,12 +1,28 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import ORJSONResponse
 from modules.users.routes import router as users_router
 from modules.providers.routes import router as providers_router
 from modules.bookings.routes import router as bookings_router
+from database import pool, pool_stats, db_executor, migrate
+from logging_config import configure_logging, request_id_var
+from modules.cache import cache_stats
+from modules.media.routes import router as media_router
+from modules.bulk.routes import router as bulk_router
+from modules.reviews.routes import router as reviews_router
+from modules.utils import password_pool_stats, shutdown_password_pool
+from modules.media.images import image_pool_stats, shutdown_image_pool
+from uuid import uuid4
+import os
 import uvicorn
 
-app = FastAPI(title="Service Marketplace API")
+configure_logging()
+
+# orjson encodes every JSON response; DB-backed listings skip re-validation too (see modules/responses.py)
+app = FastAPI(title="Service Marketplace API", default_response_class=ORJSONResponse)
+
+# Apply pending schema migrations on startup (disable to run them via `python manage.py migrate`)
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "true").lower() in ("1", "true", "yes")
 
 # Configure CORS
 app.add_middleware(
@@ -15,19 +31,62 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Request-ID"],
 )
 
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    """Tag every log line of a request with a correlation ID (reuses an incoming X-Request-ID)"""
+    request_id = request.headers.get("X-Request-ID") or uuid4().hex
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
 # Include routers
 app.include_router(users_router, prefix="/api/users", tags=["users"])
 app.include_router(providers_router, prefix="/api/providers", tags=["providers"])
 app.include_router(bookings_router)
-
-app.mount("/uploaded_images", StaticFiles(directory="uploaded_images"), name="uploaded_images")
+app.include_router(media_router)
+app.include_router(bulk_router)
+app.include_router(reviews_router)
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to Service Marketplace API"} 
 
+@app.get("/health")
+async def health():
+    """Liveness probe plus database pool and cache statistics"""
+    return {
+        "status": "ok",
+        "database": {"pool": pool_stats()},
+        "caches": cache_stats(),
+        "password_pool": password_pool_stats(),
+        "image_pool": image_pool_stats(),
+    }
+
+@app.on_event("startup")
+def apply_migrations():
+    if AUTO_MIGRATE:
+        migrate()
+
+@app.on_event("shutdown")
+def close_database_pool():
+    db_executor.shutdown(wait=True)
+    pool.close()
+
+@app.on_event("shutdown")
+def close_password_pool():
+    shutdown_password_pool()
+
+@app.on_event("shutdown")
+def close_image_pool():
+    shutdown_image_pool()
+
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
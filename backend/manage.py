@@ -0,0 +1,175 @@
+"""Command line entry point for maintenance tasks.
+
+    python manage.py migrate [--target VERSION]
+    python manage.py showmigrations
+    python manage.py gc-uploads [--grace SECONDS] [--dry-run]
+    python manage.py generate-variants
+    python manage.py rebuild-search
+    python manage.py rebuild-ratings
+    python manage.py verify-stats
+    python manage.py rebuild-stats
+    python manage.py import-data {users,providers,bookings} PATH [--format csv|ndjson] [--batch-size N]
+    python manage.py export-data {users,providers,bookings} [--output PATH] [--format csv|ndjson] [--password-hashes]
+"""
+import argparse
+import json
+import sys
+
+from logging_config import configure_logging
+from database import applied_migrations, backend, discover_migrations, migrate, get_db_connection, transaction
+from modules.media.storage import UPLOAD_GC_GRACE_SECONDS, collect_garbage
+from modules.media.images import VARIANT_FORMATS, backfill_variants
+from modules.reviews.ratings import rebuild_ratings
+from modules.bookings.stats import rebuild_stats, verify_stats
+from modules.bulk.service import ENTITIES, FORMATS, IMPORT_BATCH_SIZE, detect_format, export_records, import_records
+
+
+def cmd_migrate(args):
+    applied = migrate(target=args.target)
+    if applied:
+        print(f"Applied migrations: {', '.join(f'{v:04d}' for v in applied)}")
+    else:
+        print("No migrations to apply")
+
+
+def cmd_showmigrations(args):
+    applied = applied_migrations()
+    for version, name, _ in discover_migrations():
+        mark = "X" if version in applied else " "
+        print(f"[{mark}] {version:04d}_{name}")
+
+
+def cmd_gc_uploads(args):
+    stats = collect_garbage(grace_seconds=args.grace, dry_run=args.dry_run)
+    verb = "Would remove" if args.dry_run else "Removed"
+    print(
+        f"Scanned {stats['scanned']} stored files ({stats['referenced']} referenced). "
+        f"{verb} {stats['removed']} orphans ({stats['bytes_freed']} bytes) and {stats['temp_removed']} stale temp files"
+    )
+
+
+def cmd_generate_variants(args):
+    if not VARIANT_FORMATS:
+        print("Pillow with WebP support is not installed; nothing to do")
+        return
+    stats = backfill_variants()
+    print(f"Checked {stats['images']} images: wrote {stats['written']} derivatives, {stats['failed']} failed")
+
+
+def cmd_rebuild_search(args):
+    if backend.name == "postgresql":
+        # search_vector is a generated column and the geo index an expression index: neither can drift
+        print("Nothing to rebuild: PostgreSQL maintains the provider search and geo indexes itself")
+        return
+    with get_db_connection() as conn:
+        conn.execute("INSERT INTO providers_fts (providers_fts) VALUES ('rebuild')")
+        conn.execute("DELETE FROM providers_geo")
+        conn.execute(
+            "INSERT INTO providers_geo SELECT rowid, latitude, latitude, longitude, longitude "
+            "FROM providers WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+        )
+        count = conn.execute("SELECT COUNT(*) FROM providers").fetchone()[0]
+    print(f"Rebuilt the provider search and geo indexes ({count} providers)")
+
+
+def cmd_rebuild_ratings(args):
+    with transaction() as conn:
+        drifted = rebuild_ratings(conn)
+        count = conn.execute("SELECT COUNT(*) FROM providers").fetchone()[0]
+    print(f"Recomputed the rating aggregates of {count} providers ({drifted} were out of date)")
+
+
+def cmd_verify_stats(args):
+    with get_db_connection() as conn:
+        differences, sample = verify_stats(conn)
+    if not differences:
+        print("Provider booking stats match the bookings table")
+        return 0
+    print(f"{differences} provider booking stats rows differ from the bookings table (run rebuild-stats):")
+    for provider_id, month, status, bookings, minutes, source in sample:
+        print(f"  {source:<8} {provider_id} {month or '-':<7} {status:<9} bookings={bookings} minutes={minutes}")
+    return 1
+
+
+def cmd_rebuild_stats(args):
+    with transaction() as conn:
+        rows = rebuild_stats(conn)
+    print(f"Rebuilt the provider booking stats ({rows} rows)")
+
+
+def cmd_import_data(args):
+    with open(args.path, "rb") as f:
+        report = import_records(args.entity, f, detect_format(args.path, args.format), args.batch_size)
+    print(f"Read {report['received']} rows: imported {report['inserted']}, {report['failed']} failed")
+    for error in report["errors"]:
+        print(json.dumps(error))
+    if report["errors_truncated"]:
+        print(f"({report['failed'] - len(report['errors'])} more errors not shown)")
+
+
+def cmd_export_data(args):
+    fmt = detect_format(args.output, args.format)
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        for chunk in export_records(args.entity, fmt, args.include_password_hashes):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Service Marketplace maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Apply pending schema migrations")
+    migrate_parser.add_argument("--target", type=int, default=None, help="Stop after this migration version")
+    migrate_parser.set_defaults(func=cmd_migrate)
+
+    show_parser = subparsers.add_parser("showmigrations", help="List migrations and whether they are applied")
+    show_parser.set_defaults(func=cmd_showmigrations)
+
+    gc_parser = subparsers.add_parser("gc-uploads", help="Delete stored uploads no provider or booking references")
+    gc_parser.add_argument("--grace", type=int, default=UPLOAD_GC_GRACE_SECONDS, help="Keep unreferenced files younger than this many seconds")
+    gc_parser.add_argument("--dry-run", action="store_true", help="Report what would be removed without deleting")
+    gc_parser.set_defaults(func=cmd_gc_uploads)
+
+    variants_parser = subparsers.add_parser("generate-variants", help="Create missing thumbnails/WebP copies of stored images")
+    variants_parser.set_defaults(func=cmd_generate_variants)
+
+    search_parser = subparsers.add_parser("rebuild-search", help="Rebuild the provider full-text and geo indexes (run after VACUUM)")
+    search_parser.set_defaults(func=cmd_rebuild_search)
+
+    ratings_parser = subparsers.add_parser("rebuild-ratings", help="Recompute provider rating aggregates from the reviews table")
+    ratings_parser.set_defaults(func=cmd_rebuild_ratings)
+
+    verify_stats_parser = subparsers.add_parser("verify-stats", help="Compare the provider booking stats with the bookings table")
+    verify_stats_parser.set_defaults(func=cmd_verify_stats)
+
+    rebuild_stats_parser = subparsers.add_parser("rebuild-stats", help="Recompute the provider booking stats from the bookings table")
+    rebuild_stats_parser.set_defaults(func=cmd_rebuild_stats)
+
+    import_parser = subparsers.add_parser("import-data", help="Bulk import users, providers or bookings from CSV/NDJSON")
+    import_parser.add_argument("entity", choices=sorted(ENTITIES))
+    import_parser.add_argument("path", help="File to import (.csv or .ndjson)")
+    import_parser.add_argument("--format", choices=FORMATS, default=None, help="Override the format implied by the extension")
+    import_parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="Rows per transaction")
+    import_parser.set_defaults(func=cmd_import_data)
+
+    export_parser = subparsers.add_parser("export-data", help="Export users, providers or bookings as CSV/NDJSON")
+    export_parser.add_argument("entity", choices=sorted(ENTITIES))
+    export_parser.add_argument("--output", default=None, help="File to write (default: stdout)")
+    export_parser.add_argument("--format", choices=FORMATS, default=None, help="Override the format implied by the extension")
+    export_parser.add_argument(
+        "--password-hashes", dest="include_password_hashes", action="store_true",
+        help="Include bcrypt hashes so users/providers can be re-imported (left out by default)"
+    )
+    export_parser.set_defaults(func=cmd_export_data)
+
+    args = parser.parse_args(argv)
+    configure_logging()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
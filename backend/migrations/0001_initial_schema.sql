@@ -1,4 +1,6 @@
--- Users table
+-- Baseline schema. Matches the tables previously created by init_db(),
+-- plus the provider document columns the services already read and write.
+
 CREATE TABLE IF NOT EXISTS users (
     id TEXT PRIMARY KEY,
     email TEXT UNIQUE NOT NULL,
@@ -9,7 +11,6 @@ CREATE TABLE IF NOT EXISTS users (
     is_active BOOLEAN DEFAULT 1
 );
 
--- Providers table
 CREATE TABLE IF NOT EXISTS providers (
     id TEXT PRIMARY KEY,
     email TEXT UNIQUE NOT NULL,
@@ -27,23 +28,24 @@ CREATE TABLE IF NOT EXISTS providers (
     image TEXT DEFAULT '/images/placeholder.jpg',
     created_at TIMESTAMP NOT NULL,
     updated_at TIMESTAMP NOT NULL,
-    is_active BOOLEAN DEFAULT 1
+    is_active BOOLEAN DEFAULT 1,
+    sa_front_id TEXT,
+    sa_back_id TEXT,
+    profile_photo TEXT
 );
 
--- Bookings table
 CREATE TABLE IF NOT EXISTS bookings (
     id TEXT PRIMARY KEY,
     customer_id TEXT NOT NULL,
     provider_id TEXT NOT NULL,
     service_date TIMESTAMP NOT NULL,
     service_time TEXT NOT NULL,
-    service_type TEXT NOT NULL,
+    location TEXT NOT NULL,
     status TEXT DEFAULT 'pending',
-    total_amount REAL NOT NULL,
     notes TEXT,
     created_at TIMESTAMP NOT NULL,
     updated_at TIMESTAMP NOT NULL,
     FOREIGN KEY (customer_id) REFERENCES users(id),
     FOREIGN KEY (provider_id) REFERENCES providers(id),
     CHECK (status IN ('pending', 'confirmed', 'completed', 'cancelled'))
-); 
\ No newline at end of file
+);
@@ -0,0 +1,10 @@
+"""Add the provider ID/photo columns to databases created by the old init_db() DDL."""
+
+COLUMNS = ("sa_front_id", "sa_back_id", "profile_photo")
+
+
+def upgrade(conn):
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(providers)")}
+    for column in COLUMNS:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE providers ADD COLUMN {column} TEXT")
@@ -0,0 +1,20 @@
+-- Secondary indexes for the queries in modules/*/service.py.
+-- Email lookups are already served by the UNIQUE constraints.
+
+-- list_users: ORDER BY created_at DESC
+CREATE INDEX IF NOT EXISTS idx_users_created_at ON users (created_at, id);
+
+-- list_providers: ORDER BY created_at DESC
+CREATE INDEX IF NOT EXISTS idx_providers_created_at ON providers (created_at, id);
+
+-- get_providers_by_service_type: WHERE service_type = ? AND is_active
+CREATE INDEX IF NOT EXISTS idx_providers_service_type_active ON providers (service_type, is_active);
+
+-- get_user_bookings: WHERE customer_id = ? ORDER BY created_at DESC
+CREATE INDEX IF NOT EXISTS idx_bookings_customer_created ON bookings (customer_id, created_at, id);
+
+-- get_provider_bookings: WHERE provider_id = ? ORDER BY created_at DESC
+CREATE INDEX IF NOT EXISTS idx_bookings_provider_created ON bookings (provider_id, created_at, id);
+
+-- get_all_bookings: ORDER BY created_at DESC
+CREATE INDEX IF NOT EXISTS idx_bookings_created_at ON bookings (created_at, id);
@@ -0,0 +1,2 @@
+-- Booking image URLs as a JSON array, so the upload GC can tell which stored files are still in use.
+ALTER TABLE bookings ADD COLUMN images TEXT NOT NULL DEFAULT '[]';
@@ -0,0 +1,36 @@
+-- Full-text index for GET /api/providers/search.
+-- External-content FTS5 table over providers (keyed by its implicit rowid), kept in sync by triggers.
+-- VACUUM may renumber that rowid: run `python manage.py rebuild-search` after vacuuming.
+CREATE VIRTUAL TABLE IF NOT EXISTS providers_fts USING fts5(
+    business_name,
+    full_name,
+    service_type,
+    location,
+    content='providers',
+    content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS providers_fts_insert AFTER INSERT ON providers BEGIN
+    INSERT INTO providers_fts (rowid, business_name, full_name, service_type, location)
+    VALUES (new.rowid, new.business_name, new.full_name, new.service_type, new.location);
+END;
+
+CREATE TRIGGER IF NOT EXISTS providers_fts_delete AFTER DELETE ON providers BEGIN
+    INSERT INTO providers_fts (providers_fts, rowid, business_name, full_name, service_type, location)
+    VALUES ('delete', old.rowid, old.business_name, old.full_name, old.service_type, old.location);
+END;
+
+CREATE TRIGGER IF NOT EXISTS providers_fts_update AFTER UPDATE OF business_name, full_name, service_type, location ON providers BEGIN
+    INSERT INTO providers_fts (providers_fts, rowid, business_name, full_name, service_type, location)
+    VALUES ('delete', old.rowid, old.business_name, old.full_name, old.service_type, old.location);
+    INSERT INTO providers_fts (rowid, business_name, full_name, service_type, location)
+    VALUES (new.rowid, new.business_name, new.full_name, new.service_type, new.location);
+END;
+
+-- Index the providers that already exist
+INSERT INTO providers_fts (providers_fts) VALUES ('rebuild');
+
+-- Filter-only searches: rate and rating ranges over active providers
+CREATE INDEX IF NOT EXISTS idx_providers_active_rating ON providers (is_active, rating);
@@ -0,0 +1,73 @@
+"""Provider coordinates plus an R*Tree index over them for nearby searches.
+
+providers_geo holds one point (a degenerate box) per geocoded provider, keyed by
+providers.rowid and kept in sync by triggers. Existing rows are geocoded here.
+"""
+import re
+
+DDL = (
+    "ALTER TABLE providers ADD COLUMN latitude REAL",
+    "ALTER TABLE providers ADD COLUMN longitude REAL",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS providers_geo USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+    """
+    CREATE TRIGGER IF NOT EXISTS providers_geo_insert AFTER INSERT ON providers
+    WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+        INSERT INTO providers_geo VALUES (new.rowid, new.latitude, new.latitude, new.longitude, new.longitude);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS providers_geo_update AFTER UPDATE OF latitude, longitude ON providers BEGIN
+        DELETE FROM providers_geo WHERE id = old.rowid;
+        INSERT INTO providers_geo
+        SELECT new.rowid, new.latitude, new.latitude, new.longitude, new.longitude
+        WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS providers_geo_delete AFTER DELETE ON providers BEGIN
+        DELETE FROM providers_geo WHERE id = old.rowid;
+    END
+    """,
+)
+
+
+# Intentionally frozen, and smaller than modules/providers/geocoding.py: the backfill places
+# a bare "lat, lon" pair or a location naming one of the cities the geocoder knew when this
+# migration was written (no aliases). Other rows keep NULL coordinates, and so stay out of
+# nearby searches, until the provider's details are next saved and geocoded by the live code.
+CITIES = {
+    "islamabad": (33.6844, 73.0479), "rawalpindi": (33.5651, 73.0169), "lahore": (31.5204, 74.3587),
+    "karachi": (24.8607, 67.0011), "peshawar": (34.0151, 71.5249), "quetta": (30.1798, 66.9750),
+    "multan": (30.1575, 71.5249), "faisalabad": (31.4504, 73.1350), "gujranwala": (32.1877, 74.1945),
+    "sialkot": (32.4945, 74.5229), "hyderabad": (25.3960, 68.3578), "sukkur": (27.7052, 68.8574),
+    "bahawalpur": (29.3544, 71.6911), "sargodha": (32.0836, 72.6711), "abbottabad": (34.1688, 73.2215),
+    "mardan": (34.1986, 72.0404), "gujrat": (32.5731, 74.1005), "sahiwal": (30.6682, 73.1114),
+    "larkana": (27.5570, 68.2264), "sheikhupura": (31.7131, 73.9783), "jhelum": (32.9405, 73.7276),
+    "muzaffarabad": (34.3700, 73.4711), "gilgit": (35.9208, 74.3089), "dera ghazi khan": (30.0561, 70.6348),
+    "mirpur": (33.1478, 73.7517), "gwadar": (25.1264, 62.3225),
+}
+_COORDINATES_RE = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
+
+
+def locate(location):
+    match = _COORDINATES_RE.match(location)
+    if match:
+        lat, lon = float(match.group(1)), float(match.group(2))
+        return (lat, lon) if -90 <= lat <= 90 and -180 <= lon <= 180 else None
+    words = f" {' '.join(re.findall(r'[a-z0-9]+', location.lower()))} "
+    for name in sorted(CITIES, key=len, reverse=True):
+        if f" {name} " in words:
+            return CITIES[name]
+    return None
+
+
+def upgrade(conn):
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(providers)")}
+    for statement in DDL:
+        if "ADD COLUMN" in statement and statement.split()[-2] in existing:
+            continue
+        conn.execute(statement)
+
+    rows = conn.execute("SELECT rowid, location FROM providers WHERE location IS NOT NULL").fetchall()
+    updates = [(*point, rowid) for rowid, location in rows if (point := locate(location))]
+    conn.executemany("UPDATE providers SET latitude = ?, longitude = ? WHERE rowid = ?", updates)
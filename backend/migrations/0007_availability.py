@@ -0,0 +1,125 @@
+"""Structured working hours and an interval index over active bookings.
+
+provider_hours holds the weekly open intervals parsed from providers.working_hours
+(minutes since midnight, Monday = 0). booking_slots holds one [start_at, end_at)
+row per pending/confirmed booking so overlap checks are an index range scan.
+Both are backfilled from the existing rows.
+"""
+import re
+from datetime import date, datetime, time, timedelta
+
+DDL = (
+    "ALTER TABLE bookings ADD COLUMN duration_minutes INTEGER NOT NULL DEFAULT 60",
+    """
+    CREATE TABLE IF NOT EXISTS provider_hours (
+        provider_id TEXT NOT NULL,
+        weekday INTEGER NOT NULL CHECK (weekday BETWEEN 0 AND 6),
+        start_minute INTEGER NOT NULL CHECK (start_minute BETWEEN 0 AND 1439),
+        end_minute INTEGER NOT NULL CHECK (end_minute BETWEEN 1 AND 1440 AND end_minute > start_minute),
+        PRIMARY KEY (provider_id, weekday, start_minute)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS booking_slots (
+        booking_id TEXT PRIMARY KEY,
+        provider_id TEXT NOT NULL,
+        start_at TEXT NOT NULL,
+        end_at TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_booking_slots_provider_start ON booking_slots(provider_id, start_at, end_at)",
+    """
+    CREATE TRIGGER IF NOT EXISTS provider_hours_delete AFTER DELETE ON providers BEGIN
+        DELETE FROM provider_hours WHERE provider_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS booking_slots_delete AFTER DELETE ON bookings BEGIN
+        DELETE FROM booking_slots WHERE booking_id = old.id;
+    END
+    """,
+)
+
+
+# Intentionally frozen backfill helpers. Slots use the service date/time format bookings
+# had when this migration was written. Working hours are read only in their simplest form,
+# one range every day ("3 to 5", "9am-5pm", "09:00-17:00") or "24/7"; modules/providers/hours.py
+# understands much more. Any other text gets no provider_hours rows, which leaves the provider
+# unrestricted (as for text the live parser cannot read) until their details are next saved.
+ACTIVE_STATUSES = ("pending", "confirmed")
+SLOT_FORMAT = "%Y-%m-%d %H:%M"
+MINUTES_PER_DAY = 24 * 60
+
+_SERVICE_TIME_RE = re.compile(r"^(\d{1,2}):(\d{2})(?::\d{2}(?:\.\d+)?)?\s*([ap]\.?m\.?)?$", re.IGNORECASE)
+_DAILY_RANGE_RE = re.compile(r"^(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\s*(?:-|to)\s*(\d{1,2})(?::(\d{2}))?\s*(am|pm)?$", re.IGNORECASE)
+_ALWAYS_RE = re.compile(r"^24\s*/\s*7$")
+
+
+def service_start(service_date, service_time):
+    match = _SERVICE_TIME_RE.match(str(service_time).strip())
+    if not match:
+        raise ValueError(f"Invalid time: {service_time!r}")
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2)), match.group(3)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            raise ValueError(f"Invalid time: {service_time!r}")
+        hour = hour % 12 + (12 if meridiem.lower().startswith("p") else 0)
+    return datetime.combine(date.fromisoformat(str(service_date).strip()[:10]), time(hour, minute))
+
+
+def daily_hours(text):
+    """(start_minute, end_minute) of a single range every day, or None"""
+    text = (text or "").strip()
+    if _ALWAYS_RE.match(text):
+        return 0, MINUTES_PER_DAY
+    match = _DAILY_RANGE_RE.match(text)
+    if not match:
+        return None
+    h1, m1, mer1, h2, m2, mer2 = match.groups()
+    start_hour, end_hour, start_minute, end_minute = int(h1), int(h2), int(m1 or 0), int(m2 or 0)
+    if mer1 and mer2:
+        if not (1 <= start_hour <= 12 and 1 <= end_hour <= 12):
+            return None
+        start_hour = start_hour % 12 + (12 if mer1.lower() == "pm" else 0)
+        end_hour = end_hour % 12 + (12 if mer2.lower() == "pm" else 0)
+    elif mer1 or mer2:
+        return None
+    elif not (h1.startswith("0") or h2.startswith("0") or start_hour > 12 or end_hour > 12):
+        # Bare 12-hour shorthand: "3 to 5" -> 15-17, "9 to 5" -> 9-17, "8 to 12" -> 8-12
+        if start_hour < end_hour and 1 <= start_hour <= 7 and end_hour <= 11:
+            start_hour, end_hour = start_hour + 12, end_hour + 12
+        elif end_hour <= start_hour and end_hour < 12:
+            end_hour += 12
+    start, end = start_hour * 60 + start_minute, end_hour * 60 + end_minute
+    if start_minute >= 60 or end_minute >= 60 or not start < end <= MINUTES_PER_DAY:
+        return None
+    return start, end
+
+
+def upgrade(conn):
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(bookings)")}
+    for statement in DDL:
+        if "ADD COLUMN" in statement and statement.split()[5] in existing:
+            continue
+        conn.execute(statement)
+
+    rows = conn.execute("SELECT id, working_hours FROM providers WHERE working_hours IS NOT NULL").fetchall()
+    conn.executemany(
+        "INSERT OR IGNORE INTO provider_hours VALUES (?, ?, ?, ?)",
+        [(provider_id, day, *hours) for provider_id, text in rows if (hours := daily_hours(text)) for day in range(7)]
+    )
+
+    placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+    rows = conn.execute(
+        f"SELECT id, provider_id, service_date, service_time, duration_minutes FROM bookings WHERE status IN ({placeholders})",
+        ACTIVE_STATUSES
+    ).fetchall()
+    slots = []
+    for booking_id, provider_id, service_date, service_time, duration in rows:
+        try:
+            start = service_start(service_date, service_time)
+        except (TypeError, ValueError):
+            # Free-text dates from before validation cannot be placed on the calendar
+            continue
+        slots.append((booking_id, provider_id, start.strftime(SLOT_FORMAT), (start + timedelta(minutes=duration)).strftime(SLOT_FORMAT)))
+    conn.executemany("INSERT OR IGNORE INTO booking_slots VALUES (?, ?, ?, ?)", slots)
@@ -0,0 +1,30 @@
+"""At most one active booking per provider, date and start time.
+
+A partial unique index is the database-level backstop behind the overlap check in
+BookingService: even two writers that both passed the check cannot both commit the
+same slot. Existing duplicates must be resolved by hand before this can apply.
+"""
+
+INDEX = """
+CREATE UNIQUE INDEX IF NOT EXISTS idx_bookings_active_slot
+ON bookings(provider_id, service_date, service_time)
+WHERE status IN ('pending', 'confirmed')
+"""
+
+
+def upgrade(conn):
+    duplicates = conn.execute(
+        """
+        SELECT provider_id, service_date, service_time, COUNT(*) FROM bookings
+        WHERE status IN ('pending', 'confirmed')
+        GROUP BY provider_id, service_date, service_time
+        HAVING COUNT(*) > 1
+        """
+    ).fetchall()
+    if duplicates:
+        listed = ", ".join(f"{row[0]} {row[1]} {row[2]} (x{row[3]})" for row in duplicates[:10])
+        raise RuntimeError(
+            f"{len(duplicates)} provider slots have more than one active booking; "
+            f"cancel the extras before migrating: {listed}"
+        )
+    conn.execute(INDEX)
@@ -0,0 +1,51 @@
+"""Reviews of completed bookings and the provider rating aggregates they maintain.
+
+One review per booking. providers gains rating_sum and rating_score next to the
+existing rating / reviews_count, which until now nothing wrote; all four are
+recomputed here from the (empty) reviews table so they start consistent.
+"""
+
+DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS reviews (
+        id TEXT PRIMARY KEY,
+        booking_id TEXT NOT NULL UNIQUE REFERENCES bookings(id),
+        provider_id TEXT NOT NULL REFERENCES providers(id),
+        customer_id TEXT NOT NULL REFERENCES users(id),
+        rating INTEGER NOT NULL CHECK (rating BETWEEN 1 AND 5),
+        comment TEXT,
+        created_at TIMESTAMP NOT NULL,
+        updated_at TIMESTAMP NOT NULL
+    )
+    """,
+    # list_provider_reviews: WHERE provider_id = ? ORDER BY created_at DESC, and the rebuild's per-provider totals
+    "CREATE INDEX IF NOT EXISTS idx_reviews_provider_created ON reviews (provider_id, created_at, id)",
+    "ALTER TABLE providers ADD COLUMN rating_sum INTEGER NOT NULL DEFAULT 0",
+    # The Bayesian prior at the time: 5 reviews of 3.5 stars, so 3.5 with no reviews
+    "ALTER TABLE providers ADD COLUMN rating_score REAL NOT NULL DEFAULT 3.5",
+)
+
+BACKFILL = (
+    """
+    UPDATE providers SET (rating_sum, reviews_count) = (
+        (SELECT COALESCE(SUM(rating), 0) FROM reviews WHERE provider_id = providers.id),
+        (SELECT COUNT(*) FROM reviews WHERE provider_id = providers.id)
+    )
+    """,
+    """
+    UPDATE providers SET
+        rating = COALESCE(rating_sum * 1.0 / NULLIF(reviews_count, 0), 0),
+        rating_score = (3.5 * 5 + rating_sum) * 1.0 / (5 + reviews_count)
+    """,
+)
+
+
+def upgrade(conn):
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(providers)")}
+    for statement in DDL:
+        if "ADD COLUMN" in statement and statement.split()[5] in existing:
+            continue
+        conn.execute(statement)
+
+    for statement in BACKFILL:
+        conn.execute(statement)
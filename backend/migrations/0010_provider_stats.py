@@ -0,0 +1,59 @@
+"""Per-provider booking summary (counts and minutes by service month and status).
+
+provider_booking_stats is maintained by the triggers below (month as in
+modules/bookings/stats.py's month_of) and filled from the existing bookings here.
+"""
+
+# A service_date that is not YYYY-MM-DD counts under the month ''
+_MONTH = "CASE WHEN {row}.service_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]' THEN substr({row}.service_date, 1, 7) ELSE '' END"
+
+_ADD_NEW = f"""
+    INSERT INTO provider_booking_stats (provider_id, month, status, bookings, minutes)
+    VALUES (new.provider_id, {_MONTH.format(row='new')}, new.status, 1, new.duration_minutes)
+    ON CONFLICT (provider_id, month, status) DO UPDATE SET
+        bookings = bookings + 1,
+        minutes = minutes + excluded.minutes;
+"""
+
+_REMOVE_OLD = f"""
+    UPDATE provider_booking_stats SET bookings = bookings - 1, minutes = minutes - old.duration_minutes
+    WHERE provider_id = old.provider_id AND month = {_MONTH.format(row='old')} AND status = old.status;
+    DELETE FROM provider_booking_stats
+    WHERE provider_id = old.provider_id AND month = {_MONTH.format(row='old')} AND status = old.status AND bookings <= 0;
+"""
+
+DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS provider_booking_stats (
+        provider_id TEXT NOT NULL,
+        month TEXT NOT NULL,
+        status TEXT NOT NULL,
+        bookings INTEGER NOT NULL,
+        minutes INTEGER NOT NULL,
+        PRIMARY KEY (provider_id, month, status)
+    ) WITHOUT ROWID
+    """,
+    f"CREATE TRIGGER IF NOT EXISTS provider_booking_stats_insert AFTER INSERT ON bookings BEGIN {_ADD_NEW} END",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS provider_booking_stats_update
+    AFTER UPDATE OF provider_id, service_date, status, duration_minutes ON bookings BEGIN
+        {_REMOVE_OLD}
+        {_ADD_NEW}
+    END
+    """,
+    f"CREATE TRIGGER IF NOT EXISTS provider_booking_stats_delete AFTER DELETE ON bookings BEGIN {_REMOVE_OLD} END",
+)
+
+BACKFILL = f"""
+INSERT INTO provider_booking_stats (provider_id, month, status, bookings, minutes)
+SELECT provider_id, {_MONTH.format(row='bookings')}, status, COUNT(*), SUM(duration_minutes)
+FROM bookings
+GROUP BY 1, 2, 3
+"""
+
+
+def upgrade(conn):
+    for statement in DDL:
+        conn.execute(statement)
+    conn.execute("DELETE FROM provider_booking_stats")
+    conn.execute(BACKFILL)
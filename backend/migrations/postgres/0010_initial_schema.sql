@@ -0,0 +1,158 @@
+-- PostgreSQL schema, equivalent to the SQLite migrations 0001-0010 in the parent directory.
+-- Later schema changes get a file here with the same version number as their SQLite migration.
+--
+-- Column types follow what the services store: TEXT ids, TIMESTAMP created/updated times
+-- (read back as text, like SQLite), service dates and slot bounds as sortable text.
+-- Where SQLite needs triggers or virtual tables, PostgreSQL has built-in equivalents:
+--   providers_fts -> the generated search_vector column and its GIN index
+--   providers_geo -> a GiST index on point(longitude, latitude)
+--   provider_hours / booking_slots delete triggers -> ON DELETE CASCADE
+
+CREATE TABLE users (
+    id TEXT PRIMARY KEY,
+    email TEXT UNIQUE NOT NULL,
+    full_name TEXT NOT NULL,
+    password TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP NOT NULL,
+    is_active BOOLEAN DEFAULT true
+);
+
+CREATE TABLE providers (
+    id TEXT PRIMARY KEY,
+    email TEXT UNIQUE NOT NULL,
+    full_name TEXT NOT NULL,
+    password TEXT NOT NULL,
+    phone TEXT,
+    business_name TEXT,
+    service_type TEXT,
+    hourly_rate DOUBLE PRECISION,
+    location TEXT,
+    working_hours TEXT,
+    rating DOUBLE PRECISION DEFAULT 0.0,
+    reviews_count INTEGER DEFAULT 0,
+    is_verified BOOLEAN DEFAULT false,
+    image TEXT DEFAULT '/images/placeholder.jpg',
+    created_at TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP NOT NULL,
+    is_active BOOLEAN DEFAULT true,
+    sa_front_id TEXT,
+    sa_back_id TEXT,
+    profile_photo TEXT,
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION,
+    rating_sum INTEGER NOT NULL DEFAULT 0,
+    -- bayesian_score(0, 0) in modules/reviews/ratings.py
+    rating_score DOUBLE PRECISION NOT NULL DEFAULT 3.5,
+    -- Weights A-D match SEARCH_RANK_WEIGHTS in modules/providers/service.py
+    search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(business_name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(full_name, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(service_type, '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(location, '')), 'D')
+    ) STORED
+);
+
+CREATE TABLE bookings (
+    id TEXT PRIMARY KEY,
+    customer_id TEXT NOT NULL REFERENCES users(id),
+    provider_id TEXT NOT NULL REFERENCES providers(id),
+    service_date TEXT NOT NULL,
+    service_time TEXT NOT NULL,
+    location TEXT NOT NULL,
+    status TEXT DEFAULT 'pending',
+    notes TEXT,
+    created_at TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP NOT NULL,
+    images TEXT NOT NULL DEFAULT '[]',
+    duration_minutes INTEGER NOT NULL DEFAULT 60,
+    CHECK (status IN ('pending', 'confirmed', 'completed', 'cancelled'))
+);
+
+-- 0003: listings, newest first
+CREATE INDEX idx_users_created_at ON users (created_at, id);
+CREATE INDEX idx_providers_created_at ON providers (created_at, id);
+CREATE INDEX idx_providers_service_type_active ON providers (service_type, is_active);
+CREATE INDEX idx_bookings_customer_created ON bookings (customer_id, created_at, id);
+CREATE INDEX idx_bookings_provider_created ON bookings (provider_id, created_at, id);
+CREATE INDEX idx_bookings_created_at ON bookings (created_at, id);
+
+-- 0005 / 0006: search and nearby
+CREATE INDEX idx_providers_search ON providers USING gin (search_vector);
+CREATE INDEX idx_providers_active_rating ON providers (is_active, rating);
+CREATE INDEX idx_providers_location ON providers USING gist (point(longitude, latitude));
+
+-- 0007: availability
+CREATE TABLE provider_hours (
+    provider_id TEXT NOT NULL REFERENCES providers(id) ON DELETE CASCADE,
+    weekday INTEGER NOT NULL CHECK (weekday BETWEEN 0 AND 6),
+    start_minute INTEGER NOT NULL CHECK (start_minute BETWEEN 0 AND 1439),
+    end_minute INTEGER NOT NULL CHECK (end_minute BETWEEN 1 AND 1440 AND end_minute > start_minute),
+    PRIMARY KEY (provider_id, weekday, start_minute)
+);
+
+CREATE TABLE booking_slots (
+    booking_id TEXT PRIMARY KEY REFERENCES bookings(id) ON DELETE CASCADE,
+    provider_id TEXT NOT NULL,
+    start_at TEXT NOT NULL,
+    end_at TEXT NOT NULL
+);
+CREATE INDEX idx_booking_slots_provider_start ON booking_slots (provider_id, start_at, end_at);
+
+-- 0008: at most one active booking per provider, date and start time
+CREATE UNIQUE INDEX idx_bookings_active_slot
+ON bookings (provider_id, service_date, service_time)
+WHERE status IN ('pending', 'confirmed');
+
+-- 0009: reviews
+CREATE TABLE reviews (
+    id TEXT PRIMARY KEY,
+    booking_id TEXT NOT NULL UNIQUE REFERENCES bookings(id),
+    provider_id TEXT NOT NULL REFERENCES providers(id),
+    customer_id TEXT NOT NULL REFERENCES users(id),
+    rating INTEGER NOT NULL CHECK (rating BETWEEN 1 AND 5),
+    comment TEXT,
+    created_at TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP NOT NULL
+);
+CREATE INDEX idx_reviews_provider_created ON reviews (provider_id, created_at, id);
+
+-- 0010: provider booking stats, see modules/bookings/stats.py
+CREATE TABLE provider_booking_stats (
+    provider_id TEXT NOT NULL,
+    month TEXT NOT NULL,
+    status TEXT NOT NULL,
+    bookings INTEGER NOT NULL,
+    minutes INTEGER NOT NULL,
+    PRIMARY KEY (provider_id, month, status)
+);
+
+-- month_of() in stats.py: YYYY-MM, or '' for service dates that are not YYYY-MM-DD
+CREATE FUNCTION booking_month(service_date TEXT) RETURNS TEXT
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT CASE WHEN service_date ~ '^[0-9]{4}-[0-9]{2}-[0-9]{2}$' THEN substr(service_date, 1, 7) ELSE '' END
+$$;
+
+CREATE FUNCTION provider_booking_stats_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE provider_booking_stats SET bookings = bookings - 1, minutes = minutes - OLD.duration_minutes
+        WHERE provider_id = OLD.provider_id AND month = booking_month(OLD.service_date) AND status = OLD.status;
+        DELETE FROM provider_booking_stats
+        WHERE provider_id = OLD.provider_id AND month = booking_month(OLD.service_date) AND status = OLD.status AND bookings <= 0;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO provider_booking_stats (provider_id, month, status, bookings, minutes)
+        VALUES (NEW.provider_id, booking_month(NEW.service_date), NEW.status, 1, NEW.duration_minutes)
+        ON CONFLICT (provider_id, month, status) DO UPDATE SET
+            bookings = provider_booking_stats.bookings + 1,
+            minutes = provider_booking_stats.minutes + excluded.minutes;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER provider_booking_stats_maintain
+AFTER INSERT OR DELETE OR UPDATE OF provider_id, service_date, status, duration_minutes ON bookings
+FOR EACH ROW EXECUTE FUNCTION provider_booking_stats_apply();
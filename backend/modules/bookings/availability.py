@@ -0,0 +1,179 @@
+import os
+import re
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from dotenv import load_dotenv
+from database import execute_query
+
+load_dotenv()
+
+# Length of a booking when the client does not say, and the longest one accepted
+BOOKING_DURATION_MINUTES = int(os.getenv("BOOKING_DURATION_MINUTES", "60"))
+MAX_BOOKING_DURATION_MINUTES = 12 * 60
+# Longest date range one availability request may cover
+MAX_AVAILABILITY_DAYS = 31
+
+# Bookings in these states hold their slot (they have a booking_slots row)
+ACTIVE_STATUSES = ("pending", "confirmed")
+
+# booking_slots.start_at / end_at format; sorts chronologically as text
+SLOT_FORMAT = "%Y-%m-%d %H:%M"
+
+_TIME_RE = re.compile(r"^(\d{1,2}):(\d{2})(?::\d{2}(?:\.\d+)?)?\s*([ap]\.?m\.?)?$", re.IGNORECASE)
+
+Interval = Tuple[int, int, int]
+Busy = Tuple[datetime, datetime]
+
+
+def parse_service_date(value: str) -> date:
+    """YYYY-MM-DD (a trailing time part, as older clients send, is ignored)"""
+    return date.fromisoformat(str(value).strip()[:10])
+
+
+def parse_service_time(value: str) -> time:
+    """HH:MM, HH:MM:SS or h:MM am/pm"""
+    match = _TIME_RE.match(str(value).strip())
+    if not match:
+        raise ValueError(f"Invalid time: {value!r}")
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2)), match.group(3)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            raise ValueError(f"Invalid time: {value!r}")
+        hour = hour % 12 + (12 if meridiem.lower().startswith("p") else 0)
+    return time(hour, minute)
+
+
+def availability_window(start: Optional[str], end: Optional[str]) -> Tuple[date, date]:
+    """(first, last) day of an availability query; defaults to today, at most MAX_AVAILABILITY_DAYS long"""
+    first = parse_service_date(start) if start else datetime.utcnow().date()
+    last = parse_service_date(end) if end else first
+    if last < first:
+        raise ValueError("end must not be before start")
+    if (last - first).days >= MAX_AVAILABILITY_DAYS:
+        raise ValueError(f"At most {MAX_AVAILABILITY_DAYS} days can be queried at once")
+    return first, last
+
+
+def format_slot(moment: datetime) -> str:
+    return moment.strftime(SLOT_FORMAT)
+
+
+def covers(hours: Iterable[Interval], start: datetime, end: datetime) -> bool:
+    """Whether [start, end) lies inside the weekly open intervals (a booking may span midnight)"""
+    cursor = start
+    while cursor < end:
+        minute = cursor.hour * 60 + cursor.minute
+        weekday = cursor.weekday()
+        interval = next((iv for iv in hours if iv[0] == weekday and iv[1] <= minute < iv[2]), None)
+        if interval is None:
+            return False
+        cursor = datetime.combine(cursor.date(), time()) + timedelta(minutes=interval[2])
+    return True
+
+
+def free_slots(hours: List[Interval], busy: List[Busy], start: date, end: date, duration: int) -> List[dict]:
+    """Bookable [start, start + duration) slots between the dates (inclusive), given the open hours and busy spans.
+
+    Each free gap is cut into consecutive slots from its beginning, so a booking ending
+    at 15:30 makes 15:30 the next offered start.
+    """
+    slots = []
+    busy = sorted(busy)
+    step = timedelta(minutes=duration)
+    day = start
+    while day <= end:
+        midnight = datetime.combine(day, time())
+        for weekday, open_minute, close_minute in hours:
+            if weekday != day.weekday():
+                continue
+            cursor = midnight + timedelta(minutes=open_minute)
+            close = midnight + timedelta(minutes=close_minute)
+            for busy_start, busy_end in busy:
+                if busy_end <= cursor or busy_start >= close:
+                    continue
+                while cursor + step <= min(busy_start, close):
+                    slots.append(cursor)
+                    cursor += step
+                cursor = max(cursor, busy_end)
+            while cursor + step <= close:
+                slots.append(cursor)
+                cursor += step
+        day += timedelta(days=1)
+    return [
+        {"date": slot.strftime("%Y-%m-%d"), "start": slot.strftime("%H:%M"), "end": (slot + step).strftime("%H:%M")}
+        for slot in sorted(slots)
+    ]
+
+
+def _placeholders(values) -> str:
+    return ", ".join("?" for _ in values)
+
+
+def load_hours(provider_ids: List[str]) -> Dict[str, List[Interval]]:
+    hours = defaultdict(list)
+    if not provider_ids:
+        return hours
+    rows = execute_query(
+        f"SELECT provider_id, weekday, start_minute, end_minute FROM provider_hours "
+        f"WHERE provider_id IN ({_placeholders(provider_ids)}) ORDER BY provider_id, weekday, start_minute",
+        tuple(provider_ids)
+    )
+    for row in rows:
+        hours[row["provider_id"]].append((row["weekday"], row["start_minute"], row["end_minute"]))
+    return hours
+
+
+def load_busy(provider_ids: List[str], start: datetime, end: datetime) -> Dict[str, List[Busy]]:
+    """Active bookings overlapping [start, end), from the booking_slots interval index"""
+    busy = defaultdict(list)
+    if not provider_ids:
+        return busy
+    # Bounding start_at from below keeps this an index range scan on (provider_id, start_at)
+    earliest = start - timedelta(minutes=MAX_BOOKING_DURATION_MINUTES)
+    rows = execute_query(
+        f"SELECT provider_id, start_at, end_at FROM booking_slots "
+        f"WHERE provider_id IN ({_placeholders(provider_ids)}) AND start_at > ? AND start_at < ? AND end_at > ?",
+        (*provider_ids, format_slot(earliest), format_slot(end), format_slot(start))
+    )
+    for row in rows:
+        busy[row["provider_id"]].append(
+            (datetime.strptime(row["start_at"], SLOT_FORMAT), datetime.strptime(row["end_at"], SLOT_FORMAT))
+        )
+    return busy
+
+
+def get_availability(provider_ids: List[str], start: date, end: date, duration: int) -> List[dict]:
+    """Open slots per provider between the dates (inclusive), in the order of provider_ids"""
+    range_start = datetime.combine(start, time())
+    range_end = datetime.combine(end + timedelta(days=1), time())
+    hours = load_hours(provider_ids)
+    busy = load_busy(provider_ids, range_start, range_end)
+    return [
+        {
+            "provider_id": provider_id,
+            "working_hours_known": bool(hours.get(provider_id)),
+            "slots": free_slots(hours.get(provider_id, []), busy.get(provider_id, []), start, end, duration),
+        }
+        for provider_id in provider_ids
+    ]
+
+
+def find_conflict(conn, provider_id: str, start: datetime, end: datetime) -> Optional[str]:
+    """ID of an active booking of the provider overlapping [start, end), if any"""
+    earliest = start - timedelta(minutes=MAX_BOOKING_DURATION_MINUTES)
+    row = conn.execute(
+        "SELECT booking_id FROM booking_slots WHERE provider_id = ? AND start_at > ? AND start_at < ? AND end_at > ? LIMIT 1",
+        (provider_id, format_slot(earliest), format_slot(end), format_slot(start))
+    ).fetchone()
+    return row[0] if row else None
+
+
+def provider_hours(conn, provider_id: str) -> List[Interval]:
+    return [
+        tuple(row)
+        for row in conn.execute(
+            "SELECT weekday, start_minute, end_minute FROM provider_hours WHERE provider_id = ? ORDER BY weekday, start_minute",
+            (provider_id,)
+        )
+    ]
@@ -1,13 +1,17 @@
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
+from pydantic import BaseModel, Field, computed_field
 from uuid import UUID, uuid4
+from ..media.images import variant_urls
+
+BookingStatus = Literal["pending", "confirmed", "completed", "cancelled"]
 
 class BookingBase(BaseModel):
     date: str
     time: str
     location: str
     description: Optional[str] = None
+    duration_minutes: Optional[int] = None
 
 class BookingCreate(BookingBase):
     pass
@@ -24,7 +28,74 @@ class Booking(BookingBase):
     class Config:
         from_attributes = True
 
+    @computed_field
+    @property
+    def image_variants(self) -> List[Optional[Dict[str, Dict[str, str]]]]:
+        """Resized WebP/AVIF copies of each image, as {size: {format: url}}"""
+        return [variant_urls(url) for url in self.images or []]
+
 class BookingResponse(Booking):
-    provider_name: str
-    provider_email: str
-    user_email: str 
\ No newline at end of file
+    # Optional: providers may not have business details yet
+    provider_name: Optional[str] = None
+    provider_email: Optional[str] = None
+    user_email: Optional[str] = None
+
+def booking_payload(record) -> dict:
+    """BookingResponse as JSON-ready data, straight from a BookingRecord.
+
+    Rows we wrote ourselves need no re-validation, so this only does what the model's
+    serializer would: datetimes parsed for ISO output and image_variants added.
+    """
+    payload = record._asdict()
+    payload["created_at"] = datetime.fromisoformat(record.created_at)
+    payload["updated_at"] = datetime.fromisoformat(record.updated_at)
+    payload["image_variants"] = [variant_urls(url) for url in record.images]
+    return payload
+
+class AvailabilitySlot(BaseModel):
+    date: str
+    start: str
+    end: str
+
+class ProviderAvailability(BaseModel):
+    provider_id: str
+    # False when the provider's working hours could not be parsed (no slots are offered)
+    working_hours_known: bool
+    slots: List[AvailabilitySlot]
+
+class MonthlyBookingStats(BaseModel):
+    month: Optional[str] = None  # YYYY-MM of the service date; None for bookings without a valid date
+    bookings: int
+    by_status: Dict[str, int]
+    completed_hours: float
+
+class ProviderStats(BaseModel):
+    provider_id: str
+    bookings: int
+    by_status: Dict[str, int]
+    completed_hours: float
+    by_month: List[MonthlyBookingStats]  # oldest month first
+
+class BulkStatusFilter(BaseModel):
+    provider_id: str
+    from_date: Optional[str] = None  # YYYY-MM-DD, inclusive
+    to_date: Optional[str] = None
+    status: Optional[BookingStatus] = None  # only bookings currently in this status
+
+class BulkStatusUpdate(BaseModel):
+    status: BookingStatus
+    # Exactly one of ids / filter
+    ids: Optional[List[str]] = Field(None, max_length=1000)
+    filter: Optional[BulkStatusFilter] = None
+    limit: int = Field(1000, ge=1, le=1000)  # filter mode: most bookings changed per call
+
+class BulkStatusResult(BaseModel):
+    id: str
+    outcome: Literal["updated", "unchanged", "invalid_transition", "not_found"]
+    status: Optional[str] = None  # the booking's status after the call
+
+class BulkStatusResponse(BaseModel):
+    status: BookingStatus
+    updated: int
+    results: List[BulkStatusResult]
+    has_more: bool  # filter mode: more matching bookings remain; repeat the call
@@ -0,0 +1,144 @@
+import json
+from contextlib import contextmanager
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+from database import backend, get_db_connection, STREAM_FETCH_SIZE
+from ..pagination import keyset_filter, keyset_order
+
+# Booking columns aliased in SQL to the Booking model's field names, in BookingRecord order
+BOOKING_FIELDS = """
+b.id, b.customer_id AS user_id, b.provider_id, b.service_date AS date, b.service_time AS time,
+b.duration_minutes, b.location, b.notes AS description, b.status, b.images, b.created_at, b.updated_at
+"""
+
+# Bookings joined with the customer and provider details the responses need,
+# so a listing is one round trip regardless of how many bookings it returns
+BOOKING_DETAILS_QUERY = f"""
+SELECT {BOOKING_FIELDS},
+       u.email AS user_email,
+       p.email AS provider_email,
+       p.business_name AS provider_name
+FROM bookings b
+LEFT JOIN users u ON b.customer_id = u.id
+LEFT JOIN providers p ON b.provider_id = p.id
+"""
+
+
+class BookingRecord(NamedTuple):
+    id: str
+    user_id: str
+    provider_id: str
+    date: str
+    time: str
+    duration_minutes: int
+    location: str
+    description: Optional[str]
+    status: str
+    images: List[str]
+    created_at: str
+    updated_at: str
+    user_email: Optional[str] = None
+    provider_email: Optional[str] = None
+    provider_name: Optional[str] = None
+
+
+_IMAGES = BookingRecord._fields.index("images")
+
+
+def _record(cursor, row: tuple) -> BookingRecord:
+    """Cursor row factory: raw tuple straight to a BookingRecord, skipping Row objects and dicts"""
+    images = row[_IMAGES]
+    return BookingRecord(
+        *row[:_IMAGES],
+        json.loads(images) if images and images != "[]" else [],
+        *row[_IMAGES + 1:],
+    )
+
+
+class BookingRepository:
+    """Every read of booking rows, as BookingRecord tuples.
+
+    Pass conn to read inside a caller's transaction; otherwise each call borrows a pooled connection.
+    """
+
+    def __init__(self, conn=None):
+        self.conn = conn
+
+    @contextmanager
+    def _connection(self):
+        if self.conn is not None:
+            yield self.conn
+        else:
+            with get_db_connection() as conn:
+                yield conn
+
+    @staticmethod
+    def _query(condition: str = "", params: tuple = (), limit: Optional[int] = None, cursor: Optional[str] = None) -> Tuple[str, tuple]:
+        """Newest-first query with keyset pagination on (created_at, id)"""
+        conditions = [condition] if condition else []
+        keyset_condition, keyset_params = keyset_filter(cursor, prefix="b.")
+        if keyset_condition:
+            conditions.append(keyset_condition)
+        query = BOOKING_DETAILS_QUERY
+        if conditions:
+            query += "WHERE " + " AND ".join(conditions) + " "
+        query += keyset_order(prefix="b.")
+        params = (*params, *keyset_params)
+        if limit is not None:
+            query += " LIMIT ?"
+            params += (limit,)
+        return query, params
+
+    def get(self, booking_id: str) -> Optional[BookingRecord]:
+        with self._connection() as conn:
+            cur = conn.cursor()
+            cur.row_factory = _record
+            try:
+                return cur.execute(BOOKING_DETAILS_QUERY + "WHERE b.id = ?", (booking_id,)).fetchone()
+            finally:
+                cur.close()
+
+    def fetch_many(self, condition: str = "", params: tuple = (), limit: Optional[int] = None, cursor: Optional[str] = None) -> List[BookingRecord]:
+        query, params = self._query(condition, params, limit, cursor)
+        with self._connection() as conn:
+            cur = conn.cursor()
+            cur.row_factory = _record
+            try:
+                return cur.execute(query, params).fetchall()
+            finally:
+                cur.close()
+
+    def iterate(
+        self,
+        condition: str = "",
+        params: tuple = (),
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        chunk_size: int = STREAM_FETCH_SIZE
+    ) -> Iterator[BookingRecord]:
+        """Like fetch_many, but pulled from the cursor chunk_size rows at a time.
+
+        The query is built (and the cursor validated) right away, so a bad cursor raises
+        here rather than once a streamed response has started; only the fetching is lazy.
+        """
+        query, params = self._query(condition, params, limit, cursor)
+        return self._stream(query, params, chunk_size)
+
+    def _stream(self, query: str, params: tuple, chunk_size: int) -> Iterator[BookingRecord]:
+        with self._connection() as conn:
+            cur = backend.stream_cursor(conn)
+            cur.row_factory = _record
+            try:
+                cur.execute(query, params)
+                while True:
+                    rows = cur.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield from rows
+            finally:
+                cur.close()
+
+    def for_customer(self, user_id: str, limit: Optional[int] = None, cursor: Optional[str] = None) -> List[BookingRecord]:
+        return self.fetch_many("b.customer_id = ?", (user_id,), limit, cursor)
+
+    def for_provider(self, provider_id: str, limit: Optional[int] = None, cursor: Optional[str] = None) -> List[BookingRecord]:
+        return self.fetch_many("b.provider_id = ?", (provider_id,), limit, cursor)
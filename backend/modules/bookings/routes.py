@@ -1,18 +1,50 @@
-from typing import List
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from ..providers.models import ProviderInDB
+from typing import List, Optional
+import logging
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header, Query, Request
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
 from ..providers.service import get_provider
+from ..users.service import verify_token
+from ..utils import require_admin
 from .service import BookingService
-from .models import Booking, BookingCreate, BookingResponse
-from database import execute_query_one, execute_query
-import os
+from .models import BookingCreate, BookingResponse, BookingStatus, BulkStatusUpdate, BulkStatusResponse, booking_payload
+from database import run_db
+from logging_config import log_rows
+from ..pagination import next_cursor, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from ..responses import payload_response
+from ..media.uploads import limit_upload_request, UploadLimitRoute
+from .availability import parse_service_date
+import orjson
 from dotenv import load_dotenv
 
 load_dotenv()
 
-router = APIRouter(prefix="/api/me/bookings", tags=["bookings"])
+logger = logging.getLogger(__name__)
 
-@router.post("", response_model=BookingResponse)
+router = APIRouter(prefix="/api/me/bookings", tags=["bookings"], route_class=UploadLimitRoute)
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+def get_provider_or_admin(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    x_admin_key: Optional[str] = Header(None)
+) -> Optional[str]:
+    """None for a request with the admin key, otherwise the ID of the active provider named by its bearer token"""
+    if x_admin_key is not None:
+        require_admin(x_admin_key)
+        return None
+    claims = verify_token(token) if token else None
+    provider = None
+    if claims and claims.get("user_type") == "provider" and claims.get("provider_id"):
+        provider = get_provider(claims["provider_id"])
+    if not provider or not provider.is_active:
+        raise HTTPException(
+            status_code=401,
+            detail="Provider token or admin key required",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return provider.id
+
+@router.post("", response_model=BookingResponse, dependencies=[Depends(limit_upload_request)])
 async def create_booking(
     provider_id: str = Form(...),
     user_id: str = Form(...),
@@ -20,17 +52,22 @@ async def create_booking(
     time: str = Form(...),
     location: str = Form(...),
     description: str = Form(None),
+    duration_minutes: Optional[int] = Form(None),
     images: List[UploadFile] = File(None)
 ):
-    print("\n[DEBUG] ====== BOOKING CREATION REQUEST RECEIVED ======")
-    print("[DEBUG] Request data:")
-    print(f"  provider_id: {provider_id}")
-    print(f"  user_id: {user_id}")
-    print(f"  date: {date}")
-    print(f"  time: {time}")
-    print(f"  location: {location}")
-    print(f"  description: {description}")
-    print(f"  images: {[img.filename for img in images] if images else 'No images'}")
+    logger.info("Booking creation requested", extra={"provider_id": provider_id, "user_id": user_id})
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Booking request data",
+            extra={
+                "date": date,
+                "time": time,
+                "location": location,
+                "description": description,
+                "duration_minutes": duration_minutes,
+                "images": [img.filename for img in images] if images else [],
+            }
+        )
 
     # Check for missing required fields
     missing = []
@@ -38,7 +75,7 @@ async def create_booking(
         if not value:
             missing.append(field)
     if missing:
-        print(f"[ERROR] Missing required fields: {missing}")
+        logger.warning("Missing required fields: %s", missing)
         raise HTTPException(status_code=400, detail=f"Missing required fields: {', '.join(missing)}")
 
     booking_service = BookingService()
@@ -46,146 +83,118 @@ async def create_booking(
         date=date,
         time=time,
         location=location,
-        description=description
+        description=description,
+        duration_minutes=duration_minutes
     )
-    
-    print("\n[DEBUG] Creating booking with service...")
+
     booking = await booking_service.create_booking(
         booking_data=booking_data,
         user_id=user_id,
         provider_id=provider_id,
         images=images
     )
-    
-    print("\n[DEBUG] Fetching provider details...")
-    provider = get_provider(provider_id)
-    
-    print("\n[DEBUG] Preparing response...")
-    response = BookingResponse(
-        **booking,
-        provider_name=provider.business_name if provider else None,
-        provider_email=provider.email if provider else None,
-        user_email=user_id
-    )
-    
-    print("\n[DEBUG] Response data:")
-    for key, value in response.dict().items():
-        print(f"  {key}: {value}")
-    
-    print("[DEBUG] ====== BOOKING CREATION REQUEST COMPLETED ======\n")
-    return response
+
+    logger.info("Booking created", extra={"booking_id": booking.id})
+    # The record already carries the provider and customer details
+    return payload_response(booking_payload(booking))
+
+def _listing_response(bookings, limit: Optional[int]):
+    """Bookings encoded straight from their records, with the next page's cursor header"""
+    page_cursor = next_cursor(bookings, limit)
+    headers = {NEXT_CURSOR_HEADER: page_cursor} if page_cursor else None
+    # Provider and customer details come from the listing query itself
+    return payload_response([booking_payload(booking) for booking in bookings], headers=headers)
 
 @router.get("", response_model=List[BookingResponse])
-async def get_my_bookings():
-    print("\n[DEBUG] ====== GET MY BOOKINGS REQUEST RECEIVED ======")
+async def get_my_bookings(
+    user_id: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """List a customer's bookings, newest first; the next page's cursor is returned in X-Next-Cursor"""
     booking_service = BookingService()
-    
-    print("[DEBUG] Fetching bookings...")
-    bookings = booking_service.get_user_bookings(None)
-    
-    print("\n[DEBUG] Processing bookings...")
-    response_bookings = []
-    for booking in bookings:
-        provider = get_provider(booking["provider_id"])
-        response_booking = BookingResponse(
-            **booking,
-            provider_name=provider.business_name if provider else None,
-            provider_email=provider.email if provider else None,
-            user_email=None
+
+    bookings = await run_db(booking_service.get_user_bookings, user_id, limit, cursor)
+    logger.info("Listed %d bookings", len(bookings))
+    return _listing_response(bookings, limit)
+
+@router.patch("/status", response_model=BulkStatusResponse)
+async def bulk_update_booking_status(update: BulkStatusUpdate, caller_provider_id: Optional[str] = Depends(get_provider_or_admin)):
+    """
+    Change the status of many bookings in one transaction.
+    Pass ids, or a filter (provider_id plus optional date range / current status) to act on
+    up to limit matching bookings; has_more tells whether to call again.
+    Allowed: pending -> confirmed/cancelled, confirmed -> completed/cancelled.
+    Admins (X-Admin-Key) may change any booking, providers (bearer token) only their own.
+    """
+    if (update.ids is None) == (update.filter is None):
+        raise HTTPException(status_code=400, detail="Pass either ids or filter")
+    if caller_provider_id is not None and update.filter is not None and update.filter.provider_id != caller_provider_id:
+        raise HTTPException(status_code=403, detail="Not allowed to change another provider's bookings")
+    if update.filter is not None:
+        try:
+            for value in (update.filter.from_date, update.filter.to_date):
+                if value is not None:
+                    parse_service_date(value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="from_date/to_date must be YYYY-MM-DD")
+
+    booking_service = BookingService()
+    if update.ids is not None:
+        result = await run_db(booking_service.bulk_update_status, update.status, ids=update.ids, owner_id=caller_provider_id)
+    else:
+        result = await run_db(
+            booking_service.bulk_update_status,
+            update.status,
+            provider_id=update.filter.provider_id,
+            from_date=update.filter.from_date,
+            to_date=update.filter.to_date,
+            current_status=update.filter.status,
+            limit=update.limit
         )
-        response_bookings.append(response_booking)
-    
-    print(f"\n[DEBUG] Found {len(response_bookings)} bookings")
-    for booking in response_bookings:
-        print("\n[DEBUG] Booking details:")
-        for key, value in booking.dict().items():
-            print(f"  {key}: {value}")
-    
-    print("[DEBUG] ====== GET MY BOOKINGS REQUEST COMPLETED ======\n")
-    return response_bookings
-
-@router.patch("/{booking_id}/status")
+    logger.info("Bulk status update", extra={"status": update.status, "updated": result["updated"]})
+    return result
+
+@router.patch("/{booking_id}/status", response_model=BookingResponse)
 async def update_booking_status(
     booking_id: str,
-    status: str
+    status: BookingStatus
 ):
-    print("\n[DEBUG] ====== UPDATE BOOKING STATUS REQUEST RECEIVED ======")
-    print(f"[DEBUG] Request data:")
-    print(f"  booking_id: {booking_id}")
-    print(f"  status: {status}")
-    
+    logger.info("Booking status update requested", extra={"booking_id": booking_id, "status": status})
+
     booking_service = BookingService()
-    
-    print("\n[DEBUG] Verifying booking exists...")
-    booking = execute_query_one(
-        "SELECT * FROM bookings WHERE id = ?",
-        (booking_id,)
-    )
-    if not booking:
-        print(f"[ERROR] Booking {booking_id} not found")
-        raise HTTPException(status_code=404, detail="Booking not found")
-    
-    print("\n[DEBUG] Updating booking status...")
-    updated_booking = booking_service.update_booking_status(booking_id, status)
-    
-    print("\n[DEBUG] Response data:")
-    for key, value in updated_booking.items():
-        print(f"  {key}: {value}")
-    
-    print("[DEBUG] ====== UPDATE BOOKING STATUS REQUEST COMPLETED ======\n")
-    return updated_booking
+    updated_booking = await run_db(booking_service.update_booking_status, booking_id, status)
+
+    log_rows(logger, "Updated booking", (updated_booking,))
+    return payload_response(booking_payload(updated_booking))
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def _ndjson_lines(bookings):
+    for booking in bookings:
+        yield orjson.dumps(booking_payload(booking)) + b"\n"
 
 @router.get("/all", response_model=List[BookingResponse])
-async def get_all_bookings():
+async def get_all_bookings(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: bool = False
+):
     """
     Get all bookings with detailed information including provider and user details.
+    Pass limit (and then cursor) to page through them; the next cursor is returned in X-Next-Cursor.
+    With stream=true or Accept: application/x-ndjson, bookings are streamed one JSON object per line.
     """
-    print("\n[DEBUG] ====== GET ALL BOOKINGS REQUEST RECEIVED ======")
     booking_service = BookingService()
-    
-    # Get all bookings from the database
-    bookings = execute_query(
-        """
-        SELECT b.*, 
-               u.email as user_email,
-               p.email as provider_email,
-               p.business_name as provider_name
-        FROM bookings b
-        JOIN users u ON b.customer_id = u.id
-        JOIN providers p ON b.provider_id = p.id
-        ORDER BY b.created_at DESC
-        """
-    )
-    
-    print(f"\n[DEBUG] Found {len(bookings)} bookings")
-    
-    # Process the bookings to match the response model
-    response_bookings = []
-    for booking in bookings:
-        # Map database column names to our model field names
-        booking_data = {
-            'id': booking['id'],
-            'user_id': booking['customer_id'],
-            'provider_id': booking['provider_id'],
-            'date': booking['service_date'],
-            'time': booking['service_time'],
-            'location': booking['location'],
-            'description': booking['notes'],
-            'status': booking['status'],
-            'created_at': booking['created_at'],
-            'updated_at': booking['updated_at'],
-            'provider_name': booking['provider_name'],
-            'provider_email': booking['provider_email'],
-            'user_email': booking['user_email'],
-            'images': []  # Add empty images list since it's not in DB
-        }
-        
-        response_booking = BookingResponse(**booking_data)
-        response_bookings.append(response_booking)
-        
-        print("\n[DEBUG] Booking details:")
-        for key, value in booking_data.items():
-            print(f"  {key}: {value}")
-    
-    print("[DEBUG] ====== GET ALL BOOKINGS REQUEST COMPLETED ======\n")
-    return response_bookings 
\ No newline at end of file
+
+    if stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        # Rows are pulled from the cursor in chunks as the client reads, so memory stays flat
+        return StreamingResponse(
+            _ndjson_lines(booking_service.iter_all_bookings(limit, cursor)),
+            media_type=NDJSON_MEDIA_TYPE
+        )
+
+    bookings = await run_db(booking_service.get_all_bookings, limit, cursor)
+    logger.info("Listed %d bookings", len(bookings))
+    return _listing_response(bookings, limit)
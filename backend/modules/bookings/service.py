@@ -1,237 +1,296 @@
-import os
-from datetime import datetime
-from typing import List, Optional
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional
 from uuid import uuid4
 from fastapi import UploadFile, HTTPException
-from ..users.service import get_user_by_id
-from ..providers.service import get_provider
-from .models import Booking, BookingCreate
-from database import execute_query, execute_query_one, get_db_connection
+from .models import BookingCreate
+from .repository import BookingRecord, BookingRepository
+from database import IntegrityError, backend, is_unique_violation, transaction, run_db
+from logging_config import log_rows
+from ..media.storage import store_uploads
+from ..media.images import schedule_variants
+from .availability import (
+    ACTIVE_STATUSES,
+    BOOKING_DURATION_MINUTES,
+    MAX_BOOKING_DURATION_MINUTES,
+    covers,
+    find_conflict,
+    format_slot,
+    parse_service_date,
+    parse_service_time,
+    provider_hours,
+)
 
-class BookingService:
-    def __init__(self):
-        print("[DEBUG] Initializing BookingService")
-        self.upload_dir = "uploaded_images/bookings"
-        print(f"[DEBUG] Upload directory set to: {self.upload_dir}")
+logger = logging.getLogger(__name__)
+
+SLOT_TAKEN_DETAIL = "The provider is already booked at that time"
+
+# Allowed status changes; completed and cancelled are final
+STATUS_TRANSITIONS = {
+    "pending": ("confirmed", "cancelled"),
+    "confirmed": ("completed", "cancelled"),
+    "completed": (),
+    "cancelled": (),
+}
+# Most bookings one bulk status change may touch
+BULK_STATUS_LIMIT = 1000
+# Max IDs bound into a single IN (...) clause
+IN_CLAUSE_CHUNK_SIZE = 500
 
+class BookingService:
     async def create_booking(
         self,
         booking_data: BookingCreate,
         user_id: str,
         provider_id: str,
         images: Optional[List[UploadFile]] = None
-    ) -> dict:
-        print("\n[DEBUG] ====== STARTING BOOKING CREATION ======")
-        print("[DEBUG] Starting create_booking service method")
-        print(f"[DEBUG] Creating booking for user {user_id} with provider {provider_id}")
-        
-        # Verify user exists
-        user = get_user_by_id(user_id)
-        if not user:
-            print(f"[ERROR] User {user_id} not found")
-            raise HTTPException(status_code=404, detail="User not found")
-        print(f"[DEBUG] Verified user exists: {user['email']}")
-
-        # Verify provider exists
-        provider = get_provider(provider_id)
-        if not provider:
-            print(f"[ERROR] Provider {provider_id} not found")
-            raise HTTPException(status_code=404, detail="Provider not found")
-        print(f"[DEBUG] Verified provider exists: {provider.business_name}")
+    ) -> BookingRecord:
+        logger.debug("Creating booking for user %s with provider %s", user_id, provider_id)
+
+        # Normalize the requested slot before anything is stored
+        duration = booking_data.duration_minutes or BOOKING_DURATION_MINUTES
+        if not 15 <= duration <= MAX_BOOKING_DURATION_MINUTES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"duration_minutes must be between 15 and {MAX_BOOKING_DURATION_MINUTES}"
+            )
+        try:
+            start = datetime.combine(parse_service_date(booking_data.date), parse_service_time(booking_data.time))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date or time, expected YYYY-MM-DD and HH:MM")
 
         # Generate booking ID
         booking_id = str(uuid4())
-        now = datetime.utcnow()
-        print(f"[DEBUG] Generated booking ID: {booking_id}")
 
-        # Handle image uploads
+        # Handle image uploads (files of a booking rejected below are left to the upload GC)
         image_urls = []
         if images:
-            print(f"[DEBUG] Processing {len(images)} images for booking")
-            os.makedirs(self.upload_dir, exist_ok=True)
-            
-            for image in images:
-                # Generate unique filename
-                timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-                filename = f"{booking_id}_{timestamp}_{image.filename}"
-                filepath = os.path.join(self.upload_dir, filename)
-                print(f"[DEBUG] Saving image: {filename}")
-                
-                # Save image
-                with open(filepath, "wb") as f:
-                    content = await image.read()
-                    f.write(content)
-                
-                image_urls.append(f"/uploads/bookings/{filename}")
-
-        # Debug: print current bookings table columns
-        with get_db_connection() as conn:
-            cur = conn.cursor()
-            cur.execute("PRAGMA table_info(bookings);")
-            columns = cur.fetchall()
-            print("\n[DEBUG] Bookings table structure:")
-            for col in columns:
-                print(f"  - {col[1]}: {col[2]}")
-
-        # Create booking in database
-        print("\n[DEBUG] ====== DATABASE INSERT OPERATION ======")
-        print("[DEBUG] Inserting booking with the following data:")
-        print(f"  id: {booking_id}")
-        print(f"  user_id: {user_id}")
-        print(f"  provider_id: {provider_id}")
-        print(f"  date: {booking_data.date}")
-        print(f"  time: {booking_data.time}")
-        print(f"  location: {booking_data.location}")
-        print(f"  description: {booking_data.description}")
-        print(f"  status: pending")
-        print(f"  images: {image_urls}")
-        print(f"  created_at: {now}")
-        print(f"  updated_at: {now}")
-
-        query = """
-        INSERT INTO bookings (
-            id, customer_id, provider_id, service_date, service_time, 
-            location, notes, status, created_at, updated_at
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
-        
-        execute_query(
-            query,
-            (
-                booking_id,
-                user_id,
-                provider_id,
-                booking_data.date,
-                booking_data.time,
-                booking_data.location,
-                booking_data.description,
-                "pending",
-                now,
-                now
-            )
-        )
+            logger.debug("Processing %d images for booking %s", len(images), booking_id)
+            image_urls = await store_uploads(images)
 
-        # Verify the inserted data
-        print("\n[DEBUG] ====== VERIFYING INSERTED DATA ======")
-        booking = execute_query_one(
-            "SELECT * FROM bookings WHERE id = ?",
-            (booking_id,)
+        booking = await run_db(
+            self._insert_booking,
+            booking_id,
+            user_id,
+            provider_id,
+            start,
+            duration,
+            booking_data,
+            image_urls
         )
-        
-        # Map database column names to our model field names
-        if booking:
-            booking['user_id'] = booking.pop('customer_id')
-            booking['date'] = booking.pop('service_date')
-            booking['time'] = booking.pop('service_time')
-            booking['description'] = booking.pop('notes')
-            booking['images'] = []  # Add empty images list since it's not in DB
-            
-        print("[DEBUG] Retrieved booking data from database:")
-        for key, value in booking.items():
-            print(f"  {key}: {value}")
-        
-        print("[DEBUG] Completed create_booking service method")
-        print("[DEBUG] ====== BOOKING CREATION COMPLETED ======\n")
+        schedule_variants(image_urls)
+
+        log_rows(logger, "Inserted booking", (booking,))
         return booking
 
-    def get_user_bookings(self, user_id: str) -> List[dict]:
-        print(f"\n[DEBUG] ====== GETTING USER BOOKINGS ======")
-        print(f"[DEBUG] Fetching bookings for user {user_id}")
-        bookings = execute_query(
-            "SELECT * FROM bookings WHERE customer_id = ? ORDER BY created_at DESC",
-            (user_id,)
-        )
-        print(f"[DEBUG] Found {len(bookings)} bookings")
-        
-        # Map database column names to our model field names
-        for booking in bookings:
-            booking['user_id'] = booking.pop('customer_id')
-            booking['date'] = booking.pop('service_date')
-            booking['time'] = booking.pop('service_time')
-            booking['description'] = booking.pop('notes')
-            booking['images'] = []  # Add empty images list since it's not in DB
-            
-            print("\n[DEBUG] Booking details:")
-            for key, value in booking.items():
-                print(f"  {key}: {value}")
-                
-        print("[DEBUG] ====== USER BOOKINGS RETRIEVED ======\n")
+    def _insert_booking(
+        self,
+        booking_id: str,
+        user_id: str,
+        provider_id: str,
+        start: datetime,
+        duration: int,
+        booking_data: BookingCreate,
+        image_urls: List[str]
+    ) -> BookingRecord:
+        """Check, insert and claim the slot in one write transaction.
+
+        Unknown users/providers are 404 and overlaps 409. Concurrent bookings are serialized
+        (by BEGIN IMMEDIATE on SQLite, by locking the provider row on PostgreSQL), and
+        idx_bookings_active_slot backs the overlap check up.
+        """
+        end = start + timedelta(minutes=duration)
+        now = datetime.utcnow()
+        with transaction() as conn:
+            if not conn.execute("SELECT 1 FROM users WHERE id = ?", (user_id,)).fetchone():
+                logger.warning("User %s not found", user_id)
+                raise HTTPException(status_code=404, detail="User not found")
+            if not conn.execute(f"SELECT 1 FROM providers WHERE id = ?{backend.for_update}", (provider_id,)).fetchone():
+                logger.warning("Provider %s not found", provider_id)
+                raise HTTPException(status_code=404, detail="Provider not found")
+
+            # Only enforced for providers whose working hours could be parsed
+            hours = provider_hours(conn, provider_id)
+            if hours and not covers(hours, start, end):
+                raise HTTPException(status_code=409, detail="Requested time is outside the provider's working hours")
+
+            conflict = find_conflict(conn, provider_id, start, end)
+            if conflict:
+                logger.info("Booking slot %s for provider %s overlaps booking %s", format_slot(start), provider_id, conflict)
+                raise HTTPException(status_code=409, detail=SLOT_TAKEN_DETAIL)
+
+            try:
+                conn.execute(
+                    """
+                    INSERT INTO bookings (
+                        id, customer_id, provider_id, service_date, service_time, duration_minutes,
+                        location, notes, status, images, created_at, updated_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        booking_id,
+                        user_id,
+                        provider_id,
+                        start.strftime("%Y-%m-%d"),
+                        start.strftime("%H:%M"),
+                        duration,
+                        booking_data.location,
+                        booking_data.description,
+                        "pending",
+                        json.dumps(image_urls),
+                        now,
+                        now
+                    )
+                )
+            except IntegrityError as e:
+                if not is_unique_violation(e):
+                    raise
+                raise HTTPException(status_code=409, detail=SLOT_TAKEN_DETAIL)
+            conn.execute(
+                "INSERT INTO booking_slots (booking_id, provider_id, start_at, end_at) VALUES (?, ?, ?, ?)",
+                (booking_id, provider_id, format_slot(start), format_slot(end))
+            )
+            # Read back through the repository so the customer/provider details come along
+            return BookingRepository(conn).get(booking_id)
+
+    def get_user_bookings(self, user_id: str, limit: Optional[int] = None, cursor: Optional[str] = None) -> List[BookingRecord]:
+        bookings = BookingRepository().for_customer(user_id, limit, cursor)
+        logger.debug("Found %d bookings for user %s", len(bookings), user_id)
+        log_rows(logger, "User booking", bookings)
         return bookings
 
-    def get_provider_bookings(self, provider_id: str) -> List[dict]:
-        print(f"\n[DEBUG] ====== GETTING PROVIDER BOOKINGS ======")
-        print(f"[DEBUG] Fetching bookings for provider {provider_id}")
-        bookings = execute_query(
-            "SELECT * FROM bookings WHERE provider_id = ? ORDER BY created_at DESC",
-            (provider_id,)
-        )
-        print(f"[DEBUG] Found {len(bookings)} bookings")
-        
-        # Map database column names to our model field names
-        for booking in bookings:
-            booking['user_id'] = booking.pop('customer_id')
-            booking['date'] = booking.pop('service_date')
-            booking['time'] = booking.pop('service_time')
-            booking['description'] = booking.pop('notes')
-            booking['images'] = []  # Add empty images list since it's not in DB
-            
-            print("\n[DEBUG] Booking details:")
-            for key, value in booking.items():
-                print(f"  {key}: {value}")
-                
-        print("[DEBUG] ====== PROVIDER BOOKINGS RETRIEVED ======\n")
+    def get_provider_bookings(self, provider_id: str, limit: Optional[int] = None, cursor: Optional[str] = None) -> List[BookingRecord]:
+        bookings = BookingRepository().for_provider(provider_id, limit, cursor)
+        logger.debug("Found %d bookings for provider %s", len(bookings), provider_id)
+        log_rows(logger, "Provider booking", bookings)
         return bookings
 
-    def update_booking_status(self, booking_id: str, status: str) -> dict:
-        print(f"\n[DEBUG] ====== UPDATING BOOKING STATUS ======")
-        print(f"[DEBUG] Updating booking {booking_id} to status: {status}")
-        
-        # Get current booking data
-        booking = execute_query_one(
-            "SELECT * FROM bookings WHERE id = ?",
-            (booking_id,)
-        )
-        if not booking:
-            print(f"[ERROR] Booking {booking_id} not found")
-            raise HTTPException(status_code=404, detail="Booking not found")
-        
-        # Map database column names to our model field names
-        booking['user_id'] = booking.pop('customer_id')
-        booking['date'] = booking.pop('service_date')
-        booking['time'] = booking.pop('service_time')
-        booking['description'] = booking.pop('notes')
-        booking['images'] = []  # Add empty images list since it's not in DB
-            
-        print("[DEBUG] Current booking data:")
-        for key, value in booking.items():
-            print(f"  {key}: {value}")
+    def get_all_bookings(self, limit: Optional[int] = None, cursor: Optional[str] = None) -> List[BookingRecord]:
+        bookings = BookingRepository().fetch_many(limit=limit, cursor=cursor)
+        log_rows(logger, "Booking row", bookings)
+        return bookings
 
+    def iter_all_bookings(self, limit: Optional[int] = None, cursor: Optional[str] = None) -> Iterator[BookingRecord]:
+        """Stream bookings from the database cursor instead of materializing the listing"""
+        return BookingRepository().iterate(limit=limit, cursor=cursor)
+
+    def update_booking_status(self, booking_id: str, status: str) -> BookingRecord:
+        """Move one booking to status: 404 if it does not exist, 409 if the transition is not allowed"""
+        logger.debug("Updating booking %s to status %s", booking_id, status)
+        with transaction() as conn:
+            result = self._transition(conn, [booking_id], status)[0][0]
+            if result["outcome"] == "not_found":
+                logger.warning("Booking %s not found", booking_id)
+                raise HTTPException(status_code=404, detail="Booking not found")
+            if result["outcome"] == "invalid_transition":
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Cannot change a {result['status']} booking to {status}"
+                )
+            updated_booking = BookingRepository(conn).get(booking_id)
+
+        logger.info("Booking %s status changed to %s", booking_id, status)
+        return updated_booking
+
+    def bulk_update_status(
+        self,
+        status: str,
+        ids: Optional[List[str]] = None,
+        provider_id: Optional[str] = None,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None,
+        current_status: Optional[str] = None,
+        limit: int = BULK_STATUS_LIMIT,
+        owner_id: Optional[str] = None
+    ) -> dict:
+        """Move many bookings to status in one transaction, with an outcome per booking.
+
+        Either ids, or a provider_id with an optional date range / current status, in which
+        case only bookings that can make the transition are picked, at most limit of them.
+        With owner_id, every booking in ids must belong to that provider (403 otherwise).
+        """
+        with transaction() as conn:
+            has_more = False
+            if ids is not None and owner_id is not None:
+                self._check_owner(conn, ids, owner_id)
+            if ids is None:
+                conditions = ["provider_id = ?", f"status IN ({', '.join('?' for _ in self._sources(status))})"]
+                params = [provider_id, *self._sources(status)]
+                if current_status:
+                    conditions.append("status = ?")
+                    params.append(current_status)
+                if from_date:
+                    conditions.append("service_date >= ?")
+                    params.append(from_date)
+                if to_date:
+                    conditions.append("service_date <= ?")
+                    params.append(to_date)
+                rows = conn.execute(
+                    f"SELECT id FROM bookings WHERE {' AND '.join(conditions)} "
+                    f"ORDER BY service_date, service_time, id LIMIT ?",
+                    (*params, limit + 1)
+                ).fetchall()
+                has_more = len(rows) > limit
+                ids = [row[0] for row in rows[:limit]]
+            results, updated = self._transition(conn, ids, status)
+
+        logger.info("Bulk status change to %s: %d of %d bookings updated", status, updated, len(results))
+        return {"status": status, "updated": updated, "results": results, "has_more": has_more}
+
+    @staticmethod
+    def _check_owner(conn, ids: List[str], provider_id: str):
+        """403 unless every existing booking in ids belongs to provider_id"""
+        for start in range(0, len(ids), IN_CLAUSE_CHUNK_SIZE):
+            chunk = ids[start:start + IN_CLAUSE_CHUNK_SIZE]
+            foreign = conn.execute(
+                f"SELECT 1 FROM bookings WHERE id IN ({', '.join('?' for _ in chunk)}) AND provider_id <> ? LIMIT 1",
+                (*chunk, provider_id)
+            ).fetchone()
+            if foreign:
+                raise HTTPException(status_code=403, detail="Not allowed to change another provider's bookings")
+
+    @staticmethod
+    def _sources(status: str) -> List[str]:
+        return [source for source, targets in STATUS_TRANSITIONS.items() if status in targets]
+
+    def _transition(self, conn, ids: List[str], status: str):
+        """Apply status to the given bookings on conn; returns ([{id, outcome, status}], updated count)"""
+        ids = list(dict.fromkeys(ids))
+        sources = self._sources(status)
         now = datetime.utcnow()
-        print(f"\n[DEBUG] Updating with new data:")
-        print(f"  status: {status}")
-        print(f"  updated_at: {now}")
-        
-        execute_query(
-            "UPDATE bookings SET status = ?, updated_at = ? WHERE id = ?",
-            (status, now, booking_id)
-        )
-        
-        # Verify the update
-        updated_booking = execute_query_one(
-            "SELECT * FROM bookings WHERE id = ?",
-            (booking_id,)
-        )
-        
-        # Map database column names to our model field names
-        updated_booking['user_id'] = updated_booking.pop('customer_id')
-        updated_booking['date'] = updated_booking.pop('service_date')
-        updated_booking['time'] = updated_booking.pop('service_time')
-        updated_booking['description'] = updated_booking.pop('notes')
-        updated_booking['images'] = []  # Add empty images list since it's not in DB
-            
-        print("\n[DEBUG] Updated booking data:")
-        for key, value in updated_booking.items():
-            print(f"  {key}: {value}")
-            
-        print("[DEBUG] ====== BOOKING STATUS UPDATE COMPLETED ======\n")
-        return updated_booking 
\ No newline at end of file
+        updated = set()
+        # No booking can move to a status nothing transitions into (e.g. back to pending)
+        for start in range(0, len(ids) if sources else 0, IN_CLAUSE_CHUNK_SIZE):
+            chunk = ids[start:start + IN_CLAUSE_CHUNK_SIZE]
+            rows = conn.execute(
+                f"UPDATE bookings SET status = ?, updated_at = ? "
+                f"WHERE id IN ({', '.join('?' for _ in chunk)}) AND status IN ({', '.join('?' for _ in sources)}) "
+                f"RETURNING id",
+                (status, now, *chunk, *sources)
+            ).fetchall()
+            changed = [row[0] for row in rows]
+            updated.update(changed)
+            # Finished or cancelled bookings no longer hold their slot
+            if changed and status not in ACTIVE_STATUSES:
+                conn.execute(f"DELETE FROM booking_slots WHERE booking_id IN ({', '.join('?' for _ in changed)})", changed)
+
+        # Only the bookings left alone need a second look, to say why
+        current = {}
+        rest = [booking_id for booking_id in ids if booking_id not in updated]
+        for start in range(0, len(rest), IN_CLAUSE_CHUNK_SIZE):
+            chunk = rest[start:start + IN_CLAUSE_CHUNK_SIZE]
+            current.update(conn.execute(
+                f"SELECT id, status FROM bookings WHERE id IN ({', '.join('?' for _ in chunk)})", chunk
+            ).fetchall())
+
+        results = []
+        for booking_id in ids:
+            if booking_id in updated:
+                results.append({"id": booking_id, "outcome": "updated", "status": status})
+            elif booking_id not in current:
+                results.append({"id": booking_id, "outcome": "not_found", "status": None})
+            else:
+                outcome = "unchanged" if current[booking_id] == status else "invalid_transition"
+                results.append({"id": booking_id, "outcome": outcome, "status": current[booking_id]})
+        return results, len(updated)
@@ -0,0 +1,102 @@
+"""Per-provider booking counts by service month and status.
+
+provider_booking_stats holds one (provider_id, month, status) row with the number
+of bookings and their total minutes. Triggers on bookings (created by migration
+0010, and by its twin in migrations/postgres) keep it current inside the transaction
+of every insert, status change and delete (create_booking, status transitions, bulk
+imports alike), so the dashboard never scans bookings. rebuild_stats / verify_stats
+reconcile it with the raw table.
+"""
+import re
+from typing import List, Optional, Tuple, get_args
+from database import backend, execute_query
+from .models import BookingStatus
+
+BOOKING_STATUSES = get_args(BookingStatus)
+
+# Bookings whose service_date is not YYYY-MM-DD (free text from before validation) fall under this month
+UNDATED_MONTH = ""
+
+_MONTH_RE = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+
+def month_of(column: str) -> str:
+    """SQL expression for the YYYY-MM service month of a service_date column (as the triggers compute it)"""
+    if backend.name == "postgresql":
+        # Defined with the table and its trigger in migrations/postgres
+        return f"booking_month({column})"
+    return (
+        f"CASE WHEN {column} GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]' "
+        f"THEN substr({column}, 1, 7) ELSE '{UNDATED_MONTH}' END"
+    )
+
+
+# What provider_booking_stats should contain, straight from bookings
+_EXPECTED = f"""
+SELECT provider_id, {month_of('service_date')} AS month, status, COUNT(*) AS bookings, SUM(duration_minutes) AS minutes
+FROM bookings
+GROUP BY 1, 2, 3
+"""
+
+
+def verify_stats(conn, sample: int = 10) -> Tuple[int, List[tuple]]:
+    """(number of differing rows, up to sample of them) between the summary table and bookings.
+
+    Each sample row is (provider_id, month, status, bookings, minutes, source), source
+    being "bookings" for the true figures and "stats" for the stored ones.
+    """
+    rows = conn.execute(
+        f"""
+        SELECT *, 'bookings' FROM ({_EXPECTED} EXCEPT SELECT provider_id, month, status, bookings, minutes FROM provider_booking_stats) AS missing
+        UNION ALL
+        SELECT *, 'stats' FROM (SELECT provider_id, month, status, bookings, minutes FROM provider_booking_stats EXCEPT {_EXPECTED}) AS extra
+        ORDER BY 1, 2, 3, 6
+        """
+    ).fetchall()
+    return len(rows), [tuple(row) for row in rows[:sample]]
+
+
+def rebuild_stats(conn) -> int:
+    """Recompute the summary table from bookings; returns how many rows it now has"""
+    conn.execute("DELETE FROM provider_booking_stats")
+    conn.execute(f"INSERT INTO provider_booking_stats (provider_id, month, status, bookings, minutes) {_EXPECTED}")
+    return conn.execute("SELECT COUNT(*) FROM provider_booking_stats").fetchone()[0]
+
+
+def parse_month(value: str) -> str:
+    """YYYY-MM, or ValueError"""
+    if not _MONTH_RE.match(value):
+        raise ValueError(f"Invalid month {value!r}, expected YYYY-MM")
+    return value
+
+
+def _summary(month: Optional[str] = None) -> dict:
+    return {"month": month, "bookings": 0, "by_status": dict.fromkeys(BOOKING_STATUSES, 0), "completed_hours": 0.0}
+
+
+def get_provider_stats(provider_id: str, from_month: Optional[str] = None, to_month: Optional[str] = None) -> dict:
+    """Booking counts by status and by service month, plus completed hours; O(months) rows read"""
+    conditions = ["provider_id = ?"]
+    params = [provider_id]
+    if from_month:
+        conditions.append("month >= ?")
+        params.append(from_month)
+    if to_month:
+        conditions.append("month <= ?")
+        params.append(to_month)
+    rows = execute_query(
+        f"SELECT month, status, bookings, minutes FROM provider_booking_stats WHERE {' AND '.join(conditions)} ORDER BY month",
+        tuple(params)
+    )
+
+    totals = _summary()
+    months = {}
+    for row in rows:
+        month = months.setdefault(row["month"], _summary(row["month"] or None))
+        for summary in (totals, month):
+            summary["bookings"] += row["bookings"]
+            summary["by_status"][row["status"]] = summary["by_status"].get(row["status"], 0) + row["bookings"]
+            if row["status"] == "completed":
+                summary["completed_hours"] += row["minutes"] / 60
+    del totals["month"]
+    return {"provider_id": provider_id, **totals, "by_month": list(months.values())}
@@ -0,0 +1,16 @@
+from typing import List, Literal
+from pydantic import BaseModel
+
+EntityName = Literal["users", "providers", "bookings"]
+DataFormat = Literal["csv", "ndjson"]
+
+class RowError(BaseModel):
+    line: int
+    error: str
+
+class ImportReport(BaseModel):
+    received: int
+    inserted: int
+    failed: int
+    errors: List[RowError]  # the first MAX_REPORTED_ERRORS failures
+    errors_truncated: bool
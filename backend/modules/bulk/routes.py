@@ -0,0 +1,38 @@
+import logging
+from typing import Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.responses import StreamingResponse
+from database import run_db
+from ..utils import require_admin
+from .models import DataFormat, EntityName, ImportReport
+from .service import IMPORT_BATCH_SIZE, MEDIA_TYPES, detect_format, export_records, import_records
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+@router.post("/import/{entity}", response_model=ImportReport)
+async def import_data(
+    entity: EntityName,
+    file: UploadFile = File(...),
+    format: Optional[DataFormat] = None,
+    batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=50000)
+):
+    """Import users, providers or bookings from a CSV or NDJSON file (format defaults to the file extension)"""
+    try:
+        fmt = detect_format(file.filename, format)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    logger.info("Bulk import requested", extra={"entity": entity, "format": fmt, "upload": file.filename})
+    return await run_db(import_records, entity, file.file, fmt, batch_size)
+
+@router.get("/export/{entity}")
+async def export_data(entity: EntityName, format: DataFormat = "ndjson", include_password_hashes: bool = False):
+    """Stream every row of an entity, oldest first; the output can be imported again as is
+    (users and providers only with include_password_hashes=true, which is off by default)
+    """
+    return StreamingResponse(
+        export_records(entity, format, include_password_hashes),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{entity}.{format}"'}
+    )
@@ -0,0 +1,423 @@
+import csv
+import io
+import json
+import logging
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Any, BinaryIO, Callable, Iterator, List, NamedTuple, Optional, Tuple, get_args
+from uuid import uuid4
+from dotenv import load_dotenv
+from database import IntegrityError, iter_query, transaction
+from ..providers.models import BusinessDetails
+from ..bookings.models import BookingStatus
+from ..bookings.repository import BOOKING_FIELDS
+from ..providers.geocoding import geocode
+from ..providers.hours import parse_working_hours
+from ..bookings.availability import (
+    ACTIVE_STATUSES,
+    BOOKING_DURATION_MINUTES,
+    MAX_BOOKING_DURATION_MINUTES,
+    format_slot,
+    parse_service_date,
+    parse_service_time,
+)
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Bulk import/export of users, providers and bookings as CSV or NDJSON.
+# Rows are validated in Python and inserted with executemany, one transaction per batch;
+# a batch that hits a constraint is retried row by row so every bad row is reported.
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "20000"))
+# Per-row errors kept in an import report; the counts stay exact beyond this
+MAX_REPORTED_ERRORS = 100
+EXPORT_CHUNK_SIZE = 1000
+
+FORMATS = ("csv", "ndjson")
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+SERVICE_TYPES = get_args(BusinessDetails.model_fields["service_type"].annotation)
+BOOKING_STATUSES = get_args(BookingStatus)
+
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+_BCRYPT_RE = re.compile(r"^\$2[aby]\$\d{2}\$[./A-Za-z0-9]{53}$")
+_TRUE = ("1", "true", "yes", "y", "t")
+_FALSE = ("0", "false", "no", "n", "f")
+
+
+# Inserted columns, in the order the matching _prepare_* function returns values
+USER_COLUMNS = ("id", "email", "full_name", "password", "is_active", "created_at", "updated_at")
+PROVIDER_COLUMNS = (
+    "id", "email", "full_name", "password", "phone", "business_name", "service_type", "hourly_rate",
+    "location", "latitude", "longitude", "working_hours", "is_verified", "is_active",
+    "sa_front_id", "sa_back_id", "profile_photo", "created_at", "updated_at",
+)
+BOOKING_COLUMNS = (
+    "id", "customer_id", "provider_id", "service_date", "service_time", "duration_minutes",
+    "location", "notes", "status", "images", "created_at", "updated_at",
+)
+
+
+class Entity(NamedTuple):
+    table: str
+    columns: Tuple[str, ...]
+    prepare: Callable[[dict, datetime], tuple]  # record -> row; raises ValueError
+    export_query: str  # columns aliased to the import field names, so exports re-import as is
+    after_insert: Optional[Callable[[Any, List[tuple]], None]] = None  # (conn, inserted rows)
+
+
+def detect_format(filename: Optional[str], explicit: Optional[str] = None) -> str:
+    """csv or ndjson, from the explicit choice or the file extension (default ndjson)"""
+    fmt = (explicit or os.path.splitext(filename or "")[1].lstrip(".") or "ndjson").lower()
+    fmt = {"jsonl": "ndjson", "json": "ndjson"}.get(fmt, fmt)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format {fmt!r}, expected one of: {', '.join(FORMATS)}")
+    return fmt
+
+
+# Field readers: CSV gives "" for a missing value, NDJSON gives null or omits the key
+
+def _value(record: dict, name: str, *aliases: str):
+    for key in (name, *aliases):
+        value = record.get(key)
+        if isinstance(value, str):
+            value = value.strip()
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _required(record: dict, name: str, *aliases: str):
+    value = _value(record, name, *aliases)
+    if value is None:
+        raise ValueError(f"{name} is required")
+    return value
+
+
+def _text(record: dict, name: str, *aliases: str) -> Optional[str]:
+    value = _value(record, name, *aliases)
+    return None if value is None else str(value)
+
+
+def _number(record: dict, name: str, cast=float, default=None):
+    value = _value(record, name)
+    if value is None:
+        return default
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number")
+
+
+def _flag(record: dict, name: str, default: bool) -> bool:
+    value = _value(record, name)
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    if str(value).lower() in _TRUE:
+        return True
+    if str(value).lower() in _FALSE:
+        return False
+    raise ValueError(f"{name} must be true or false")
+
+
+def _timestamp(record: dict, name: str, default: datetime) -> datetime:
+    value = _value(record, name)
+    if value is None:
+        return default
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 timestamp")
+
+
+def _account(record: dict) -> tuple:
+    """Fields shared by users and providers"""
+    email = str(_required(record, "email"))
+    if not _EMAIL_RE.match(email):
+        raise ValueError("email is not a valid address")
+    # Hashing plaintext here would cost ~0.25 s per row; imports carry bcrypt hashes
+    password = str(_required(record, "password", "password_hash"))
+    if not _BCRYPT_RE.match(password):
+        raise ValueError("password must be a bcrypt hash")
+    return (
+        _text(record, "id") or str(uuid4()),
+        email,
+        str(_required(record, "full_name")),
+        password,
+    )
+
+
+def _prepare_user(record: dict, now: datetime) -> tuple:
+    return (
+        *_account(record),
+        _flag(record, "is_active", True),
+        _timestamp(record, "created_at", now),
+        _timestamp(record, "updated_at", now),
+    )
+
+
+def _prepare_provider(record: dict, now: datetime) -> tuple:
+    service_type = _text(record, "service_type")
+    if service_type is not None and service_type not in SERVICE_TYPES:
+        raise ValueError(f"service_type must be one of: {', '.join(SERVICE_TYPES)}")
+    hourly_rate = _number(record, "hourly_rate")
+    if hourly_rate is not None and hourly_rate <= 0:
+        raise ValueError("hourly_rate must be positive")
+    location = _text(record, "location")
+    latitude, longitude = _number(record, "latitude"), _number(record, "longitude")
+    if latitude is None or longitude is None:
+        latitude, longitude = geocode(location) or (None, None)
+    return (
+        *_account(record),
+        _text(record, "phone"),
+        _text(record, "business_name"),
+        service_type,
+        hourly_rate,
+        location,
+        latitude,
+        longitude,
+        _text(record, "working_hours"),
+        _flag(record, "is_verified", False),
+        _flag(record, "is_active", True),
+        _text(record, "sa_front_id"),
+        _text(record, "sa_back_id"),
+        _text(record, "profile_photo"),
+        _timestamp(record, "created_at", now),
+        _timestamp(record, "updated_at", now),
+    )
+
+
+def _insert_provider_hours(conn, rows: List[tuple]):
+    column = PROVIDER_COLUMNS.index("working_hours")
+    conn.executemany(
+        "INSERT INTO provider_hours (provider_id, weekday, start_minute, end_minute) VALUES (?, ?, ?, ?)",
+        [(row[0], *interval) for row in rows for interval in parse_working_hours(row[column])]
+    )
+
+
+def _prepare_booking(record: dict, now: datetime) -> tuple:
+    try:
+        service_date = parse_service_date(_required(record, "date", "service_date"))
+        service_time = parse_service_time(_required(record, "time", "service_time"))
+    except ValueError as e:
+        if "required" in str(e):
+            raise
+        raise ValueError("date/time must be YYYY-MM-DD and HH:MM")
+    duration = _number(record, "duration_minutes", int, BOOKING_DURATION_MINUTES)
+    if not 15 <= duration <= MAX_BOOKING_DURATION_MINUTES:
+        raise ValueError(f"duration_minutes must be between 15 and {MAX_BOOKING_DURATION_MINUTES}")
+    status = _text(record, "status") or "pending"
+    if status not in BOOKING_STATUSES:
+        raise ValueError(f"status must be one of: {', '.join(BOOKING_STATUSES)}")
+    images = _value(record, "images") or []
+    if isinstance(images, str):
+        try:
+            images = json.loads(images)
+        except ValueError:
+            raise ValueError("images must be a JSON list of URLs")
+    if not isinstance(images, list) or not all(isinstance(url, str) for url in images):
+        raise ValueError("images must be a JSON list of URLs")
+    return (
+        _text(record, "id") or str(uuid4()),
+        str(_required(record, "user_id", "customer_id")),
+        str(_required(record, "provider_id")),
+        service_date.isoformat(),
+        service_time.strftime("%H:%M"),
+        duration,
+        str(_required(record, "location")),
+        _text(record, "description", "notes"),
+        status,
+        json.dumps(images),
+        _timestamp(record, "created_at", now),
+        _timestamp(record, "updated_at", now),
+    )
+
+
+def _insert_booking_slots(conn, rows: List[tuple]):
+    # Only active bookings hold a slot
+    slots = []
+    for row in rows:
+        booking = dict(zip(BOOKING_COLUMNS, row))
+        if booking["status"] in ACTIVE_STATUSES:
+            start = datetime.fromisoformat(f"{booking['service_date']} {booking['service_time']}")
+            end = start + timedelta(minutes=booking["duration_minutes"])
+            slots.append((booking["id"], booking["provider_id"], format_slot(start), format_slot(end)))
+    conn.executemany("INSERT INTO booking_slots (booking_id, provider_id, start_at, end_at) VALUES (?, ?, ?, ?)", slots)
+
+
+ENTITIES = {
+    "users": Entity(
+        table="users",
+        columns=USER_COLUMNS,
+        prepare=_prepare_user,
+        export_query="SELECT id, email, full_name, password, is_active, created_at, updated_at FROM users ORDER BY created_at, id",
+    ),
+    "providers": Entity(
+        table="providers",
+        columns=PROVIDER_COLUMNS,
+        prepare=_prepare_provider,
+        export_query="""
+        SELECT id, email, full_name, password, phone, business_name, service_type, hourly_rate,
+               location, latitude, longitude, working_hours, is_verified, is_active,
+               sa_front_id, sa_back_id, profile_photo, created_at, updated_at
+        FROM providers ORDER BY created_at, id
+        """,
+        after_insert=_insert_provider_hours,
+    ),
+    "bookings": Entity(
+        table="bookings",
+        columns=BOOKING_COLUMNS,
+        prepare=_prepare_booking,
+        export_query=f"SELECT {BOOKING_FIELDS} FROM bookings b ORDER BY b.created_at, b.id",
+        after_insert=_insert_booking_slots,
+    ),
+}
+
+
+def _read_rows(stream: BinaryIO, fmt: str) -> Iterator[Tuple[int, object]]:
+    """(line number, raw record) pairs; NDJSON lines are decoded later so bad JSON is a row error"""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(text)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_number, line in enumerate(text, 1):
+                if line.strip():
+                    yield line_number, line
+    finally:
+        # Leave the underlying stream open for its owner
+        text.detach()
+
+
+def _decode(raw) -> dict:
+    if isinstance(raw, dict):
+        return raw
+    try:
+        record = json.loads(raw)
+    except ValueError as e:
+        raise ValueError(f"invalid JSON: {e}")
+    if not isinstance(record, dict):
+        raise ValueError("each line must be a JSON object")
+    return record
+
+
+class _Report:
+    def __init__(self):
+        self.received = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, line: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self) -> dict:
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda error: error["line"]),
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def _insert_batch(entity: Entity, batch: List[Tuple[int, tuple]], report: _Report):
+    query = f"INSERT INTO {entity.table} ({', '.join(entity.columns)}) VALUES ({', '.join('?' for _ in entity.columns)})"
+    # Inserting in primary-key order keeps the b-tree writes of a batch on neighbouring pages
+    batch = sorted(batch, key=lambda item: item[1][0])
+    # No batch-wide SAVEPOINT: with triggers on the table (bookings) its in-memory statement
+    # journal makes the insert quadratic in the batch size. A failed batch rolls back whole.
+    try:
+        with transaction() as conn:
+            conn.executemany(query, [row for _, row in batch])
+            if entity.after_insert:
+                entity.after_insert(conn, [row for _, row in batch])
+        report.inserted += len(batch)
+        return
+    except IntegrityError:
+        pass
+    # Some row broke a constraint (duplicate, unknown reference, taken slot): find which
+    with transaction() as conn:
+        for line, row in batch:
+            conn.execute("SAVEPOINT import_row")
+            try:
+                conn.execute(query, row)
+                if entity.after_insert:
+                    entity.after_insert(conn, [row])
+                conn.execute("RELEASE import_row")
+                report.inserted += 1
+            except IntegrityError as e:
+                conn.execute("ROLLBACK TO import_row")
+                conn.execute("RELEASE import_row")
+                report.error(line, str(e))
+
+
+def import_records(entity_name: str, stream: BinaryIO, fmt: str, batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """Import a CSV/NDJSON stream of one entity; returns counts and the first per-row errors.
+
+    Each batch commits on its own, so rows before a crash stay imported. Bookings are not
+    checked against working hours or overlapping bookings, but the active-slot index still applies.
+    """
+    entity = ENTITIES[entity_name]
+    report = _Report()
+    now = datetime.utcnow()
+    batch = []
+    for line, raw in _read_rows(stream, fmt):
+        report.received += 1
+        try:
+            batch.append((line, entity.prepare(_decode(raw), now)))
+        except ValueError as e:
+            report.error(line, str(e))
+            continue
+        if len(batch) >= batch_size:
+            _insert_batch(entity, batch, report)
+            batch = []
+    if batch:
+        _insert_batch(entity, batch, report)
+    logger.info(
+        "Imported %s",
+        entity_name,
+        extra={"format": fmt, "received": report.received, "inserted": report.inserted, "failed": report.failed},
+    )
+    return report.as_dict()
+
+
+def export_records(entity_name: str, fmt: str, include_password_hashes: bool = False) -> Iterator[str]:
+    """Stream every row of an entity as CSV or NDJSON text chunks, oldest first.
+
+    Account hashes are left out unless asked for; without them users and
+    providers cannot be re-imported.
+    """
+    entity = ENTITIES[entity_name]
+    rows = iter_query(entity.export_query, chunk_size=EXPORT_CHUNK_SIZE)
+    buffer = io.StringIO()
+    writer = None
+    count = 0
+    for row in rows:
+        if not include_password_hashes:
+            row.pop("password", None)
+        if "images" in row and fmt == "ndjson":
+            row["images"] = json.loads(row["images"] or "[]")
+        if fmt == "csv":
+            if writer is None:
+                writer = csv.DictWriter(buffer, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps(row, default=str) + "\n")
+        count += 1
+        if count % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
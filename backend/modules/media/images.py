@@ -0,0 +1,175 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+from dotenv import load_dotenv
+from .storage import STORAGE_ROOT, parse_blob_name, referenced_relpaths, relpath_for_url, url_for
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it no derivatives are generated
+    Image = None
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Derivatives: name -> longest edge in pixels. Each is written in every supported format.
+IMAGE_VARIANTS = {"thumb": 96, "small": 320, "medium": 800}
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+# Derivative jobs allowed in flight; beyond that uploads are left for `manage.py generate-variants`
+IMAGE_MAX_PENDING = int(os.getenv("IMAGE_MAX_PENDING", "256"))
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp", ".tif", ".tiff", ".avif"}
+
+
+def _supported_formats() -> List[str]:
+    if Image is None:
+        return []
+    Image.init()
+    extensions = Image.registered_extensions()
+    return [fmt for fmt in ("webp", "avif") if f".{fmt}" in extensions]
+
+
+VARIANT_FORMATS = _supported_formats()
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def variant_relpath(relpath: str, variant: str, fmt: str) -> str:
+    """ab/cd/<hash>.jpg -> ab/cd/<hash>-<variant>.<fmt>"""
+    directory, name = relpath.rsplit("/", 1)
+    sha256, _, _ = parse_blob_name(name)
+    return f"{directory}/{sha256}-{variant}.{fmt}"
+
+
+def _source_relpath(url: Optional[str]) -> Optional[str]:
+    relpath = relpath_for_url(url)
+    if not relpath or "/" not in relpath:
+        return None
+    parsed = parse_blob_name(relpath.rsplit("/", 1)[1])
+    if not parsed or parsed[1] or parsed[2] not in IMAGE_EXTENSIONS:
+        return None
+    return relpath
+
+
+def variant_urls(url: Optional[str]) -> Optional[Dict[str, Dict[str, str]]]:
+    """Derivative URLs for a stored image, as {variant: {format: url}}.
+
+    Names are derived from the original's hash, so no lookup is needed; a derivative
+    may still be in progress right after the upload.
+    """
+    relpath = _source_relpath(url)
+    if relpath is None or not VARIANT_FORMATS:
+        return None
+    return {
+        variant: {fmt: url_for(variant_relpath(relpath, variant, fmt)) for fmt in VARIANT_FORMATS}
+        for variant in IMAGE_VARIANTS
+    }
+
+
+def generate_variants(relpath: str) -> int:
+    """Write the missing derivatives of one stored image; returns how many were written"""
+    source = os.path.join(STORAGE_ROOT, relpath)
+    targets = [
+        (variant, size, fmt, os.path.join(STORAGE_ROOT, variant_relpath(relpath, variant, fmt)))
+        for variant, size in IMAGE_VARIANTS.items()
+        for fmt in VARIANT_FORMATS
+    ]
+    targets = [target for target in targets if not os.path.exists(target[3])]
+    if not targets:
+        return 0
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        for variant, size, fmt, path in targets:
+            derivative = image.copy()
+            derivative.thumbnail((size, size))
+            tmp_path = f"{path}.{os.getpid()}.part"
+            try:
+                derivative.save(tmp_path, format=fmt.upper(), quality=IMAGE_QUALITY)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+    return len(targets)
+
+
+def backfill_variants() -> dict:
+    """Generate missing derivatives for every referenced image, in this process"""
+    stats = {"images": 0, "written": 0, "failed": 0}
+    if not VARIANT_FORMATS:
+        return stats
+    for relpath in sorted(referenced_relpaths()):
+        if _source_relpath(url_for(relpath)) is None:
+            continue
+        stats["images"] += 1
+        try:
+            stats["written"] += generate_variants(relpath)
+        except Exception as e:
+            stats["failed"] += 1
+            logger.warning("Image derivative generation failed for %s: %s", relpath, e)
+    return stats
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=IMAGE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def _job_done(future):
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+    error = future.exception()
+    if error is not None:
+        logger.warning("Image derivative generation failed: %s", error)
+
+
+def schedule_variants(urls: Iterable[Optional[str]]):
+    """Queue derivative generation for stored images without waiting for it"""
+    global _pending
+    if not VARIANT_FORMATS:
+        return
+    for url in urls:
+        relpath = _source_relpath(url)
+        if relpath is None:
+            continue
+        with _pending_lock:
+            if _pending >= IMAGE_MAX_PENDING:
+                logger.warning("Image derivative queue full, skipping %s", relpath)
+                continue
+            _pending += 1
+        try:
+            future = _get_executor().submit(generate_variants, relpath)
+        except Exception:
+            with _pending_lock:
+                _pending -= 1
+            raise
+        future.add_done_callback(_job_done)
+
+
+def image_pool_stats():
+    with _pending_lock:
+        return {"workers": IMAGE_WORKERS, "pending": _pending, "max_pending": IMAGE_MAX_PENDING, "formats": VARIANT_FORMATS}
+
+
+def shutdown_image_pool():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
@@ -0,0 +1,212 @@
+import mimetypes
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+from dotenv import load_dotenv
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from fastapi.responses import FileResponse, StreamingResponse
+from .storage import STORAGE_ROOT, STORAGE_URL_PREFIX, parse_blob_name
+
+load_dotenv()
+
+router = APIRouter(prefix=STORAGE_URL_PREFIX, tags=["media"], include_in_schema=False)
+
+# Content-addressed files never change under the same URL; anything else must be revalidated
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MUTABLE_CACHE_CONTROL = "public, no-cache"
+# A missing derivative falls back to the original for a short while (the worker may still be on it)
+FALLBACK_CACHE_CONTROL = "public, max-age=60"
+
+# Serve .br/.gz siblings of compressible files when the client accepts them
+MEDIA_PRECOMPRESSED = os.getenv("MEDIA_PRECOMPRESSED", "true").lower() in ("1", "true", "yes")
+# When set (e.g. "/_media/"), hand the body to nginx via X-Accel-Redirect instead of streaming it
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX", "")
+
+CHUNK_SIZE = 64 * 1024
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+COMPRESSIBLE_TYPES = {"image/svg+xml", "image/bmp", "image/tiff", "application/json", "application/pdf"}
+
+_SHARD_RE = re.compile(r"^[0-9a-f]{2}$")
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _resolve(path: str) -> str:
+    """Filesystem path for a URL path under the storage root; 404 for anything outside it"""
+    parts = path.split("/")
+    if not path or any(part in ("", ".", "..") or part.startswith(".") for part in parts):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    return os.path.join(STORAGE_ROOT, *parts)
+
+
+def _content_address(path: str) -> Optional[Tuple[str, str, str]]:
+    """(sha256, variant, ext) when path is ab/cd/<sha256>..., else None"""
+    parts = path.split("/")
+    if len(parts) != 3 or not all(_SHARD_RE.match(part) for part in parts[:2]):
+        return None
+    parsed = parse_blob_name(parts[2])
+    if not parsed or parsed[0][:2] != parts[0] or parsed[0][2:4] != parts[1]:
+        return None
+    return parsed
+
+
+def _original_for(file_path: str, sha256: str) -> Optional[str]:
+    """The original a derivative was made from (same shard, same hash, no variant suffix)"""
+    directory = os.path.dirname(file_path)
+    try:
+        for entry in os.scandir(directory):
+            parsed = parse_blob_name(entry.name)
+            if parsed and parsed[0] == sha256 and not parsed[1]:
+                return entry.path
+    except FileNotFoundError:
+        pass
+    return None
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison: W/"x" matches "x"
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) for a single byte range; None to ignore the header.
+
+    Raises 416 for a syntactically valid range that lies outside the file.
+    Multi-range requests are answered with the full body, which RFC 9110 allows.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size or size == 0:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+def _iter_range(path: str, start: int, end: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _compressible(media_type: str) -> bool:
+    return MEDIA_PRECOMPRESSED and (media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES)
+
+
+def _precompressed(request: Request, file_path: str, media_type: str) -> Tuple[str, Optional[str]]:
+    """(path, content-encoding) of the best precompressed sibling the client accepts"""
+    if not _compressible(media_type):
+        return file_path, None
+    accepted = request.headers.get("accept-encoding", "")
+    for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+        if encoding in accepted and os.path.isfile(file_path + suffix):
+            return file_path + suffix, encoding
+    return file_path, None
+
+
+@router.api_route("/{path:path}", methods=["GET", "HEAD"])
+def serve_upload(path: str, request: Request):
+    """Serve a stored upload with validators, long-lived caching for hashed URLs and ranges"""
+    file_path = _resolve(path)
+    address = _content_address(path)
+    cache_control = IMMUTABLE_CACHE_CONTROL if address else MUTABLE_CACHE_CONTROL
+
+    try:
+        stat_result = os.stat(file_path)
+    except FileNotFoundError:
+        original = _original_for(file_path, address[0]) if address and address[1] else None
+        if original is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+        file_path, address, cache_control = original, None, FALLBACK_CACHE_CONTROL
+        stat_result = os.stat(file_path)
+
+    media_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+    file_path, content_encoding = _precompressed(request, file_path, media_type)
+    if content_encoding:
+        stat_result = os.stat(file_path)
+
+    # The content hash is the ideal strong validator; other files fall back to size + mtime
+    if address and not address[1] and not content_encoding:
+        etag = f'"{address[0]}"'
+    else:
+        etag = f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}{"-" + content_encoding if content_encoding else ""}"'
+
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+    }
+    if content_encoding:
+        headers["Content-Encoding"] = content_encoding
+    if _compressible(media_type):
+        headers["Vary"] = "Accept-Encoding"
+
+    if _not_modified(request, etag, stat_result.st_mtime):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if MEDIA_ACCEL_REDIRECT_PREFIX:
+        # nginx serves the bytes (including ranges) with sendfile; only the headers come from here
+        relpath = os.path.relpath(file_path, STORAGE_ROOT).replace(os.sep, "/")
+        headers["X-Accel-Redirect"] = MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + relpath
+        return Response(media_type=media_type, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header and not content_encoding:
+        if_range = request.headers.get("if-range")
+        if if_range is None or if_range.strip() == etag:
+            byte_range = _parse_range(range_header, stat_result.st_size)
+
+    if byte_range is None:
+        return FileResponse(
+            file_path,
+            headers=headers,
+            media_type=media_type,
+            stat_result=stat_result,
+            method=request.method,
+        )
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+    headers["Content-Length"] = str(end - start + 1)
+    if request.method == "HEAD":
+        return Response(status_code=status.HTTP_206_PARTIAL_CONTENT, media_type=media_type, headers=headers)
+    return StreamingResponse(
+        _iter_range(file_path, start, end),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=media_type,
+        headers=headers,
+    )
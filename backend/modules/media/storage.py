@@ -0,0 +1,156 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from typing import Iterator, List, Optional, Sequence, Set, Tuple
+from dotenv import load_dotenv
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+from database import iter_query
+from .uploads import UploadBudget, copy_to_temp, discard_temp, safe_filename
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Content-addressed upload store: <root>/ab/cd/<sha256><ext>, served under STORAGE_URL_PREFIX.
+# Two levels of 256-way sharding keep every directory small even with millions of files.
+STORAGE_ROOT = os.getenv("UPLOAD_ROOT", "uploaded_images")
+STORAGE_URL_PREFIX = "/uploaded_images"
+# Uploads are spooled here first; same filesystem as the shards, so the final rename is atomic
+STORAGE_TMP_DIR = os.path.join(STORAGE_ROOT, ".tmp")
+# Unreferenced files younger than this are kept: their row may not be committed yet
+UPLOAD_GC_GRACE_SECONDS = int(os.getenv("UPLOAD_GC_GRACE_SECONDS", "3600"))
+
+_EXTENSION_RE = re.compile(r"^\.[a-z0-9]{1,8}$")
+_SHARD_RE = re.compile(r"^[0-9a-f]{2}$")
+# <sha256>[-<variant>][.<ext>]; variants are derivatives of the original with that hash
+_BLOB_RE = re.compile(r"^([0-9a-f]{64})(?:-([a-z]+))?(\.[a-z0-9]{1,8})?$")
+
+os.makedirs(STORAGE_ROOT, exist_ok=True)
+
+
+def _extension(filename: Optional[str]) -> str:
+    ext = os.path.splitext(safe_filename(filename))[1].lower()
+    return ext if _EXTENSION_RE.match(ext) else ""
+
+
+def blob_relpath(sha256: str, ext: str = "") -> str:
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}"
+
+
+def parse_blob_name(name: str) -> Optional[Tuple[str, str, str]]:
+    """(sha256, variant, ext) for a stored file name, variant/ext being "" when absent"""
+    match = _BLOB_RE.match(name)
+    if not match:
+        return None
+    return match.group(1), match.group(2) or "", match.group(3) or ""
+
+
+def url_for(relpath: str) -> str:
+    return f"{STORAGE_URL_PREFIX}/{relpath}"
+
+
+def relpath_for_url(url: Optional[str]) -> Optional[str]:
+    """Storage-relative path of a URL produced by url_for (None for anything else)"""
+    prefix = STORAGE_URL_PREFIX + "/"
+    if not url or not url.startswith(prefix):
+        return None
+    return url[len(prefix):]
+
+
+def _store_file(file: UploadFile, budget: Optional[UploadBudget]) -> str:
+    spooled = copy_to_temp(file, STORAGE_TMP_DIR, budget)
+    relpath = blob_relpath(spooled.sha256, _extension(file.filename))
+    dest = os.path.join(STORAGE_ROOT, relpath)
+    try:
+        # Identical content is stored once; refreshing the mtime keeps a concurrent GC
+        # pass from deleting the file before the new reference is committed
+        os.utime(dest)
+        discard_temp(spooled.path)
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.chmod(spooled.path, 0o644)
+        os.replace(spooled.path, dest)
+    return url_for(relpath)
+
+
+async def store_upload(file: UploadFile, budget: Optional[UploadBudget] = None) -> str:
+    """Store an upload under its content hash and return its public URL"""
+    return await run_in_threadpool(_store_file, file, budget)
+
+
+async def store_uploads(files: Sequence[UploadFile], budget: Optional[UploadBudget] = None) -> List[str]:
+    """Store several uploads concurrently, sharing one per-request budget.
+
+    Files already stored when another one fails are left for the GC; they may be
+    shared with existing rows, so they are never deleted here.
+    """
+    budget = budget or UploadBudget()
+    return list(await asyncio.gather(*(store_upload(file, budget) for file in files)))
+
+
+def referenced_relpaths() -> Set[str]:
+    """Every stored file some provider or booking row points at"""
+    referenced = set()
+    for row in iter_query("SELECT sa_front_id, sa_back_id, profile_photo FROM providers"):
+        referenced.update(relpath_for_url(url) for url in row.values())
+    for row in iter_query("SELECT images FROM bookings WHERE images != '[]'"):
+        referenced.update(relpath_for_url(url) for url in json.loads(row["images"] or "[]"))
+    referenced.discard(None)
+    return referenced
+
+
+def iter_blobs() -> Iterator[str]:
+    """Storage-relative paths of every content-addressed file and derivative (legacy flat files are skipped)"""
+    for first in os.scandir(STORAGE_ROOT):
+        if not (first.is_dir() and _SHARD_RE.match(first.name)):
+            continue
+        for second in os.scandir(first.path):
+            if not (second.is_dir() and _SHARD_RE.match(second.name)):
+                continue
+            for blob in os.scandir(second.path):
+                if blob.is_file() and _BLOB_RE.match(blob.name):
+                    yield f"{first.name}/{second.name}/{blob.name}"
+
+
+def collect_garbage(grace_seconds: int = UPLOAD_GC_GRACE_SECONDS, dry_run: bool = False) -> dict:
+    """Delete stored files no row references (with their derivatives), plus abandoned temp files"""
+    # Snapshot references before scanning: anything stored after this point is newer than the cutoff
+    referenced = referenced_relpaths()
+    referenced_hashes = {relpath.rsplit("/", 1)[-1][:64] for relpath in referenced}
+    cutoff = time.time() - grace_seconds
+    stats = {"scanned": 0, "referenced": 0, "removed": 0, "bytes_freed": 0, "temp_removed": 0}
+
+    for relpath in iter_blobs():
+        stats["scanned"] += 1
+        sha256, variant, _ = parse_blob_name(relpath.rsplit("/", 1)[1])
+        if relpath in referenced or (variant and sha256 in referenced_hashes):
+            stats["referenced"] += 1
+            continue
+        path = os.path.join(STORAGE_ROOT, relpath)
+        try:
+            st = os.stat(path)
+            if st.st_mtime >= cutoff:
+                continue
+            if not dry_run:
+                os.unlink(path)
+        except FileNotFoundError:
+            continue
+        stats["removed"] += 1
+        stats["bytes_freed"] += st.st_size
+
+    if os.path.isdir(STORAGE_TMP_DIR):
+        for entry in os.scandir(STORAGE_TMP_DIR):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    if not dry_run:
+                        os.unlink(entry.path)
+                    stats["temp_removed"] += 1
+            except FileNotFoundError:
+                continue
+
+    logger.info("Upload GC finished", extra={"dry_run": dry_run, **stats})
+    return stats
@@ -0,0 +1,139 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from typing import Callable, NamedTuple, Optional
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request, UploadFile, status
+from fastapi.routing import APIRoute
+
+load_dotenv()
+
+# Upload limits (bytes) and the chunk size used when copying an upload to disk
+UPLOAD_MAX_FILE_BYTES = int(os.getenv("UPLOAD_MAX_FILE_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_MAX_REQUEST_BYTES = int(os.getenv("UPLOAD_MAX_REQUEST_BYTES", str(30 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^\w.\- ]")
+
+
+def _too_large(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+
+
+def safe_filename(filename: Optional[str], default: str = "upload") -> str:
+    """Client-supplied filename reduced to a plain name inside the upload directory"""
+    name = os.path.basename((filename or "").replace("\\", "/"))
+    name = _UNSAFE_FILENAME_CHARS.sub("_", name).strip(" .")
+    return name or default
+
+
+class UploadBudget:
+    """Bytes still allowed for the current request, shared by its concurrent file writes"""
+
+    def __init__(self, max_bytes: int = UPLOAD_MAX_REQUEST_BYTES):
+        self.remaining = max_bytes
+        self._lock = threading.Lock()
+
+    def consume(self, nbytes: int):
+        with self._lock:
+            self.remaining -= nbytes
+            if self.remaining < 0:
+                raise _too_large("Upload exceeds the per-request size limit")
+
+
+async def limit_upload_request(request: Request):
+    """Route dependency marking an upload route for UploadLimitRoute.
+
+    Rejects requests whose declared body is already over the limit.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > UPLOAD_MAX_REQUEST_BYTES:
+        raise _too_large("Upload exceeds the per-request size limit")
+
+
+def _limited_receive(receive: Callable, max_bytes: int) -> Callable:
+    """ASGI receive channel raising 413 as soon as the request body passes max_bytes"""
+    received = 0
+
+    async def limited():
+        nonlocal received
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_bytes:
+                raise _too_large("Upload exceeds the per-request size limit")
+        return message
+
+    return limited
+
+
+class UploadLimitRoute(APIRoute):
+    """Route class capping the body of routes that depend on limit_upload_request.
+
+    FastAPI parses a multipart body before it resolves dependencies, so the cap is
+    enforced on the receive channel: an oversized upload, chunked ones without a
+    Content-Length included, is cut off at UPLOAD_MAX_REQUEST_BYTES instead of
+    being spooled in full first.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        if not any(depends.dependency is limit_upload_request for depends in self.dependencies):
+            return handler
+
+        async def limited_handler(request: Request):
+            await limit_upload_request(request)
+            return await handler(Request(request.scope, _limited_receive(request.receive, UPLOAD_MAX_REQUEST_BYTES)))
+
+        return limited_handler
+
+
+class SpooledUpload(NamedTuple):
+    path: str  # temporary file holding the complete upload
+    size: int
+    sha256: str
+
+
+def copy_to_temp(
+    file: UploadFile,
+    directory: str,
+    budget: Optional[UploadBudget] = None,
+    max_bytes: int = UPLOAD_MAX_FILE_BYTES,
+) -> SpooledUpload:
+    """Copy an upload in chunks to a temp file in directory, hashing it on the way.
+
+    Blocking; run it off the event loop. The caller moves the file into place
+    (a rename within directory is atomic) or deletes it.
+    """
+    os.makedirs(directory, exist_ok=True)
+    source = file.file
+    source.seek(0)
+    digest = hashlib.sha256()
+    written = 0
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = source.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise _too_large(f"File '{file.filename}' exceeds the {max_bytes} byte limit")
+                if budget is not None:
+                    budget.consume(len(chunk))
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        discard_temp(tmp_path)
+        raise
+    return SpooledUpload(tmp_path, written, digest.hexdigest())
+
+
+def discard_temp(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,54 @@
+import base64
+import json
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+
+# Keyset pagination over (created_at, id), newest first. Listings filter with
+# KEYSET_CONDITION and order with KEYSET_ORDER so every page is an index range scan.
+KEYSET_CONDITION = "({prefix}created_at, {prefix}id) < (?, ?)"
+KEYSET_ORDER = "ORDER BY {prefix}created_at DESC, {prefix}id DESC"
+
+# Response header carrying the cursor of the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Largest page a paginated listing serves in one response
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(created_at, row_id) -> str:
+    """Opaque cursor for the row a page ended on"""
+    raw = json.dumps([str(created_at), str(row_id)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return str(created_at), str(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def keyset_filter(cursor: Optional[str], prefix: str = "") -> Tuple[str, tuple]:
+    """SQL condition and params selecting rows after the cursor ("" / () when there is none)"""
+    if not cursor:
+        return "", ()
+    return KEYSET_CONDITION.format(prefix=prefix), decode_cursor(cursor)
+
+
+def keyset_order(prefix: str = "") -> str:
+    return KEYSET_ORDER.format(prefix=prefix)
+
+
+def next_cursor(rows, limit: Optional[int], created_at_key="created_at", id_key="id") -> Optional[str]:
+    """Cursor for the following page, or None when this page was the last one"""
+    if not limit or len(rows) < limit:
+        return None
+    last = rows[-1]
+    if isinstance(last, dict):
+        return encode_cursor(last[created_at_key], last[id_key])
+    return encode_cursor(getattr(last, created_at_key), getattr(last, id_key))
@@ -0,0 +1,90 @@
+import math
+import re
+from typing import Optional, Tuple
+
+# Offline geocoding of free-text provider locations ("lahore", "DHA Phase 5, Karachi")
+# against a built-in gazetteer of city centres; an explicit "lat,lon" pair is used as is.
+# Swap geocode() for a real geocoder when street-level accuracy matters.
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+# City centres: name -> (latitude, longitude)
+GAZETTEER = {
+    "islamabad": (33.6844, 73.0479),
+    "rawalpindi": (33.5651, 73.0169),
+    "lahore": (31.5204, 74.3587),
+    "karachi": (24.8607, 67.0011),
+    "peshawar": (34.0151, 71.5249),
+    "quetta": (30.1798, 66.9750),
+    "multan": (30.1575, 71.5249),
+    "faisalabad": (31.4504, 73.1350),
+    "gujranwala": (32.1877, 74.1945),
+    "sialkot": (32.4945, 74.5229),
+    "hyderabad": (25.3960, 68.3578),
+    "sukkur": (27.7052, 68.8574),
+    "bahawalpur": (29.3544, 71.6911),
+    "sargodha": (32.0836, 72.6711),
+    "abbottabad": (34.1688, 73.2215),
+    "mardan": (34.1986, 72.0404),
+    "gujrat": (32.5731, 74.1005),
+    "sahiwal": (30.6682, 73.1114),
+    "larkana": (27.5570, 68.2264),
+    "sheikhupura": (31.7131, 73.9783),
+    "jhelum": (32.9405, 73.7276),
+    "muzaffarabad": (34.3700, 73.4711),
+    "gilgit": (35.9208, 74.3089),
+    "dera ghazi khan": (30.0561, 70.6348),
+    "mirpur": (33.1478, 73.7517),
+    "gwadar": (25.1264, 62.3225),
+}
+
+ALIASES = {
+    "isb": "islamabad",
+    "pindi": "rawalpindi",
+    "lhr": "lahore",
+    "khi": "karachi",
+    "pesh": "peshawar",
+    "fsd": "faisalabad",
+    "lyallpur": "faisalabad",
+    "dg khan": "dera ghazi khan",
+}
+
+_COORDINATES_RE = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+
+
+def _normalize(text: str) -> str:
+    return " " + _NON_WORD_RE.sub(" ", text.lower()).strip() + " "
+
+
+def geocode(location: Optional[str]) -> Optional[Tuple[float, float]]:
+    """(latitude, longitude) for a free-text location, or None if it is not recognised"""
+    if not location:
+        return None
+    match = _COORDINATES_RE.match(location)
+    if match:
+        lat, lon = float(match.group(1)), float(match.group(2))
+        if -90 <= lat <= 90 and -180 <= lon <= 180:
+            return lat, lon
+        return None
+    text = _normalize(location)
+    # Longest names first so "dera ghazi khan" wins over any shorter name inside it
+    for name in sorted((*GAZETTEER, *ALIASES), key=len, reverse=True):
+        if f" {name} " in text:
+            return GAZETTEER[ALIASES.get(name, name)]
+    return None
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat: float, lon: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """(min_lat, max_lat, min_lon, max_lon) enclosing the circle of radius_km around a point"""
+    dlat = radius_km / KM_PER_DEGREE
+    cos_lat = math.cos(math.radians(lat))
+    dlon = 180.0 if cos_lat < 1e-6 else min(180.0, radius_km / (KM_PER_DEGREE * cos_lat))
+    return max(-90.0, lat - dlat), min(90.0, lat + dlat), lon - dlon, lon + dlon
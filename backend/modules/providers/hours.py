@@ -0,0 +1,132 @@
+import re
+from typing import List, Optional, Tuple
+
+# Parser for the free-text working_hours field: "3 to 5", "9am-5pm", "Mon-Fri 09:00-17:00; Sat 10-2",
+# "weekdays 9 to 6", "24/7". Produces weekly intervals as (weekday, start_minute, end_minute) with
+# Monday = 0 and minutes since midnight; a range past midnight is split across the two days.
+#
+# Hours written without am/pm follow the usual shorthand: 1-7 mean the afternoon/evening,
+# so "9 to 5" is 09:00-17:00 and "3 to 5" is 15:00-17:00.
+
+MINUTES_PER_DAY = 24 * 60
+ALL_DAYS = tuple(range(7))
+
+DAY_NAMES = {
+    "mon": 0, "monday": 0,
+    "tue": 1, "tues": 1, "tuesday": 1,
+    "wed": 2, "wednesday": 2,
+    "thu": 3, "thur": 3, "thurs": 3, "thursday": 3,
+    "fri": 4, "friday": 4,
+    "sat": 5, "saturday": 5,
+    "sun": 6, "sunday": 6,
+}
+DAY_GROUPS = {
+    "daily": ALL_DAYS,
+    "everyday": ALL_DAYS,
+    "weekdays": (0, 1, 2, 3, 4),
+    "weekends": (5, 6),
+    "weekend": (5, 6),
+}
+
+_DAY = r"(?:" + "|".join(sorted((*DAY_NAMES, *DAY_GROUPS), key=len, reverse=True)) + r")\.?"
+_DAY_SPEC_RE = re.compile(rf"^\s*({_DAY}(?:\s*(?:-|–|to|,|&|and)\s*{_DAY})*)\s*:?\s*", re.IGNORECASE)
+_TIME = r"(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?"
+_RANGE_RE = re.compile(rf"^{_TIME}\s*(?:-|–|to|till|until)\s*{_TIME}$", re.IGNORECASE)
+_ALWAYS_RE = re.compile(r"^(?:24\s*/\s*7|24\s*hours?|24h|always(?: open)?)$", re.IGNORECASE)
+_SEGMENT_SPLIT_RE = re.compile(r"[;\n|]+|,(?=\s*" + _DAY + r")", re.IGNORECASE)
+
+Interval = Tuple[int, int, int]
+
+
+def _days(spec: str) -> Tuple[int, ...]:
+    tokens = re.findall(rf"{_DAY}|-|–|to", spec, re.IGNORECASE)
+    days = []
+    i = 0
+    while i < len(tokens):
+        name = tokens[i].lower().rstrip(".")
+        if name in DAY_GROUPS:
+            days.extend(DAY_GROUPS[name])
+        elif name in DAY_NAMES:
+            start = DAY_NAMES[name]
+            if i + 2 < len(tokens) and tokens[i + 1].lower() in ("-", "–", "to") and tokens[i + 2].lower().rstrip(".") in DAY_NAMES:
+                end = DAY_NAMES[tokens[i + 2].lower().rstrip(".")]
+                days.extend((start + offset) % 7 for offset in range((end - start) % 7 + 1))
+                i += 2
+            else:
+                days.append(start)
+        i += 1
+    return tuple(sorted(set(days)))
+
+
+def _clock(hour: int, minute: int, meridiem: str) -> Optional[int]:
+    if minute >= 60:
+        return None
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == "pm" else 0)
+    if hour > 24 or (hour == 24 and minute):
+        return None
+    return hour * 60 + minute
+
+
+def _parse_range(text: str) -> Optional[Tuple[int, int]]:
+    match = _RANGE_RE.match(text.strip())
+    if not match:
+        return None
+    h1, m1, mer1, h2, m2, mer2 = match.groups()
+    mer1, mer2 = ((mer or "").lower().replace(".", "") for mer in (mer1, mer2))
+    start_hour, end_hour = int(h1), int(h2)
+    twenty_four_hour = h1.startswith("0") or h2.startswith("0") or start_hour > 12 or end_hour > 12
+    if not mer1 and not mer2 and not twenty_four_hour:
+        # Bare 12-hour shorthand: "3 to 5" -> 15-17, "9 to 5" -> 9-17, "8 to 12" -> 8-12
+        if start_hour < end_hour and 1 <= start_hour <= 7 and end_hour <= 11:
+            start_hour, end_hour = start_hour + 12, end_hour + 12
+        elif end_hour <= start_hour and end_hour < 12:
+            end_hour += 12
+    elif bool(mer1) != bool(mer2) and not twenty_four_hour:
+        # "1-4pm", "9-5pm", "10am-2": the bare end takes whichever half keeps the range in order
+        if not mer1:
+            mer1 = mer2 if _clock(start_hour, 0, mer2) < _clock(end_hour, 0, mer2) else "am"
+        else:
+            mer2 = mer1 if _clock(start_hour, 0, mer1) < _clock(end_hour, 0, mer1) else "pm"
+    start = _clock(start_hour, int(m1 or 0), mer1)
+    end = _clock(end_hour, int(m2 or 0), mer2)
+    if start is None or end is None:
+        return None
+    if start == MINUTES_PER_DAY:
+        start = 0
+    if end == 0:
+        end = MINUTES_PER_DAY
+    return start, end
+
+
+def parse_working_hours(text: Optional[str]) -> List[Interval]:
+    """Weekly open intervals described by text; [] when it cannot be understood"""
+    intervals = set()
+    for segment in _SEGMENT_SPLIT_RE.split(text or ""):
+        segment = segment.strip()
+        if not segment:
+            continue
+        days = ALL_DAYS
+        spec = _DAY_SPEC_RE.match(segment)
+        if spec and spec.group(1).strip():
+            days = _days(spec.group(1))
+            segment = segment[spec.end():].strip()
+        if segment.lower() in ("closed", "off"):
+            continue
+        if _ALWAYS_RE.match(segment):
+            intervals.update((day, 0, MINUTES_PER_DAY) for day in days)
+            continue
+        parsed = _parse_range(segment)
+        if parsed is None:
+            continue
+        start, end = parsed
+        for day in days:
+            if end > start:
+                intervals.add((day, start, end))
+            elif end < start:
+                # Past midnight: the tail belongs to the next day
+                intervals.add((day, start, MINUTES_PER_DAY))
+                intervals.add(((day + 1) % 7, 0, end))
+    return sorted(intervals)
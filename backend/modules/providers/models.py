@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr, confloat
-from typing import Optional, Literal, List
+from pydantic import BaseModel, EmailStr, computed_field, confloat
+from typing import Dict, Optional, Literal, List
 from datetime import datetime
+from ..media.images import variant_urls
 
 class ProviderBase(BaseModel):
     email: EmailStr
@@ -45,17 +46,43 @@ class ProviderInDB(ProviderBase):
     service_type: Optional[str] = None
     hourly_rate: Optional[float] = None
     location: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     working_hours: Optional[str] = None
     sa_front_id: Optional[str] = None
     sa_back_id: Optional[str] = None
     profile_photo: Optional[str] = None
     rating: float = 0.0
     reviews_count: int = 0
+    rating_score: float = 0.0  # Bayesian-weighted rating, used to rank providers
     is_verified: bool = False
     image: str = "/images/placeholder.jpg"
     created_at: datetime
     updated_at: datetime
-    is_active: bool = True 
+    is_active: bool = True
+
+    @classmethod
+    def from_row(cls, row: dict) -> "ProviderInDB":
+        """Build from a providers row without validation (EmailStr checks alone dominate a row's cost).
+
+        Only the columns SQLite stores as other types are converted.
+        """
+        return cls.model_construct(**{
+            **row,
+            "is_verified": bool(row["is_verified"]),
+            "is_active": bool(row["is_active"]),
+            "created_at": datetime.fromisoformat(row["created_at"]),
+            "updated_at": datetime.fromisoformat(row["updated_at"]),
+        })
+
+    @computed_field
+    @property
+    def profile_photo_variants(self) -> Optional[Dict[str, Dict[str, str]]]:
+        """Resized WebP/AVIF copies of profile_photo, as {size: {format: url}}"""
+        return variant_urls(self.profile_photo)
+
+class NearbyProvider(ProviderInDB):
+    distance_km: float
 
 class Token(BaseModel):
     access_token: str
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form, Query
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from datetime import timedelta
-from typing import List
-from .models import ProviderCreate, ProviderUpdate, ProviderInDB, BusinessDetails
+from typing import List, Optional
+from .models import ProviderCreate, ProviderUpdate, ProviderInDB, BusinessDetails, NearbyProvider
+from .geocoding import geocode
 from .service import (
     create_provider,
     update_business_details,
@@ -11,35 +12,52 @@ from .service import (
     update_provider,
     delete_provider,
     list_providers,
-    verify_password,
-    get_password_hash,
+    search_providers,
+    find_nearby_providers,
+    get_provider_ids_by_service_type,
     create_access_token,
     ACCESS_TOKEN_EXPIRE_MINUTES,
-    verify_token
+    update_provider_password_hash
 )
+from ..utils import get_password_hash_async, verify_and_update_password_async
 import os
+import logging
 from fastapi.responses import JSONResponse
+from database import run_db
+from ..pagination import next_cursor, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from ..responses import model_response
+from ..media.uploads import limit_upload_request, UploadLimitRoute
+from ..media.storage import store_uploads
+from ..media.images import schedule_variants
+from ..bookings.models import ProviderAvailability, ProviderStats
+from ..bookings.stats import get_provider_stats, parse_month
+from ..bookings.availability import (
+    BOOKING_DURATION_MINUTES,
+    MAX_BOOKING_DURATION_MINUTES,
+    availability_window,
+    get_availability,
+)
+
+logger = logging.getLogger(__name__)
 
-router = APIRouter(tags=["providers"])
+router = APIRouter(tags=["providers"], route_class=UploadLimitRoute)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-UPLOAD_DIR = "uploaded_images"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 @router.post("/register", response_model=dict)
-def register_provider(provider: ProviderCreate):
+async def register_provider(provider: ProviderCreate):
     """Step 1: Register a new provider with basic info"""
     # Check if provider already exists
-    if get_provider_by_email(provider.email):
+    if await run_db(get_provider_by_email, provider.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
     # Create new provider
-    provider.password = get_password_hash(provider.password)
+    provider.password = await get_password_hash_async(provider.password)
     provider_obj = provider
-    provider = create_provider(provider_obj)
+    provider = await run_db(create_provider, provider_obj)
     
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -51,24 +69,20 @@ def register_provider(provider: ProviderCreate):
     return {"access_token": access_token, "token_type": "bearer", "provider_id": provider.id}
 
 @router.post("/login", response_model=dict)
-def login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     """Login for providers"""
-    provider = get_provider_by_email(form_data.username)
-    print("Provider from DB:", provider)
-    print("Password from form:", form_data.password)
+    provider = await run_db(get_provider_by_email, form_data.username)
     if not provider:
-        print("Provider not found")
+        logger.info("Provider login failed: unknown email")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Debug password check
-    password_check = verify_password(form_data.password, provider.password)
-    print("Password check result:", password_check)
+    password_check, new_hash = await verify_and_update_password_async(form_data.password, provider.password)
     if not password_check:
-        print("Password does not match")
+        logger.info("Provider login failed: password mismatch", extra={"provider_id": provider.id})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, 
             detail="Incorrect email or password",
@@ -82,6 +96,10 @@ def login(form_data: OAuth2PasswordRequestForm = Depends()):
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if new_hash:
+        # Stored hash used a different bcrypt cost; upgrade it transparently
+        await run_db(update_provider_password_hash, provider.id, new_hash)
+
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": provider.email, "user_type": "provider", "provider_id": provider.id},
@@ -90,10 +108,10 @@ def login(form_data: OAuth2PasswordRequestForm = Depends()):
     return {"access_token": access_token, "token_type": "bearer", "provider_id": provider.id}
 
 @router.post("/token", response_model=dict)
-def login_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    return login(form_data)
+async def login_token(form_data: OAuth2PasswordRequestForm = Depends()):
+    return await login(form_data)
 
-@router.post("/{provider_id}/business-details", response_model=ProviderInDB)
+@router.post("/{provider_id}/business-details", response_model=ProviderInDB, dependencies=[Depends(limit_upload_request)])
 async def add_business_details(
     provider_id: str,
     business_name: str = Form(...),
@@ -106,15 +124,11 @@ async def add_business_details(
     profile_photo: UploadFile = File(...)
 ):
     # Save files
-    async def save_file(file: UploadFile):
-        file_location = os.path.join(UPLOAD_DIR, file.filename)
-        with open(file_location, "wb") as f:
-            f.write(await file.read())
-        return f"/uploaded_images/{file.filename}"
-
-    sa_front_id_path = await save_file(sa_front_id)
-    sa_back_id_path = await save_file(sa_back_id)
-    profile_photo_path = await save_file(profile_photo)
+    sa_front_id_path, sa_back_id_path, profile_photo_path = await store_uploads(
+        [sa_front_id, sa_back_id, profile_photo]
+    )
+    # Thumbnails/WebP copies are made in the background, off the request path
+    schedule_variants([sa_front_id_path, sa_back_id_path, profile_photo_path])
 
     business_details = BusinessDetails(
         business_name=business_name,
@@ -126,28 +140,123 @@ async def add_business_details(
         sa_back_id=sa_back_id_path,
         profile_photo=profile_photo_path
     )
-    return update_business_details(provider_id, business_details)
+    return await run_db(update_business_details, provider_id, business_details)
 
 @router.get("/me", response_model=ProviderInDB)
 async def get_current_provider():
     """Get current provider's details (now public, returns first provider)"""
-    providers = list_providers(limit=1)
+    providers = await run_db(list_providers, limit=1)
     if not providers:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No providers found")
-    return providers[0]
+    return model_response(ProviderInDB, providers[0])
+
+@router.get("/search", response_model=List[ProviderInDB])
+async def search(
+    q: Optional[str] = None,
+    service_type: Optional[str] = None,
+    min_rate: Optional[float] = Query(None, ge=0),
+    max_rate: Optional[float] = Query(None, ge=0),
+    min_rating: Optional[float] = Query(None, ge=0, le=5),
+    is_verified: Optional[bool] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """Full-text search over business name, name, service type and location, best match first"""
+    providers = await run_db(
+        search_providers,
+        q=q,
+        service_type=service_type,
+        min_rate=min_rate,
+        max_rate=max_rate,
+        min_rating=min_rating,
+        is_verified=is_verified,
+        skip=skip,
+        limit=limit,
+    )
+    return model_response(List[ProviderInDB], providers)
+
+@router.get("/nearby", response_model=List[NearbyProvider])
+async def nearby(
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    location: Optional[str] = None,
+    radius_km: float = Query(10.0, gt=0, le=500),
+    service_type: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100)
+):
+    """The nearest active providers within radius_km of lat/lon (or of a geocoded location), closest first"""
+    if lat is None or lon is None:
+        point = geocode(location)
+        if point is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Provide lat and lon, or a recognised location"
+            )
+        lat, lon = point
+    results = await run_db(find_nearby_providers, lat, lon, radius_km, service_type, limit)
+    return model_response(
+        List[NearbyProvider],
+        [NearbyProvider.model_construct(**dict(provider), distance_km=distance) for provider, distance in results]
+    )
+
+def _availability_window(start: Optional[str], end: Optional[str]):
+    try:
+        return availability_window(start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/availability", response_model=List[ProviderAvailability])
+async def availability(
+    service_type: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    duration_minutes: int = Query(BOOKING_DURATION_MINUTES, ge=15, le=MAX_BOOKING_DURATION_MINUTES),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """Free slots of active providers of a service type between start and end (YYYY-MM-DD, inclusive)"""
+    first, last = _availability_window(start, end)
+    provider_ids = await run_db(get_provider_ids_by_service_type, service_type, skip, limit)
+    return await run_db(get_availability, provider_ids, first, last, duration_minutes)
 
 @router.get("/{provider_id}", response_model=ProviderInDB)
 async def get_provider_details(provider_id: str):
     """Get provider details by ID"""
-    provider = get_provider(provider_id)
+    provider = await run_db(get_provider, provider_id)
     if not provider:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Provider not found"
         )
-    return provider
+    return model_response(ProviderInDB, provider)
+
+@router.get("/{provider_id}/availability", response_model=ProviderAvailability)
+async def provider_availability(
+    provider_id: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    duration_minutes: int = Query(BOOKING_DURATION_MINUTES, ge=15, le=MAX_BOOKING_DURATION_MINUTES)
+):
+    """Free slots of one provider between start and end (YYYY-MM-DD, inclusive)"""
+    first, last = _availability_window(start, end)
+    if not await run_db(get_provider, provider_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Provider not found")
+    return (await run_db(get_availability, [provider_id], first, last, duration_minutes))[0]
 
-@router.put("/{provider_id}", response_model=ProviderInDB)
+@router.get("/{provider_id}/stats", response_model=ProviderStats)
+async def provider_stats(provider_id: str, from_month: Optional[str] = None, to_month: Optional[str] = None):
+    """Booking counts by status and by service month (YYYY-MM, inclusive range), plus completed hours"""
+    try:
+        for month in (from_month, to_month):
+            if month is not None:
+                parse_month(month)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not await run_db(get_provider, provider_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Provider not found")
+    return await run_db(get_provider_stats, provider_id, from_month, to_month)
+
+@router.put("/{provider_id}", response_model=ProviderInDB, dependencies=[Depends(limit_upload_request)])
 async def update_provider_details(
     provider_id: str,
     full_name: str = Form(None),
@@ -163,32 +272,30 @@ async def update_provider_details(
     sa_back_id: UploadFile = File(None),
     profile_photo: UploadFile = File(None)
 ):
-    # Save new images if provided
-    async def save_file(file: UploadFile):
-        file_location = os.path.join(UPLOAD_DIR, file.filename)
-        with open(file_location, "wb") as f:
-            f.write(await file.read())
-        return f"/uploaded_images/{file.filename}"
-
     update_data = {}
     if full_name is not None: update_data["full_name"] = full_name
     if email is not None: update_data["email"] = email
-    if password is not None: update_data["password"] = get_password_hash(password)
+    if password is not None: update_data["password"] = await get_password_hash_async(password)
     if phone is not None: update_data["phone"] = phone
     if business_name is not None: update_data["business_name"] = business_name
     if service_type is not None: update_data["service_type"] = service_type
     if hourly_rate is not None: update_data["hourly_rate"] = hourly_rate
     if location is not None: update_data["location"] = location
     if working_hours is not None: update_data["working_hours"] = working_hours
-    if sa_front_id is not None:
-        update_data["sa_front_id"] = await save_file(sa_front_id)
-    if sa_back_id is not None:
-        update_data["sa_back_id"] = await save_file(sa_back_id)
-    if profile_photo is not None:
-        update_data["profile_photo"] = await save_file(profile_photo)
+
+    # Save new images if provided
+    uploads = {
+        field: file
+        for field, file in (("sa_front_id", sa_front_id), ("sa_back_id", sa_back_id), ("profile_photo", profile_photo))
+        if file is not None
+    }
+    if uploads:
+        urls = await store_uploads(list(uploads.values()))
+        update_data.update(zip(uploads, urls))
+        schedule_variants(urls)
 
     provider_update = ProviderUpdate(**update_data)
-    updated_provider = update_provider(provider_id, provider_update)
+    updated_provider = await run_db(update_provider, provider_id, provider_update)
     if not updated_provider:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -202,13 +309,13 @@ async def delete_provider_account(
 ):
     """Delete provider account"""
     # Verify the provider exists
-    provider = get_provider(provider_id)
+    provider = await run_db(get_provider, provider_id)
     if not provider:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Provider not found"
         )
-    success = delete_provider(provider_id)
+    success = await run_db(delete_provider, provider_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -216,6 +323,13 @@ async def delete_provider_account(
         )
 
 @router.get("/", response_model=List[ProviderInDB])
-async def get_all_providers(skip: int = 0, limit: int = 100):
-    """List all providers"""
-    return list_providers(skip=skip, limit=limit) 
\ No newline at end of file
+async def get_all_providers(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """List all providers, newest first; the next page's cursor is returned in X-Next-Cursor"""
+    providers = await run_db(list_providers, skip=skip, limit=limit, cursor=cursor)
+    page_cursor = next_cursor(providers, limit)
+    headers = {NEXT_CURSOR_HEADER: page_cursor} if page_cursor else None
+    return model_response(List[ProviderInDB], providers, headers=headers)
@@ -1,28 +1,55 @@
 from datetime import datetime, timedelta
 import uuid
-from typing import Optional, List
+from typing import Optional, List, Dict, Iterable, Tuple
+from fastapi import HTTPException
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from .models import ProviderCreate, ProviderUpdate, ProviderInDB, BusinessDetails
-from database import execute_query, execute_query_one
-from ..utils import get_password_hash
+from .geocoding import geocode, haversine_km, bounding_box
+from .hours import parse_working_hours
+from database import IntegrityError, backend, execute_query, execute_query_one, get_db_connection
+from ..utils import verify_password, get_password_hash
+from ..pagination import keyset_filter, keyset_order
+from ..cache import TTLCache, ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL
 from dotenv import load_dotenv
 import os
+import re
+import math
+import logging
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # JWT Configuration
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Max IDs bound into a single IN (...) clause
+IN_CLAUSE_CHUNK_SIZE = 500
+
+# bm25() column weights for providers_fts: business_name, full_name, service_type, location
+SEARCH_RANK_WEIGHTS = (10.0, 5.0, 3.0, 2.0)
+# The same weights for PostgreSQL's ts_rank(): search_vector labels those columns A-D, and
+# ts_rank takes {D, C, B, A} scaled to at most 1
+_TS_RANK_WEIGHTS = "{" + ", ".join(str(w / max(SEARCH_RANK_WEIGHTS)) for w in reversed(SEARCH_RANK_WEIGHTS)) + "}"
+_SEARCH_TERM_RE = re.compile(r"\w+")
+
+# Nearby searches start with this radius and widen it until k providers are found
+NEARBY_INITIAL_RADIUS_KM = 2.0
+
+# Read-through cache: provider ID -> ProviderInDB, and email -> provider ID.
+# Writes invalidate by ID; email hits are re-checked against the cached provider's email.
+_provider_cache = TTLCache("providers", maxsize=ENTITY_CACHE_SIZE, ttl=ENTITY_CACHE_TTL)
+_provider_email_cache = TTLCache("provider_emails", maxsize=ENTITY_CACHE_SIZE, ttl=ENTITY_CACHE_TTL)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+def _cache_provider(provider: ProviderInDB) -> ProviderInDB:
+    _provider_cache.set(provider.id, provider)
+    _provider_email_cache.set(provider.email, provider.id)
+    return provider
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+def invalidate_provider(provider_id: str):
+    _provider_cache.invalidate(provider_id)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -54,7 +81,7 @@ def create_provider(provider: ProviderCreate) -> ProviderInDB:
         query,
         (provider_id, provider.email, provider.full_name, provider.password, now, now)
     )
-    return ProviderInDB(**result)
+    return ProviderInDB.from_row(result)
 
 def update_business_details(provider_id: str, business_details: BusinessDetails) -> ProviderInDB:
     now = datetime.utcnow()
@@ -64,6 +91,8 @@ def update_business_details(provider_id: str, business_details: BusinessDetails)
         service_type = ?,
         hourly_rate = ?,
         location = ?,
+        latitude = ?,
+        longitude = ?,
         working_hours = ?,
         sa_front_id = ?,
         sa_back_id = ?,
@@ -79,6 +108,7 @@ def update_business_details(provider_id: str, business_details: BusinessDetails)
             business_details.service_type,
             business_details.hourly_rate,
             business_details.location,
+            *(geocode(business_details.location) or (None, None)),
             business_details.working_hours,
             business_details.sa_front_id,
             business_details.sa_back_id,
@@ -87,18 +117,47 @@ def update_business_details(provider_id: str, business_details: BusinessDetails)
             provider_id
         )
     )
-    print("--------->", result)
-    return ProviderInDB(**result)
+    if result:
+        replace_provider_hours(provider_id, business_details.working_hours)
+    invalidate_provider(provider_id)
+    logger.debug("Updated business details for provider %s", provider_id)
+    return ProviderInDB.from_row(result)
 
 def get_provider(provider_id: str) -> Optional[ProviderInDB]:
+    provider = _provider_cache.get(provider_id)
+    if provider is not None:
+        return provider
     query = "SELECT * FROM providers WHERE id = ?"
     result = execute_query_one(query, (provider_id,))
-    return ProviderInDB(**result) if result else None
+    return _cache_provider(ProviderInDB.from_row(result)) if result else None
+
+def get_providers_by_ids(provider_ids: Iterable[str]) -> Dict[str, ProviderInDB]:
+    """Fetch many providers with one query per IN_CLAUSE_CHUNK_SIZE IDs, keyed by ID"""
+    providers = {}
+    ids = []
+    for provider_id in dict.fromkeys(pid for pid in provider_ids if pid):
+        provider = _provider_cache.get(provider_id)
+        if provider is not None:
+            providers[provider_id] = provider
+        else:
+            ids.append(provider_id)
+    for start in range(0, len(ids), IN_CLAUSE_CHUNK_SIZE):
+        chunk = ids[start:start + IN_CLAUSE_CHUNK_SIZE]
+        placeholders = ", ".join("?" for _ in chunk)
+        results = execute_query(f"SELECT * FROM providers WHERE id IN ({placeholders})", tuple(chunk))
+        for row in results:
+            providers[row["id"]] = _cache_provider(ProviderInDB.from_row(row))
+    return providers
 
 def get_provider_by_email(email: str) -> Optional[ProviderInDB]:
+    provider_id = _provider_email_cache.get(email)
+    if provider_id is not None:
+        provider = _provider_cache.get(provider_id)
+        if provider is not None and provider.email == email:
+            return provider
     query = "SELECT * FROM providers WHERE email = ?"
     result = execute_query_one(query, (email,))
-    return ProviderInDB(**result) if result else None
+    return _cache_provider(ProviderInDB.from_row(result)) if result else None
 
 def update_provider(provider_id: str, provider_update: ProviderUpdate) -> Optional[ProviderInDB]:
     update_fields = []
@@ -107,6 +166,10 @@ def update_provider(provider_id: str, provider_update: ProviderUpdate) -> Option
         if value is not None:
             update_fields.append(f"{field} = ?")
             values.append(value)
+            if field == "location":
+                # Keep the coordinates (and the providers_geo index) in step with the text
+                update_fields.extend(("latitude = ?", "longitude = ?"))
+                values.extend(geocode(value) or (None, None))
     if not update_fields:
         return get_provider(provider_id)
     values.append(datetime.utcnow())
@@ -118,19 +181,167 @@ def update_provider(provider_id: str, provider_update: ProviderUpdate) -> Option
     RETURNING *
     """
     result = execute_query_one(query, tuple(values))
-    return ProviderInDB(**result) if result else None
+    if result and provider_update.working_hours is not None:
+        replace_provider_hours(provider_id, provider_update.working_hours)
+    invalidate_provider(provider_id)
+    return ProviderInDB.from_row(result) if result else None
+
+def replace_provider_hours(provider_id: str, working_hours: Optional[str]):
+    """Re-derive the structured provider_hours rows from the free-text working_hours"""
+    intervals = parse_working_hours(working_hours)
+    with get_db_connection() as conn:
+        conn.execute("DELETE FROM provider_hours WHERE provider_id = ?", (provider_id,))
+        conn.executemany(
+            "INSERT INTO provider_hours (provider_id, weekday, start_minute, end_minute) VALUES (?, ?, ?, ?)",
+            [(provider_id, *interval) for interval in intervals]
+        )
+    if working_hours and not intervals:
+        logger.info("Could not parse working hours %r of provider %s", working_hours, provider_id)
+
+def update_provider_password_hash(provider_id: str, password_hash: str):
+    """Store a re-hashed password (e.g. after the bcrypt cost changed)"""
+    execute_query(
+        "UPDATE providers SET password = ?, updated_at = ? WHERE id = ?",
+        (password_hash, datetime.utcnow(), provider_id)
+    )
+    invalidate_provider(provider_id)
 
 def delete_provider(provider_id: str) -> bool:
     query = "DELETE FROM providers WHERE id = ? RETURNING id"
-    result = execute_query_one(query, (provider_id,))
+    try:
+        result = execute_query_one(query, (provider_id,))
+    except IntegrityError:
+        # bookings.provider_id still references the provider
+        raise HTTPException(status_code=409, detail="Provider has bookings and cannot be deleted")
+    invalidate_provider(provider_id)
     return bool(result)
 
-def list_providers(skip: int = 0, limit: int = 100) -> List[ProviderInDB]:
-    query = "SELECT * FROM providers ORDER BY created_at DESC LIMIT ? OFFSET ?"
-    results = execute_query(query, (limit, skip))
-    return [ProviderInDB(**row) for row in results]
+def list_providers(skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[ProviderInDB]:
+    """Newest providers first; pass the previous page's cursor for constant-cost deep pages"""
+    if cursor:
+        condition, params = keyset_filter(cursor)
+        query = f"SELECT * FROM providers WHERE {condition} {keyset_order()} LIMIT ?"
+        results = execute_query(query, (*params, limit))
+    else:
+        query = f"SELECT * FROM providers {keyset_order()} LIMIT ? OFFSET ?"
+        results = execute_query(query, (limit, skip))
+    return [ProviderInDB.from_row(row) for row in results]
 
 def get_providers_by_service_type(service_type: str) -> List[ProviderInDB]:
     query = "SELECT * FROM providers WHERE service_type = ? AND is_active = true"
     results = execute_query(query, (service_type,))
-    return [ProviderInDB(**row) for row in results] 
\ No newline at end of file
+    return [ProviderInDB.from_row(row) for row in results]
+
+def get_provider_ids_by_service_type(service_type: str, skip: int = 0, limit: int = 100) -> List[str]:
+    query = "SELECT id FROM providers WHERE service_type = ? AND is_active = true ORDER BY id LIMIT ? OFFSET ?"
+    return [row["id"] for row in execute_query(query, (service_type, limit, skip))]
+
+def _fts_query(text: str) -> str:
+    """User input as an FTS5 expression (a tsquery on PostgreSQL): every word must match, as a prefix.
+
+    Only word characters are kept, so operators and punctuation in the input are inert.
+    """
+    terms = _SEARCH_TERM_RE.findall(text)
+    if backend.name == "postgresql":
+        return " & ".join(f"{term}:*" for term in terms)
+    return " ".join(f'"{term}"*' for term in terms)
+
+def search_providers(
+    q: Optional[str] = None,
+    service_type: Optional[str] = None,
+    min_rate: Optional[float] = None,
+    max_rate: Optional[float] = None,
+    min_rating: Optional[float] = None,
+    is_verified: Optional[bool] = None,
+    skip: int = 0,
+    limit: int = 20,
+) -> List[ProviderInDB]:
+    """Active providers matching q (best BM25 match first) and the given filters.
+
+    Without search terms the filtered providers are ordered by their Bayesian-weighted rating.
+    """
+    conditions = ["p.is_active = true"]
+    params = []
+    match = _fts_query(q or "")
+    if match and backend.name == "postgresql":
+        source = "to_tsquery('simple', ?) AS query, providers p"
+        conditions.insert(0, "p.search_vector @@ query")
+        params.append(match)
+        order = f"ORDER BY ts_rank('{_TS_RANK_WEIGHTS}', p.search_vector, query) DESC"
+    elif match:
+        source = "providers_fts JOIN providers p ON p.rowid = providers_fts.rowid"
+        conditions.insert(0, "providers_fts MATCH ?")
+        params.append(match)
+        order = f"ORDER BY bm25(providers_fts, {', '.join(map(str, SEARCH_RANK_WEIGHTS))})"
+    else:
+        source = "providers p"
+        order = "ORDER BY p.rating_score DESC, p.created_at DESC, p.id DESC"
+    for condition, value in (
+        ("p.service_type = ?", service_type),
+        ("p.hourly_rate >= ?", min_rate),
+        ("p.hourly_rate <= ?", max_rate),
+        ("p.rating >= ?", min_rating),
+        ("p.is_verified = ?", is_verified),
+    ):
+        if value is not None:
+            conditions.append(condition)
+            params.append(value)
+    query = f"SELECT p.* FROM {source} WHERE {' AND '.join(conditions)} {order} LIMIT ? OFFSET ?"
+    results = execute_query(query, (*params, limit, skip))
+    return [ProviderInDB.from_row(row) for row in results]
+
+def _nearest_in_box(lat: float, lon: float, radius_km: float, service_type: Optional[str], limit: int) -> List[dict]:
+    """Up to limit active providers inside the radius_km bounding box, roughly nearest first"""
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    if backend.name == "postgresql":
+        # Served by the GiST index on point(longitude, latitude)
+        source = "providers p"
+        conditions = ["point(p.longitude, p.latitude) <@ box(point(?, ?), point(?, ?))"]
+        params = [min_lon, min_lat, max_lon, max_lat]
+    else:
+        # CROSS JOIN pins the R*Tree as the outer loop, otherwise the planner may prefer the
+        # service_type index and probe the R*Tree once per provider of that type.
+        source = "providers_geo g CROSS JOIN providers p ON p.rowid = g.id"
+        conditions = ["g.min_lat >= ? AND g.max_lat <= ? AND g.min_lon >= ? AND g.max_lon <= ?"]
+        params = [min_lat, max_lat, min_lon, max_lon]
+    conditions.append("p.is_active = true")
+    if service_type is not None:
+        conditions.append("p.service_type = ?")
+        params.append(service_type)
+    # Equirectangular distance is enough to pick the top k; exact distances are computed after.
+    lon_scale = math.cos(math.radians(lat)) ** 2
+    query = f"""
+    SELECT p.* FROM {source}
+    WHERE {' AND '.join(conditions)}
+    ORDER BY (p.latitude - ?) * (p.latitude - ?) + (p.longitude - ?) * (p.longitude - ?) * ?
+    LIMIT ?
+    """
+    return execute_query(query, (*params, lat, lat, lon, lon, lon_scale, limit))
+
+def find_nearby_providers(
+    lat: float,
+    lon: float,
+    radius_km: float,
+    service_type: Optional[str] = None,
+    limit: int = 10,
+) -> List[Tuple[ProviderInDB, float]]:
+    """The limit nearest active providers within radius_km, as (provider, distance_km) pairs.
+
+    Candidates come from the providers_geo R*Tree (a GiST index on PostgreSQL); the search
+    box starts small and grows, so dense areas never scan more than a small neighbourhood.
+    """
+    search_km = min(radius_km, NEARBY_INITIAL_RADIUS_KM)
+    while True:
+        rows = _nearest_in_box(lat, lon, search_km, service_type, limit)
+        found = sorted(
+            (
+                (distance, row)
+                for row in rows
+                if (distance := haversine_km(lat, lon, row["latitude"], row["longitude"])) <= search_km
+            ),
+            key=lambda item: item[0],
+        )
+        # The box contains the whole search_km circle, so these are the true nearest ones
+        if len(found) >= limit or search_km >= radius_km:
+            return [(ProviderInDB.from_row(row), round(distance, 3)) for distance, row in found[:limit]]
+        search_km = min(radius_km, search_km * 4)
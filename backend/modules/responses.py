@@ -0,0 +1,25 @@
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+
+# Fast path for data read from our own tables. Routes keep response_model for the
+# OpenAPI schema, but returning a Response skips FastAPI's re-validation and
+# jsonable_encoder pass, which cost far more per row than the query did.
+# Never use these for anything echoed back from client input.
+
+
+@lru_cache(maxsize=None)
+def _adapter(model_type) -> TypeAdapter:
+    return TypeAdapter(model_type)
+
+
+def model_response(model_type, content: Any, headers: Optional[Mapping[str, str]] = None) -> Response:
+    """Already-built models (e.g. List[ProviderInDB]) serialized straight to JSON bytes"""
+    return Response(_adapter(model_type).dump_json(content), media_type="application/json", headers=headers)
+
+
+def payload_response(content: Any, headers: Optional[Mapping[str, str]] = None) -> ORJSONResponse:
+    """Plain dicts/lists (datetimes allowed) encoded by orjson as they are"""
+    return ORJSONResponse(content, headers=headers)
@@ -0,0 +1,60 @@
+"""Per-provider rating aggregates, kept on the providers row.
+
+rating_sum and reviews_count are the running totals; rating (the mean) and
+rating_score (a Bayesian average used for ranking) are derived from them in the
+same UPDATE. Every review write applies its delta inside its own transaction,
+so reading a provider's rating never touches the reviews table.
+"""
+
+# Bayesian prior: every provider starts as if it had RATING_PRIOR_WEIGHT reviews of
+# RATING_PRIOR_MEAN stars, so a single 5-star review does not outrank fifty 4.8s.
+# Changing either needs `python manage.py rebuild-ratings` to rescore existing rows.
+RATING_PRIOR_MEAN = 3.5
+RATING_PRIOR_WEIGHT = 5
+
+# SET expressions all see the row as it was before the UPDATE
+_ADJUST = """
+UPDATE providers SET
+    rating_sum = rating_sum + :sum,
+    reviews_count = reviews_count + :count,
+    rating = COALESCE((rating_sum + :sum) * 1.0 / NULLIF(reviews_count + :count, 0), 0),
+    rating_score = (:mean * :weight + rating_sum + :sum) * 1.0 / (:weight + reviews_count + :count)
+WHERE id = :provider_id
+"""
+
+_TOTALS = """
+(SELECT COALESCE(SUM(rating), 0) FROM reviews WHERE provider_id = providers.id),
+(SELECT COUNT(*) FROM reviews WHERE provider_id = providers.id)
+"""
+
+
+def bayesian_score(rating_sum: int, count: int) -> float:
+    return (RATING_PRIOR_MEAN * RATING_PRIOR_WEIGHT + rating_sum) / (RATING_PRIOR_WEIGHT + count)
+
+
+def adjust_rating(conn, provider_id: str, sum_delta: int, count_delta: int):
+    """Apply one review's change (e.g. +5, +1 for a new 5-star review) to the provider's aggregates"""
+    conn.execute(_ADJUST, {
+        "sum": sum_delta,
+        "count": count_delta,
+        "mean": RATING_PRIOR_MEAN,
+        "weight": RATING_PRIOR_WEIGHT,
+        "provider_id": provider_id,
+    })
+
+
+def rebuild_ratings(conn) -> int:
+    """Recompute every provider's aggregates from the reviews table; returns how many had drifted"""
+    drifted = conn.execute(
+        f"SELECT COUNT(*) FROM providers WHERE (COALESCE(rating_sum, -1), COALESCE(reviews_count, -1)) != ({_TOTALS})"
+    ).fetchone()[0]
+    conn.execute(f"UPDATE providers SET (rating_sum, reviews_count) = ({_TOTALS})")
+    conn.execute(
+        """
+        UPDATE providers SET
+            rating = COALESCE(rating_sum * 1.0 / NULLIF(reviews_count, 0), 0),
+            rating_score = (:mean * :weight + rating_sum) * 1.0 / (:weight + reviews_count)
+        """,
+        {"mean": RATING_PRIOR_MEAN, "weight": RATING_PRIOR_WEIGHT}
+    )
+    return drifted
@@ -0,0 +1,42 @@
+import logging
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from database import run_db
+from ..pagination import next_cursor, NEXT_CURSOR_HEADER
+from ..providers.service import get_provider
+from ..responses import model_response
+from ..users.routes import get_current_user
+from .models import Review, ReviewCreate, ReviewUpdate
+from .service import create_review, delete_review, list_provider_reviews, update_review
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["reviews"])
+
+@router.post("/api/me/bookings/{booking_id}/review", response_model=Review)
+async def review_booking(booking_id: str, review: ReviewCreate, user: dict = Depends(get_current_user)):
+    """Rate a completed booking 1-5 stars; each booking can be reviewed once, by its customer"""
+    return await run_db(create_review, booking_id, user["id"], review)
+
+@router.get("/api/providers/{provider_id}/reviews", response_model=List[Review])
+async def provider_reviews(
+    provider_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """A provider's reviews, newest first; the next page's cursor is returned in X-Next-Cursor"""
+    if not await run_db(get_provider, provider_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Provider not found")
+    reviews = await run_db(list_provider_reviews, provider_id, limit, cursor)
+    page_cursor = next_cursor(reviews, limit)
+    headers = {NEXT_CURSOR_HEADER: page_cursor} if page_cursor else None
+    return model_response(List[Review], reviews, headers=headers)
+
+@router.patch("/api/reviews/{review_id}", response_model=Review)
+async def edit_review(review_id: str, update: ReviewUpdate, user: dict = Depends(get_current_user)):
+    """Change the rating and/or comment of one's own review"""
+    return await run_db(update_review, review_id, user["id"], update)
+
+@router.delete("/api/reviews/{review_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def remove_review(review_id: str, user: dict = Depends(get_current_user)):
+    await run_db(delete_review, review_id, user["id"])
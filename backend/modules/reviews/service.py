@@ -0,0 +1,92 @@
+import logging
+import uuid
+from datetime import datetime
+from typing import List, Optional
+from fastapi import HTTPException
+from database import IntegrityError, backend, execute_query, is_unique_violation, transaction
+from ..pagination import keyset_filter, keyset_order
+from ..providers.service import invalidate_provider
+from .models import Review, ReviewCreate, ReviewUpdate
+from .ratings import adjust_rating
+
+logger = logging.getLogger(__name__)
+
+
+def create_review(booking_id: str, user_id: str, review: ReviewCreate) -> Review:
+    """Review a completed booking (once, as its customer user_id) and fold the rating into the provider's aggregates"""
+    now = datetime.utcnow()
+    with transaction() as conn:
+        booking = conn.execute(
+            "SELECT customer_id, provider_id, status FROM bookings WHERE id = ?", (booking_id,)
+        ).fetchone()
+        if not booking:
+            raise HTTPException(status_code=404, detail="Booking not found")
+        if booking["customer_id"] != user_id:
+            raise HTTPException(status_code=403, detail="Only the booking's customer can review it")
+        if booking["status"] != "completed":
+            raise HTTPException(status_code=409, detail="Only completed bookings can be reviewed")
+        try:
+            row = conn.execute(
+                """
+                INSERT INTO reviews (id, booking_id, provider_id, customer_id, rating, comment, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                RETURNING *
+                """,
+                (str(uuid.uuid4()), booking_id, booking["provider_id"], user_id, review.rating, review.comment, now, now)
+            ).fetchone()
+        except IntegrityError as e:
+            if not is_unique_violation(e):
+                raise
+            raise HTTPException(status_code=409, detail="This booking has already been reviewed")
+        adjust_rating(conn, booking["provider_id"], review.rating, 1)
+
+    invalidate_provider(booking["provider_id"])
+    logger.info("Booking %s reviewed with %d stars", booking_id, review.rating)
+    return Review.from_row(dict(row))
+
+
+def _own_review(conn, review_id: str, user_id: str):
+    # Locked, so concurrent edits of one review cannot both apply their delta to the old rating
+    row = conn.execute(f"SELECT * FROM reviews WHERE id = ?{backend.for_update}", (review_id,)).fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Review not found")
+    if row["customer_id"] != user_id:
+        raise HTTPException(status_code=403, detail="Only the review's author can change it")
+    return row
+
+
+def update_review(review_id: str, user_id: str, update: ReviewUpdate) -> Review:
+    """Change a review's rating and/or comment; only the rating difference touches the aggregates"""
+    with transaction() as conn:
+        old = _own_review(conn, review_id, user_id)
+        rating = update.rating if update.rating is not None else old["rating"]
+        comment = update.comment if "comment" in update.model_fields_set else old["comment"]
+        row = conn.execute(
+            "UPDATE reviews SET rating = ?, comment = ?, updated_at = ? WHERE id = ? RETURNING *",
+            (rating, comment, datetime.utcnow(), review_id)
+        ).fetchone()
+        if rating != old["rating"]:
+            adjust_rating(conn, old["provider_id"], rating - old["rating"], 0)
+
+    invalidate_provider(old["provider_id"])
+    return Review.from_row(dict(row))
+
+
+def delete_review(review_id: str, user_id: str):
+    with transaction() as conn:
+        old = _own_review(conn, review_id, user_id)
+        conn.execute("DELETE FROM reviews WHERE id = ?", (review_id,))
+        adjust_rating(conn, old["provider_id"], -old["rating"], -1)
+
+    invalidate_provider(old["provider_id"])
+    logger.info("Review %s deleted", review_id)
+
+
+def list_provider_reviews(provider_id: str, limit: Optional[int] = 20, cursor: Optional[str] = None) -> List[Review]:
+    """A provider's reviews, newest first, with keyset pagination"""
+    condition, params = keyset_filter(cursor)
+    query = "SELECT * FROM reviews WHERE provider_id = ?"
+    if condition:
+        query += f" AND {condition}"
+    query += f" {keyset_order()} LIMIT ?"
+    return [Review.from_row(row) for row in execute_query(query, (provider_id, *params, limit))]
@@ -24,6 +24,16 @@ class UserInDB(UserBase):
     updated_at: datetime
     is_active: bool = True
 
+    @classmethod
+    def from_row(cls, row: dict) -> "UserInDB":
+        """Build from a users row without validation, like ProviderInDB.from_row"""
+        return cls.model_construct(**{
+            **row,
+            "is_active": bool(row["is_active"]),
+            "created_at": datetime.fromisoformat(row["created_at"]),
+            "updated_at": datetime.fromisoformat(row["updated_at"]),
+        })
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -1,34 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from datetime import timedelta
-from typing import List
+from typing import List, Optional
 from .models import UserCreate, UserUpdate, UserInDB
+from ..pagination import next_cursor, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from ..responses import model_response
 from .service import (
     create_user,
     get_user_by_email,
     update_user,
     delete_user,
     list_users,
-    verify_password,
-    get_password_hash,
     create_access_token,
     ACCESS_TOKEN_EXPIRE_MINUTES,
     get_user_by_id,
-    verify_token
+    update_password_hash,
+    authenticate_token
 )
+from ..utils import get_password_hash_async, verify_and_update_password_async
+from database import run_db
 
 router = APIRouter(tags=["users"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 def get_current_user(token: str = Depends(oauth2_scheme)):
-    token_data = verify_token(token)
-    if not token_data or token_data.get("user_type") != "customer":
+    token_data, user = authenticate_token(token)
+    if not token_data:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user = get_user_by_email(token_data.get("sub"))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -37,18 +39,18 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
     return user
 
 @router.post("/register", response_model=dict)
-def register_customer(user: UserCreate):
+async def register_customer(user: UserCreate):
     """Register a new customer"""
     # Check if user already exists
-    if get_user_by_email(user.email):
+    if await run_db(get_user_by_email, user.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
     # Create new user
-    user.password = get_password_hash(user.password)
-    create_user(user)
+    user.password = await get_password_hash_async(user.password)
+    await run_db(create_user, user)
     
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -60,15 +62,21 @@ def register_customer(user: UserCreate):
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/login", response_model=dict)
-def login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     """Login for customers"""
-    user = get_user_by_email(form_data.username)
-    if not user or not verify_password(form_data.password, user["password"]):
+    user = await run_db(get_user_by_email, form_data.username)
+    verified, new_hash = False, None
+    if user:
+        verified, new_hash = await verify_and_update_password_async(form_data.password, user["password"])
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        # Stored hash used a different bcrypt cost; upgrade it transparently
+        await run_db(update_password_hash, user["id"], new_hash)
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -77,6 +85,11 @@ def login(form_data: OAuth2PasswordRequestForm = Depends()):
     )
     return {"access_token": access_token, "token_type": "bearer", "user_id": user["id"]}
 
+@router.get("/me", response_model=UserInDB)
+def get_me(user: dict = Depends(get_current_user)):
+    # Declared before /{user_id} so "me" is not taken for an ID
+    return user
+
 @router.get("/{user_id}", response_model=UserInDB)
 def get_user_details(user_id: str):
     """Get user details by ID"""
@@ -86,18 +99,20 @@ def get_user_details(user_id: str):
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    return user
+    return model_response(UserInDB, UserInDB.from_row(user))
 
 @router.put("/{user_id}", response_model=UserInDB)
-def update_user_details(user_id: str, user_update: UserUpdate):
+async def update_user_details(user_id: str, user_update: UserUpdate):
     """Update user details by ID"""
-    user = get_user_by_id(user_id)
+    user = await run_db(get_user_by_id, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    updated_user = update_user(user_id, user_update)
+    if user_update.password:
+        user_update.password = await get_password_hash_async(user_update.password)
+    updated_user = await run_db(update_user, user_id, user_update)
     if not updated_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -122,24 +137,13 @@ def delete_user_account(user_id: str):
         )
 
 @router.get("/", response_model=List[UserInDB])
-def get_all_users(skip: int = 0, limit: int = 100):
-    """List all users"""
-    return list_users(skip=skip, limit=limit)
-
-@router.get("/me", response_model=UserInDB)
-def get_me(request: Request, token: str = Depends(oauth2_scheme)):
-    payload = verify_token(token)
-    if not payload or payload.get("user_type") != "customer":
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    user_email = payload.get("sub")
-    user = get_user_by_email(user_email)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    return user 
\ No newline at end of file
+def get_all_users(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """List all users, newest first; the next page's cursor is returned in X-Next-Cursor"""
+    users = list_users(skip=skip, limit=limit, cursor=cursor)
+    page_cursor = next_cursor(users, limit)
+    headers = {NEXT_CURSOR_HEADER: page_cursor} if page_cursor else None
+    return model_response(List[UserInDB], users, headers=headers)
@@ -1,10 +1,14 @@
 from datetime import datetime, timedelta
+import time
 import uuid
-from typing import Optional, List
+from typing import Optional, List, Tuple
+from fastapi import HTTPException
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from .models import UserCreate, UserUpdate, UserInDB
-from database import execute_query, execute_query_one
+from database import IntegrityError, execute_query, execute_query_one
+from ..utils import verify_password, get_password_hash
+from ..pagination import keyset_filter, keyset_order
+from ..cache import TTLCache, ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL
 from dotenv import load_dotenv
 import os
 load_dotenv()
@@ -14,13 +18,26 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Verified-token cache bounds; an entry never outlives its token's exp claim
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", str(ACCESS_TOKEN_EXPIRE_MINUTES * 60)))
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+# Read-through cache: user ID -> user row, and email -> user ID.
+# Writes invalidate by ID; email hits are re-checked against the cached user's email.
+_user_cache = TTLCache("users", maxsize=ENTITY_CACHE_SIZE, ttl=ENTITY_CACHE_TTL)
+_user_email_cache = TTLCache("user_emails", maxsize=ENTITY_CACHE_SIZE, ttl=ENTITY_CACHE_TTL)
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+# Bearer token -> (claims, user row) for tokens that verified and resolved to a customer
+_token_cache = TTLCache("tokens", maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+
+def _cache_user(user: dict) -> dict:
+    _user_cache.set(user["id"], user)
+    _user_email_cache.set(user["email"], user["id"])
+    return dict(user)
+
+def invalidate_user(user_id: str):
+    _user_cache.invalidate(user_id)
+    _token_cache.invalidate_where(lambda entry: entry[1]["id"] == user_id)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -39,11 +56,38 @@ def verify_token(token: str) -> Optional[dict]:
     except JWTError:
         return None
 
+def authenticate_token(token: str) -> Tuple[Optional[dict], Optional[dict]]:
+    """Verified claims and the customer they name; (None, None) for an invalid token.
+
+    Hits skip both the signature check and the user lookup.
+    """
+    entry = _token_cache.get(token)
+    if entry is not None:
+        claims, user = entry
+        return claims, dict(user)
+    claims = verify_token(token)
+    if not claims or claims.get("user_type") != "customer":
+        return None, None
+    user = get_user_by_email(claims.get("sub"))
+    if user and "exp" in claims:
+        _token_cache.set(token, (claims, dict(user)), ttl=min(claims["exp"] - time.time(), TOKEN_CACHE_TTL))
+    return claims, user
+
 def get_user_by_email(email: str) -> Optional[dict]:
-    return execute_query_one("SELECT * FROM users WHERE email = ?", (email,))
+    user_id = _user_email_cache.get(email)
+    if user_id is not None:
+        user = _user_cache.get(user_id)
+        if user is not None and user["email"] == email:
+            return dict(user)
+    user = execute_query_one("SELECT * FROM users WHERE email = ?", (email,))
+    return _cache_user(user) if user else None
 
 def get_user_by_id(user_id: str) -> Optional[dict]:
-    return execute_query_one("SELECT * FROM users WHERE id = ?", (user_id,))
+    user = _user_cache.get(user_id)
+    if user is not None:
+        return dict(user)
+    user = execute_query_one("SELECT * FROM users WHERE id = ?", (user_id,))
+    return _cache_user(user) if user else None
 
 def create_user(user: UserCreate) -> UserInDB:
     query = """
@@ -59,7 +103,7 @@ def create_user(user: UserCreate) -> UserInDB:
     )
     if not result:
         raise Exception("User creation failed: No result returned from database. Check for constraint violations or DB triggers.")
-    return UserInDB(**result)
+    return UserInDB.from_row(result)
 
 def update_user(user_id: str, user_data: UserUpdate) -> Optional[dict]:
     user = get_user_by_id(user_id)
@@ -78,19 +122,38 @@ def update_user(user_id: str, user_data: UserUpdate) -> Optional[dict]:
     
     # Execute update
     execute_query(query, (*update_data.values(), user_id))
+    invalidate_user(user_id)
     
     return get_user_by_id(user_id)
 
+def update_password_hash(user_id: str, password_hash: str):
+    """Store a re-hashed password (e.g. after the bcrypt cost changed)"""
+    execute_query(
+        "UPDATE users SET password = ?, updated_at = ? WHERE id = ?",
+        (password_hash, datetime.utcnow(), user_id)
+    )
+    invalidate_user(user_id)
+
 def delete_user(user_id: str) -> bool:
     user = get_user_by_id(user_id)
     if not user:
         return False
     
-    execute_query("DELETE FROM users WHERE id = ?", (user_id,))
+    try:
+        execute_query("DELETE FROM users WHERE id = ?", (user_id,))
+    except IntegrityError:
+        # bookings.customer_id still references the user
+        raise HTTPException(status_code=409, detail="User has bookings and cannot be deleted")
+    invalidate_user(user_id)
     return True
 
-def list_users(skip: int = 0, limit: int = 100) -> List[UserInDB]:
-    """List all users with pagination"""
-    query = "SELECT * FROM users ORDER BY created_at DESC LIMIT ? OFFSET ?"
-    results = execute_query(query, (limit, skip))
-    return [UserInDB(**row) for row in results] 
\ No newline at end of file
+def list_users(skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[UserInDB]:
+    """List all users with pagination (offset via skip, or keyset via cursor)"""
+    if cursor:
+        condition, params = keyset_filter(cursor)
+        query = f"SELECT * FROM users WHERE {condition} {keyset_order()} LIMIT ?"
+        results = execute_query(query, (*params, limit))
+    else:
+        query = f"SELECT * FROM users {keyset_order()} LIMIT ? OFFSET ?"
+        results = execute_query(query, (limit, skip))
+    return [UserInDB.from_row(row) for row in results]
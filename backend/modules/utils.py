@@ -1,6 +1,129 @@
+import asyncio
+import hmac
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+from dotenv import load_dotenv
+from fastapi import Header, HTTPException, status
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+load_dotenv()
+
+# Password hashing configuration
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_POOL_SIZE = int(os.getenv("PASSWORD_POOL_SIZE", str(os.cpu_count() or 2)))
+# Hash/verify jobs allowed in flight (running + queued) before new ones are rejected with 503
+PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", str(PASSWORD_POOL_SIZE * 4)))
+
+# Shared secret for the admin endpoints, sent as X-Admin-Key; they are disabled while unset
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "")
+
+# Pinning min/max rounds to the configured cost makes verify_and_update() return a fresh
+# hash for any password stored with a different cost, so hashes migrate on login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def _hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    try:
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    except ValueError:
+        # Not a recognizable hash (e.g. a legacy plaintext value): treat as a mismatch
+        return False, None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # bcrypt holds the GIL for the whole hash; separate processes let it use every core
+            # without tying up the threads that serve other requests. "spawn" avoids forking
+            # a process that already runs threads.
+            _executor = ProcessPoolExecutor(
+                max_workers=PASSWORD_POOL_SIZE,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def _release_slot(_future):
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+def _submit(fn, *args):
+    global _pending
+    with _pending_lock:
+        if _pending >= PASSWORD_MAX_PENDING:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent password operations, please retry",
+                headers={"Retry-After": "1"},
+            )
+        _pending += 1
+    try:
+        future = _get_executor().submit(fn, *args)
+    except Exception:
+        _release_slot(None)
+        raise
+    future.add_done_callback(_release_slot)
+    return future
+
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password) 
\ No newline at end of file
+    return _submit(_hash_password, password).result()
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return _submit(_verify_and_update, plain_password, hashed_password).result()[0]
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Returns (matches, new_hash); new_hash is set when the stored hash used another cost"""
+    return _submit(_verify_and_update, plain_password, hashed_password).result()
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await asyncio.wrap_future(_submit(_hash_password, password))
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await asyncio.wrap_future(_submit(_verify_and_update, plain_password, hashed_password))
+
+
+def password_pool_stats():
+    with _pending_lock:
+        return {"workers": PASSWORD_POOL_SIZE, "pending": _pending, "max_pending": PASSWORD_MAX_PENDING, "bcrypt_rounds": BCRYPT_ROUNDS}
+
+
+def shutdown_password_pool():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+def require_admin(x_admin_key: Optional[str] = Header(None)):
+    """Route dependency admitting only requests that carry the admin API key"""
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin API is disabled")
+    if not x_admin_key or not hmac.compare_digest(x_admin_key.encode(), ADMIN_API_KEY.encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin key")
@@ -1,48 +0,0 @@
--- Create users table
-CREATE TABLE IF NOT EXISTS users (
-    id UUID PRIMARY KEY,
-    email VARCHAR(255) UNIQUE NOT NULL,
-    full_name VARCHAR(255) NOT NULL,
-    password VARCHAR(255) NOT NULL,
-    phone VARCHAR(20),
-    address TEXT,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    is_active BOOLEAN DEFAULT true
-);
-
--- Create providers table
-CREATE TABLE IF NOT EXISTS providers (
-    id UUID PRIMARY KEY,
-    email VARCHAR(255) UNIQUE NOT NULL,
-    full_name VARCHAR(255) NOT NULL,
-    password VARCHAR(255) NOT NULL,
-    phone VARCHAR(20),
-    business_name VARCHAR(255),
-    service_type VARCHAR(50),
-    hourly_rate DECIMAL(10,2),
-    location VARCHAR(255),
-    working_hours VARCHAR(100),
-    rating DECIMAL(3,2) DEFAULT 0.0,
-    reviews_count INTEGER DEFAULT 0,
-    is_verified BOOLEAN DEFAULT false,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    is_active BOOLEAN DEFAULT true
-);
-
--- Create bookings table
-CREATE TABLE IF NOT EXISTS bookings (
-    id UUID PRIMARY KEY,
-    user_id UUID NOT NULL REFERENCES users(id),
-    provider_id UUID NOT NULL REFERENCES providers(id),
-    date VARCHAR(50) NOT NULL,
-    time VARCHAR(50) NOT NULL,
-    location VARCHAR(255) NOT NULL,
-    description TEXT,
-    status VARCHAR(20) DEFAULT 'pending',
-    images TEXT[],  -- Array of image URLs
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    CONSTRAINT valid_status CHECK (status IN ('pending', 'accepted', 'rejected', 'completed'))
-); 
\ No newline at end of file
@@ -0,0 +1,260 @@
+"""Fixtures running every test once on SQLite and once on PostgreSQL.
+
+database picks its backend from DATABASE_URL when it is imported, so the backend
+fixture re-imports the application modules for each backend. Tests therefore
+import application code inside the test body (or use the fixtures), never at
+module level.
+
+PostgreSQL comes from TEST_DATABASE_URL or the libpq PG* variables (a scratch
+database is created on that server and dropped afterwards), or is spawned in a
+temporary directory with the initdb / pg_ctl found on PG_BIN or PATH. When one of
+those is configured but does not work, the postgres runs fail. Only when none is
+configured are they skipped, and the end of the run says so.
+"""
+import importlib
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import uuid
+from urllib.parse import urlsplit, urlunsplit
+
+import pytest
+from passlib.hash import bcrypt
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ.update({
+    "SECRET_KEY": "test-secret",
+    "BCRYPT_ROUNDS": "4",
+    "AUTO_MIGRATE": "false",
+    "LOG_LEVEL": "WARNING",
+    "ADMIN_API_KEY": "test-admin-key",
+    "UPLOAD_MAX_FILE_BYTES": str(64 * 1024),
+    "UPLOAD_MAX_REQUEST_BYTES": str(160 * 1024),
+    "UPLOAD_CHUNK_SIZE": str(16 * 1024),
+})
+
+# Accounts made by the fixtures log in with PASSWORD; the hash uses the cost BCRYPT_ROUNDS sets
+PASSWORD = "secret"
+PASSWORD_HASH = bcrypt.using(rounds=4).hash(PASSWORD)
+# libpq connection variables; any of them (or TEST_DATABASE_URL) points the tests at a server
+LIBPQ_ENV = ("PGHOST", "PGPORT", "PGUSER", "PGDATABASE", "PGSERVICE")
+
+# Child tables first, so plain DELETEs never trip a foreign key
+TABLES = ("reviews", "booking_slots", "bookings", "provider_hours", "provider_booking_stats", "providers", "users")
+
+
+_postgres_skipped = []
+
+
+def _postgres_unavailable(reason: str, configured: bool):
+    """Fail when PostgreSQL was configured; otherwise skip, reported at the end of the run"""
+    if configured:
+        pytest.fail(f"PostgreSQL is configured but unusable: {reason}", pytrace=False)
+    _postgres_skipped.append(reason)
+    pytest.skip(reason)
+
+
+def pytest_terminal_summary(terminalreporter):
+    if _postgres_skipped:
+        terminalreporter.write_sep("=", "PostgreSQL backend NOT tested", yellow=True, bold=True)
+        terminalreporter.write_line(f"Every postgres run was skipped: {_postgres_skipped[0]}")
+        terminalreporter.write_line(
+            "Set TEST_DATABASE_URL (or PGHOST etc.), or put initdb and pg_ctl on PG_BIN/PATH, to run them."
+        )
+
+
+def _forget_app_modules():
+    for name in list(sys.modules):
+        if name in ("database", "main") or name == "modules" or name.startswith("modules."):
+            del sys.modules[name]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _scratch_database(url: str):
+    """Create a throwaway database on the TEST_DATABASE_URL server; yields its URL"""
+    import psycopg2
+
+    name = f"marketplace_test_{uuid.uuid4().hex[:12]}"
+    try:
+        admin = psycopg2.connect(url)
+    except psycopg2.Error as e:
+        _postgres_unavailable(f"cannot connect to {url}: {str(e).strip()}", configured=True)
+    admin.autocommit = True
+    try:
+        admin.cursor().execute(f'CREATE DATABASE "{name}"')
+        parts = urlsplit(url)
+        yield urlunsplit(parts._replace(path=f"/{name}"))
+        admin.cursor().execute(f'DROP DATABASE IF EXISTS "{name}"')
+    finally:
+        admin.close()
+
+
+def _spawned_server(tmp_path_factory):
+    """Start a private PostgreSQL cluster for the session; yields its URL"""
+    search_path = os.getenv("PG_BIN") or os.getenv("PATH")
+    initdb = shutil.which("initdb", path=search_path)
+    pg_ctl = shutil.which("pg_ctl", path=search_path)
+    if not (initdb and pg_ctl):
+        _postgres_unavailable(
+            f"initdb/pg_ctl not found on {'PG_BIN' if os.getenv('PG_BIN') else 'PATH'}",
+            configured=bool(os.getenv("PG_BIN")),
+        )
+
+    root = tmp_path_factory.mktemp("postgres")
+    data_dir = root / "data"
+    init = subprocess.run(
+        [initdb, "-D", str(data_dir), "-U", "postgres", "--auth=trust", "-E", "UTF8", "--no-sync"],
+        capture_output=True, text=True,
+    )
+    if init.returncode:
+        output = (init.stderr or init.stdout).strip().splitlines() or ["no output"]
+        _postgres_unavailable(f"{initdb} failed: {output[-1]}", configured=True)
+
+    port = _free_port()
+    options = f"-p {port} -k {root} -c listen_addresses=127.0.0.1 -F"
+    start = subprocess.run(
+        [pg_ctl, "-D", str(data_dir), "-o", options, "-l", str(root / "server.log"), "-w", "start"],
+        capture_output=True, text=True,
+    )
+    if start.returncode:
+        _postgres_unavailable(f"PostgreSQL did not start, see {root / 'server.log'}", configured=True)
+    try:
+        yield f"postgresql://postgres@127.0.0.1:{port}/postgres"
+    finally:
+        subprocess.run([pg_ctl, "-D", str(data_dir), "-m", "fast", "-w", "stop"], capture_output=True)
+
+
+@pytest.fixture(scope="session")
+def postgres_url(tmp_path_factory):
+    # An empty postgresql:// URL makes libpq take everything from the PG* variables
+    url = os.getenv("TEST_DATABASE_URL") or ("postgresql://" if any(map(os.getenv, LIBPQ_ENV)) else None)
+    try:
+        import psycopg2  # noqa: F401
+    except ImportError:
+        _postgres_unavailable("psycopg2 is not installed", configured=bool(url or os.getenv("PG_BIN")))
+    if url:
+        yield from _scratch_database(url)
+    else:
+        yield from _spawned_server(tmp_path_factory)
+
+
+@pytest.fixture(scope="session", params=("sqlite", "postgres"))
+def backend(request, tmp_path_factory):
+    """The database backend under test, with a freshly migrated schema"""
+    if request.param == "postgres":
+        os.environ["DATABASE_URL"] = request.getfixturevalue("postgres_url")
+    else:
+        os.environ["DATABASE_URL"] = ""
+        os.environ["SQLITE_DB_PATH"] = str(tmp_path_factory.mktemp("sqlite") / "test.db")
+    os.environ["UPLOAD_ROOT"] = str(tmp_path_factory.mktemp("uploads"))
+
+    _forget_app_modules()
+    database = importlib.import_module("database")
+    database.migrate()
+    yield database.backend
+
+    database.db_executor.shutdown(wait=True)
+    database.pool.close()
+    sys.modules["modules.utils"].shutdown_password_pool()
+    if "modules.media.images" in sys.modules:
+        sys.modules["modules.media.images"].shutdown_image_pool()
+    _forget_app_modules()
+
+
+def _empty_tables(database):
+    from modules.cache import _caches
+
+    with database.transaction() as conn:
+        if database.backend.name == "postgresql":
+            conn.execute(f"TRUNCATE {', '.join(TABLES)}")
+        else:
+            for table in TABLES:
+                conn.execute(f"DELETE FROM {table}")
+    for cache in _caches:
+        cache.clear()
+
+
+@pytest.fixture
+def db(backend):
+    """The database module, with every table emptied, the entity caches cleared and no uploaded files"""
+    import database
+
+    _empty_tables(database)
+    for entry in os.scandir(os.environ["UPLOAD_ROOT"]):
+        if entry.is_dir():
+            shutil.rmtree(entry.path)
+        else:
+            os.unlink(entry.path)
+    return database
+
+
+@pytest.fixture
+def empty_tables(db):
+    """Empty every table again in the middle of a test (e.g. between an export and its re-import)"""
+    return lambda: _empty_tables(db)
+
+
+@pytest.fixture
+def client(db):
+    from fastapi.testclient import TestClient
+    import main
+
+    # Not entered as a context manager: the shutdown handlers would close the pool the session shares
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def admin_headers():
+    return {"X-Admin-Key": os.environ["ADMIN_API_KEY"]}
+
+
+@pytest.fixture
+def make_user(db):
+    from modules.users.models import UserCreate
+    from modules.users.service import create_user
+
+    def make(email=None, password_hash=PASSWORD_HASH):
+        user = create_user(UserCreate(email=email or f"{uuid.uuid4().hex[:8]}@example.com", full_name="Test User", password=password_hash))
+        return user.id
+
+    return make
+
+
+@pytest.fixture
+def provider_headers(db):
+    """Authorization headers carrying a provider's bearer token"""
+    from modules.users.service import create_access_token
+
+    def headers(provider_id):
+        token = create_access_token({"sub": f"{provider_id}@example.com", "user_type": "provider", "provider_id": provider_id})
+        return {"Authorization": f"Bearer {token}"}
+
+    return headers
+
+
+@pytest.fixture
+def make_provider(db):
+    from modules.providers.models import BusinessDetails, ProviderCreate
+    from modules.providers.service import create_provider, update_business_details
+
+    def make(business_name="Sparkle Cleaning", service_type="Cleaning", location="Lahore", working_hours="24/7", hourly_rate=20.0):
+        provider = create_provider(ProviderCreate(email=f"{uuid.uuid4().hex[:8]}@example.com", full_name="Test Provider", password=PASSWORD_HASH))
+        update_business_details(provider.id, BusinessDetails(
+            business_name=business_name,
+            service_type=service_type,
+            hourly_rate=hourly_rate,
+            location=location,
+            working_hours=working_hours,
+        ))
+        return provider.id
+
+    return make
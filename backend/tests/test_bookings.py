@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+
+MONDAY = "2030-01-07"
+SATURDAY = "2030-01-12"
+
+
+def _book(client, user_id, provider_id, time, date=MONDAY, duration=60):
+    return client.post("/api/me/bookings", data={
+        "provider_id": provider_id,
+        "user_id": user_id,
+        "date": date,
+        "time": time,
+        "location": "Home",
+        "duration_minutes": duration,
+    })
+
+
+def test_overlapping_bookings_conflict(client, make_user, make_provider):
+    user_id, provider_id, other_provider = make_user(), make_provider(), make_provider()
+
+    assert _book(client, user_id, provider_id, "10:00").status_code == 200
+    assert _book(client, user_id, provider_id, "10:00").status_code == 409
+    assert _book(client, user_id, provider_id, "10:30").status_code == 409
+    assert _book(client, user_id, provider_id, "09:30").status_code == 409
+    assert _book(client, user_id, provider_id, "11:00").status_code == 200
+    assert _book(client, user_id, provider_id, "09:00").status_code == 200
+    assert _book(client, user_id, other_provider, "10:00").status_code == 200
+
+
+def test_cancelling_frees_the_slot(client, make_user, make_provider):
+    user_id, provider_id = make_user(), make_provider()
+    booking_id = _book(client, user_id, provider_id, "10:00").json()["id"]
+
+    response = client.patch(f"/api/me/bookings/{booking_id}/status", params={"status": "cancelled"})
+    assert response.status_code == 200
+    assert _book(client, user_id, provider_id, "10:30").status_code == 200
+
+
+def test_working_hours_and_unknown_parties(client, make_user, make_provider):
+    user_id = make_user()
+    provider_id = make_provider(working_hours="Mon-Fri 9am-5pm")
+
+    assert _book(client, user_id, provider_id, "10:00", date=SATURDAY).status_code == 409
+    assert _book(client, user_id, provider_id, "16:30").status_code == 409
+    assert _book(client, user_id, provider_id, "16:00").status_code == 200
+    assert _book(client, "nobody", provider_id, "10:00").status_code == 404
+    assert _book(client, user_id, "nobody", "10:00").status_code == 404
+
+
+def test_concurrent_overlapping_bookings_admit_one(db, make_user, make_provider):
+    from fastapi import HTTPException
+    from modules.bookings.models import BookingCreate
+    from modules.bookings.service import BookingService
+
+    user_id, provider_id = make_user(), make_provider()
+    service = BookingService()
+
+    async def attempt(minute):
+        data = BookingCreate(date=MONDAY, time=f"10:{minute:02d}", location="Home", duration_minutes=60)
+        try:
+            return await service.create_booking(data, user_id=user_id, provider_id=provider_id)
+        except HTTPException as e:
+            return e.status_code
+
+    async def race():
+        return await asyncio.gather(*(attempt(minute) for minute in range(0, 40, 5)))
+
+    outcomes = asyncio.run(race())
+    assert sum(1 for outcome in outcomes if outcome != 409) == 1
+    assert db.execute_query_one("SELECT COUNT(*) AS n FROM booking_slots") == {"n": 1}
+
+
+def test_active_slot_unique_index_backs_up_the_check(db, client, make_user, make_provider):
+    user_id, provider_id = make_user(), make_provider()
+    _book(client, user_id, provider_id, "10:00")
+
+    with pytest.raises(db.IntegrityError) as excinfo:
+        db.execute_query(
+            "INSERT INTO bookings (id, customer_id, provider_id, service_date, service_time, location, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            ("dup", user_id, provider_id, MONDAY, "10:00", "Home", "2030-01-01", "2030-01-01")
+        )
+    assert db.is_unique_violation(excinfo.value)
+
+
+def test_bulk_status_change_is_one_transaction(db, client, make_user, make_provider):
+    from modules.bookings.service import BookingService
+
+    user_id, provider_id = make_user(), make_provider()
+    ids = [_book(client, user_id, provider_id, f"{hour}:00").json()["id"] for hour in (9, 10, 11)]
+    client.patch(f"/api/me/bookings/{ids[0]}/status", params={"status": "cancelled"})
+
+    result = BookingService().bulk_update_status("confirmed", ids=[*ids, "missing"])
+    assert result["updated"] == 2
+    assert [r["outcome"] for r in result["results"]] == ["invalid_transition", "updated", "updated", "not_found"]
+
+    # A failure inside the transaction leaves every booking as it was
+    with pytest.raises(RuntimeError):
+        with db.transaction() as conn:
+            BookingService()._transition(conn, ids, "completed")
+            raise RuntimeError("abort")
+    statuses = db.execute_query("SELECT status FROM bookings ORDER BY service_time")
+    assert [row["status"] for row in statuses] == ["cancelled", "confirmed", "confirmed"]
+
+
+def test_bulk_status_change_needs_the_provider_or_an_admin(client, admin_headers, make_user, make_provider, provider_headers):
+    user_id, provider_id, other_provider = make_user(), make_provider(), make_provider()
+    own = _book(client, user_id, provider_id, "10:00").json()["id"]
+    foreign = _book(client, user_id, other_provider, "10:00").json()["id"]
+    by_ids = {"status": "confirmed", "ids": [own, foreign]}
+    by_filter = {"status": "cancelled", "filter": {"provider_id": other_provider}}
+
+    assert client.patch("/api/me/bookings/status", json=by_ids).status_code == 401
+    assert client.patch("/api/me/bookings/status", json=by_filter).status_code == 401
+    assert client.patch("/api/me/bookings/status", json=by_filter, headers={"X-Admin-Key": "wrong"}).status_code == 401
+
+    headers = provider_headers(provider_id)
+    assert client.patch("/api/me/bookings/status", json=by_ids, headers=headers).status_code == 403
+    assert client.patch("/api/me/bookings/status", json=by_filter, headers=headers).status_code == 403
+    own_only = client.patch("/api/me/bookings/status", json={"status": "confirmed", "ids": [own, "missing"]}, headers=headers)
+    assert [r["outcome"] for r in own_only.json()["results"]] == ["updated", "not_found"]
+
+    admin = client.patch("/api/me/bookings/status", json=by_filter, headers=admin_headers)
+    assert admin.status_code == 200 and admin.json()["updated"] == 1
+
+
+def test_listing_pages_and_streams(client, make_user, make_provider):
+    user_id, provider_id = make_user(), make_provider()
+    for hour in (9, 10, 11):
+        _book(client, user_id, provider_id, f"{hour}:00")
+
+    first = client.get("/api/me/bookings/all", params={"limit": 2})
+    second = client.get("/api/me/bookings/all", params={"limit": 2, "cursor": first.headers["x-next-cursor"]})
+    assert len(first.json()) == 2 and len(second.json()) == 1
+    assert "x-next-cursor" not in second.headers
+
+    streamed = client.get("/api/me/bookings/all", params={"stream": "true"})
+    assert streamed.headers["content-type"] == "application/x-ndjson"
+    assert len(streamed.text.splitlines()) == 3
+    assert client.get("/api/me/bookings/all", params={"stream": "true", "cursor": "!"}).status_code == 400
+    assert client.get("/api/me/bookings/all", params={"limit": 0}).status_code == 422
@@ -0,0 +1,156 @@
+import pytest
+
+
+def test_placeholders_translate_to_pyformat(backend):
+    from database import _to_pyformat
+
+    assert _to_pyformat("SELECT * FROM t WHERE a = ? AND b = ?") == "SELECT * FROM t WHERE a = %s AND b = %s"
+    assert _to_pyformat("UPDATE t SET a = :a WHERE id = :id") == "UPDATE t SET a = %(a)s WHERE id = %(id)s"
+    assert _to_pyformat("SELECT a::text, 10 % 3 FROM t") == "SELECT a::text, 10 %% 3 FROM t"
+
+
+def test_placeholders_inside_literals_and_comments_are_left_alone(backend):
+    from database import _to_pyformat
+
+    query = "SELECT '?', ':x', \"a?\" -- ? :y\nFROM t WHERE a LIKE 'x%' AND b = ?"
+    assert _to_pyformat(query) == "SELECT '?', ':x', \"a?\" -- ? :y\nFROM t WHERE a LIKE 'x%%' AND b = %s"
+
+
+def test_positional_and_named_parameters(db):
+    with db.get_db_connection() as conn:
+        row = conn.execute("SELECT ? AS n, ? AS s", (1, "it's 100% ?")).fetchone()
+        assert (row["n"], row["s"]) == (1, "it's 100% ?")
+        row = conn.execute("SELECT :a AS a, :a || '%?' AS b", {"a": "x"}).fetchone()
+        assert (row[0], row[1]) == ("x", "x%?")
+
+
+def test_literal_percent_with_and_without_parameters(db):
+    assert db.execute_query("SELECT 'a%b' AS v") == [{"v": "a%b"}]
+    assert db.execute_query_one("SELECT 'a%b' AS v, ? AS w", ("c%d",)) == {"v": "a%b", "w": "c%d"}
+
+
+def test_rows_read_by_index_and_name(db, make_user):
+    user_id = make_user("rows@example.com")
+    with db.get_db_connection() as conn:
+        row = conn.execute("SELECT id, email FROM users WHERE id = ?", (user_id,)).fetchone()
+    assert row[0] == row["id"] == user_id
+    assert list(row.keys()) == ["id", "email"]
+    assert dict(row) == {"id": user_id, "email": "rows@example.com"}
+
+
+def test_statement_without_result_set_fetches_nothing(db, make_user):
+    user_id = make_user()
+    with db.get_db_connection() as conn:
+        cur = conn.execute("UPDATE users SET full_name = ? WHERE id = ?", ("Renamed", user_id))
+        assert cur.fetchone() is None
+        assert cur.fetchall() == []
+
+
+def test_transaction_commits_on_success(db):
+    with db.transaction() as conn:
+        conn.execute(
+            "INSERT INTO users (id, email, full_name, password, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            ("u1", "commit@example.com", "C", "x", "2030-01-01 00:00:00", "2030-01-01 00:00:00")
+        )
+    assert db.execute_query_one("SELECT email FROM users WHERE id = ?", ("u1",)) == {"email": "commit@example.com"}
+
+
+def test_transaction_rolls_back_on_error(db):
+    with pytest.raises(RuntimeError):
+        with db.transaction() as conn:
+            conn.execute(
+                "INSERT INTO users (id, email, full_name, password, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                ("u1", "rollback@example.com", "R", "x", "2030-01-01 00:00:00", "2030-01-01 00:00:00")
+            )
+            raise RuntimeError("abort")
+    assert db.execute_query("SELECT id FROM users") == []
+
+
+def test_unique_violation_is_an_integrity_error(db, make_user):
+    make_user("dup@example.com")
+    with pytest.raises(db.IntegrityError) as excinfo:
+        make_user("dup@example.com")
+    assert db.is_unique_violation(excinfo.value)
+    # The failed statement's connection went back to the pool clean
+    assert db.execute_query_one("SELECT COUNT(*) AS n FROM users") == {"n": 1}
+
+
+def test_other_constraint_errors_are_not_unique_violations(db, make_user, make_provider):
+    user_id, provider_id = make_user(), make_provider()
+    with pytest.raises(db.IntegrityError) as excinfo:
+        db.execute_query(
+            "INSERT INTO bookings (id, customer_id, provider_id, service_date, service_time, location, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ("b1", user_id, provider_id, "2030-01-01", "10:00", "x", "lost", "2030-01-01", "2030-01-01")
+        )
+    assert not db.is_unique_violation(excinfo.value)
+
+
+def test_executemany_and_streaming(db):
+    rows = [(f"u{i}", f"user{i}@example.com", "U", "x", f"2030-01-01 00:00:0{i}", "2030-01-01 00:00:00") for i in range(5)]
+    with db.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO users (id, email, full_name, password, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)", rows
+        )
+    streamed = list(db.iter_query("SELECT id FROM users WHERE email LIKE ? ORDER BY created_at", ("user%",), chunk_size=2))
+    assert streamed == [{"id": f"u{i}"} for i in range(5)]
+
+
+def test_postgres_streams_through_a_named_cursor(db):
+    if db.backend.name != "postgresql":
+        pytest.skip("server-side cursors are PostgreSQL only")
+    rows = [(f"u{i}", f"user{i}@example.com", "U", "x", "2030-01-01 00:00:00", "2030-01-01 00:00:00") for i in range(5)]
+    with db.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO users (id, email, full_name, password, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)", rows
+        )
+
+    stream = db.iter_query("SELECT id FROM users ORDER BY id", chunk_size=2)
+    assert next(stream) == {"id": "u0"}
+    # The streaming connection is busy with FETCHes from a server-side cursor, not one big SELECT
+    activity = db.execute_query(
+        "SELECT query FROM pg_stat_activity WHERE datname = current_database() AND pid <> pg_backend_pid()"
+    )
+    assert any(row["query"].startswith("FETCH FORWARD 2 FROM \"stream_") for row in activity)
+    assert [row["id"] for row in stream] == ["u1", "u2", "u3", "u4"]
+
+
+def test_row_locks_match_the_backend(backend):
+    expected = {"sqlite": "", "postgresql": " FOR NO KEY UPDATE"}
+    assert backend.for_update == expected[backend.name]
+
+
+# Column names per table; both backends' migrations must agree on them
+SCHEMA = {
+    "users": {"created_at", "email", "full_name", "id", "is_active", "password", "updated_at"},
+    "providers": {
+        "business_name", "created_at", "email", "full_name", "hourly_rate", "id", "image", "is_active", "is_verified",
+        "latitude", "location", "longitude", "password", "phone", "profile_photo", "rating", "rating_score",
+        "rating_sum", "reviews_count", "sa_back_id", "sa_front_id", "service_type", "updated_at", "working_hours",
+    },
+    "bookings": {
+        "created_at", "customer_id", "duration_minutes", "id", "images", "location", "notes", "provider_id",
+        "service_date", "service_time", "status", "updated_at",
+    },
+    "booking_slots": {"booking_id", "end_at", "provider_id", "start_at"},
+    "provider_hours": {"end_minute", "provider_id", "start_minute", "weekday"},
+    "reviews": {"booking_id", "comment", "created_at", "customer_id", "id", "provider_id", "rating", "updated_at"},
+    "provider_booking_stats": {"bookings", "minutes", "month", "provider_id", "status"},
+}
+
+
+@pytest.mark.parametrize("table", sorted(SCHEMA))
+def test_migrated_schema_is_the_same_on_both_backends(db, table):
+    if db.backend.name == "postgresql":
+        rows = db.execute_query(
+            "SELECT column_name AS name FROM information_schema.columns WHERE table_schema = current_schema() AND table_name = ?",
+            (table,)
+        )
+    else:
+        with db.get_db_connection() as conn:
+            rows = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    columns = {row["name"] for row in rows}
+    # The full-text search column only exists where search is not an FTS5 side table
+    if table == "providers" and db.backend.name == "postgresql":
+        columns.discard("search_vector")
+    assert columns == SCHEMA[table]
@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import os
+import time
+from email.utils import formatdate
+
+import pytest
+
+MONDAY = "2030-01-07"
+
+
+def _book_with_images(client, user_id, provider_id, files, time="10:00"):
+    return client.post(
+        "/api/me/bookings",
+        data={"provider_id": provider_id, "user_id": user_id, "date": MONDAY, "time": time, "location": "Home"},
+        files=[("images", (name, content, "text/plain")) for name, content in files],
+    )
+
+
+def _stored_path(url):
+    from modules.media.storage import STORAGE_ROOT, relpath_for_url
+
+    return os.path.join(STORAGE_ROOT, relpath_for_url(url))
+
+
+def _multipart(boundary, provider_id, user_id, payload):
+    fields = {"provider_id": provider_id, "user_id": user_id, "date": MONDAY, "time": "10:00", "location": "Home"}
+    parts = [
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in fields.items()
+    ]
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="images"; filename="big.txt"\r\n'
+        f"Content-Type: text/plain\r\n\r\n".encode() + payload + b"\r\n"
+    )
+    return b"".join(parts) + f"--{boundary}--\r\n".encode()
+
+
+def test_uploads_are_stored_once_under_their_hash(client, make_user, make_provider):
+    user_id, provider_id = make_user(), make_provider()
+    content = b"same bytes"
+    first = _book_with_images(client, user_id, provider_id, [("a.txt", content)], time="09:00").json()
+    second = _book_with_images(client, user_id, provider_id, [("../../etc/b.TXT", content)], time="11:00").json()
+
+    digest = hashlib.sha256(content).hexdigest()
+    assert first["images"] == second["images"] == [f"/uploaded_images/{digest[:2]}/{digest[2:4]}/{digest}.txt"]
+    with open(_stored_path(first["images"][0]), "rb") as f:
+        assert f.read() == content
+
+
+def test_upload_size_limits(client, make_user, make_provider):
+    from modules.media.storage import STORAGE_TMP_DIR
+    from modules.media.uploads import UPLOAD_MAX_FILE_BYTES, UPLOAD_MAX_REQUEST_BYTES
+
+    user_id, provider_id = make_user(), make_provider()
+    too_big = _book_with_images(client, user_id, provider_id, [("big.txt", b"x" * (UPLOAD_MAX_FILE_BYTES + 1))])
+    assert too_big.status_code == 413
+
+    # Each file is under the per-file limit, together they pass the request limit
+    count = UPLOAD_MAX_REQUEST_BYTES // UPLOAD_MAX_FILE_BYTES + 1
+    files = [(f"{i}.txt", bytes([i]) * UPLOAD_MAX_FILE_BYTES) for i in range(count)]
+    assert _book_with_images(client, user_id, provider_id, files).status_code == 413
+
+    assert _book_with_images(client, user_id, provider_id, [("ok.txt", b"x" * UPLOAD_MAX_FILE_BYTES)]).status_code == 200
+    # Rejected uploads leave no temporary files behind
+    assert os.listdir(STORAGE_TMP_DIR) == []
+
+
+def test_request_limit_cuts_off_a_body_without_content_length(db, make_user, make_provider):
+    import main
+    from modules.media.uploads import UPLOAD_MAX_REQUEST_BYTES
+
+    user_id, provider_id = make_user(), make_provider()
+    boundary = "testboundary"
+    body = _multipart(boundary, provider_id, user_id, b"x" * (UPLOAD_MAX_REQUEST_BYTES * 3))
+    chunk_size = 4096
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+    received, sent, received_before_response = [], [], []
+
+    async def receive():
+        # Yield like a socket read would, so the response is not held up by the remaining body
+        await asyncio.sleep(0)
+        if len(received) < len(chunks):
+            received.append(chunks[len(received)])
+            return {"type": "http.request", "body": received[-1], "more_body": len(received) < len(chunks)}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            received_before_response.append(sum(map(len, received)))
+        sent.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": "/api/me/bookings", "raw_path": b"/api/me/bookings", "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"content-type", f"multipart/form-data; boundary={boundary}".encode())],
+        "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }
+    asyncio.run(asyncio.wait_for(main.app(scope, receive, send), timeout=30))
+
+    assert sent[0]["type"] == "http.response.start" and sent[0]["status"] == 413
+    # The request was rejected once the limit was passed, not after the whole body was spooled
+    assert received_before_response[0] <= UPLOAD_MAX_REQUEST_BYTES + chunk_size < len(body)
+
+
+def test_garbage_collector_keeps_referenced_and_recent_files(db, client, make_user, make_provider):
+    from modules.media.storage import STORAGE_TMP_DIR, collect_garbage
+
+    user_id, provider_id = make_user(), make_provider()
+    kept = _book_with_images(client, user_id, provider_id, [("kept.txt", b"kept")], time="09:00").json()
+    dropped = _book_with_images(client, user_id, provider_id, [("dropped.txt", b"dropped")], time="11:00").json()
+    db.execute_query("DELETE FROM bookings WHERE id = ?", (dropped["id"],))
+    os.makedirs(STORAGE_TMP_DIR, exist_ok=True)
+    abandoned = os.path.join(STORAGE_TMP_DIR, ".upload-abandoned.part")
+    open(abandoned, "wb").close()
+
+    # Within the grace period nothing is removed: the row may not be committed yet
+    assert collect_garbage(grace_seconds=3600)["removed"] == 0
+
+    stats = collect_garbage(grace_seconds=-1, dry_run=True)
+    assert (stats["removed"], stats["temp_removed"]) == (1, 1)
+    assert os.path.exists(_stored_path(dropped["images"][0]))
+
+    stats = collect_garbage(grace_seconds=-1)
+    assert (stats["referenced"], stats["removed"], stats["temp_removed"]) == (1, 1, 1)
+    assert os.path.exists(_stored_path(kept["images"][0]))
+    assert not os.path.exists(_stored_path(dropped["images"][0]))
+    assert not os.path.exists(abandoned)
+
+
+@pytest.fixture
+def stored_file(db):
+    """(url, content) of a content-addressed file in the upload store"""
+    from modules.media.storage import STORAGE_ROOT, blob_relpath, url_for
+
+    content = b"0123456789" * 10
+    relpath = blob_relpath(hashlib.sha256(content).hexdigest(), ".txt")
+    path = os.path.join(STORAGE_ROOT, relpath)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+    return url_for(relpath), content
+
+
+def test_hashed_files_are_immutable_with_a_content_etag(client, stored_file):
+    url, content = stored_file
+    digest = hashlib.sha256(content).hexdigest()
+
+    response = client.get(url)
+    assert response.status_code == 200 and response.content == content
+    assert response.headers["etag"] == f'"{digest}"'
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+
+    assert client.get(url, headers={"If-None-Match": f'W/"{digest}"'}).status_code == 304
+    assert client.get(url, headers={"If-None-Match": '"other"'}).status_code == 200
+    last_modified = response.headers["last-modified"]
+    assert client.get(url, headers={"If-Modified-Since": last_modified}).status_code == 304
+
+
+def test_single_byte_ranges(client, stored_file):
+    url, content = stored_file
+
+    response = client.get(url, headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206 and response.content == content[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(content)}"
+
+    assert client.get(url, headers={"Range": "bytes=-5"}).content == content[-5:]
+    unsatisfiable = client.get(url, headers={"Range": f"bytes={len(content)}-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"bytes */{len(content)}"
+
+    # A stale If-Range gets the whole file
+    stale = client.get(url, headers={"Range": "bytes=0-1", "If-Range": '"stale"'})
+    assert stale.status_code == 200 and stale.content == content
+
+
+def test_legacy_files_and_missing_derivatives(client, stored_file):
+    from modules.media.storage import STORAGE_ROOT
+
+    legacy = os.path.join(STORAGE_ROOT, "legacy.txt")
+    with open(legacy, "wb") as f:
+        f.write(b"legacy")
+    response = client.get("/uploaded_images/legacy.txt")
+    assert response.headers["cache-control"] == "public, no-cache"
+    assert client.get("/uploaded_images/legacy.txt", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+    old = formatdate(time.time() - 3600, usegmt=True)
+    assert client.get("/uploaded_images/legacy.txt", headers={"If-Modified-Since": old}).status_code == 200
+
+    # A derivative the worker has not written yet falls back to its original, briefly cached
+    url, content = stored_file
+    fallback = client.get(url.replace(".txt", "-thumb.webp"))
+    assert fallback.status_code == 200 and fallback.content == content
+    assert fallback.headers["cache-control"] == "public, max-age=60"
+
+    assert client.get("/uploaded_images/.tmp/anything").status_code == 404
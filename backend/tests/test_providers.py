@@ -0,0 +1,103 @@
+def _names(providers):
+    return [provider.business_name for provider in providers]
+
+
+def test_search_matches_word_prefixes(db, make_provider):
+    from modules.providers.service import search_providers
+
+    make_provider("Sparkle Cleaning", "Cleaning", "Lahore")
+    make_provider("Quick Plumbing", "Plumbing", "Karachi")
+
+    assert _names(search_providers(q="sparkle")) == ["Sparkle Cleaning"]
+    assert _names(search_providers(q="spark")) == ["Sparkle Cleaning"]
+    assert _names(search_providers(q="plumb karachi")) == ["Quick Plumbing"]
+    assert search_providers(q="plumb lahore") == []
+
+
+def test_search_ranks_business_name_above_location(db, make_provider):
+    from modules.providers.service import search_providers
+
+    make_provider("Sparkle Cleaning", "Cleaning", "Lahore")
+    make_provider("Lahore Movers", "Painting", "Karachi")
+
+    assert _names(search_providers(q="lahore")) == ["Lahore Movers", "Sparkle Cleaning"]
+
+
+def test_search_input_is_not_query_syntax(db, make_provider):
+    from modules.providers.service import search_providers
+
+    make_provider("Sparkle Cleaning")
+    assert _names(search_providers(q='"spark* -(:')) == ["Sparkle Cleaning"]
+
+
+def test_search_filters_and_skips_inactive(db, make_provider):
+    from modules.providers.service import search_providers
+
+    cleaner = make_provider("Sparkle Cleaning", "Cleaning", hourly_rate=20)
+    make_provider("Shine Cleaning", "Cleaning", hourly_rate=50)
+    make_provider("Quick Plumbing", "Plumbing")
+    db.execute_query("UPDATE providers SET is_active = ? WHERE id = ?", (False, cleaner))
+
+    assert _names(search_providers(q="cleaning")) == ["Shine Cleaning"]
+    assert _names(search_providers(service_type="Cleaning")) == ["Shine Cleaning"]
+    assert search_providers(service_type="Cleaning", max_rate=30) == []
+
+
+def test_search_follows_updates(db, make_provider):
+    from modules.providers.models import ProviderUpdate
+    from modules.providers.service import search_providers, update_provider
+
+    provider_id = make_provider("Sparkle Cleaning")
+    update_provider(provider_id, ProviderUpdate(business_name="Glitter Services"))
+
+    assert search_providers(q="sparkle") == []
+    assert _names(search_providers(q="glitter")) == ["Glitter Services"]
+
+
+def test_nearby_orders_by_distance_within_radius(db, make_provider):
+    from modules.providers.service import find_nearby_providers
+
+    make_provider("Lahore Co", location="Lahore")
+    make_provider("Islamabad Co", location="Islamabad")
+    make_provider("Karachi Co", location="Karachi")
+
+    nearby = find_nearby_providers(31.52, 74.36, 50)
+    assert [(p.business_name, d < 1) for p, d in nearby] == [("Lahore Co", True)]
+
+    nearby = find_nearby_providers(31.52, 74.36, 1500)
+    assert _names(p for p, _ in nearby) == ["Lahore Co", "Islamabad Co", "Karachi Co"]
+    distances = [d for _, d in nearby]
+    assert distances == sorted(distances)
+    assert 250 < distances[1] < 300
+
+    assert _names(p for p, _ in find_nearby_providers(31.52, 74.36, 1500, limit=2)) == ["Lahore Co", "Islamabad Co"]
+
+
+def test_nearby_filters_and_follows_moves(db, make_provider):
+    from modules.providers.models import BusinessDetails
+    from modules.providers.service import find_nearby_providers, update_business_details
+
+    cleaner = make_provider("Mobile Cleaning", "Cleaning", location="Karachi")
+    make_provider("Lahore Plumbing", "Plumbing", location="Lahore")
+
+    assert find_nearby_providers(31.52, 74.36, 50, service_type="Cleaning") == []
+
+    update_business_details(cleaner, BusinessDetails(
+        business_name="Mobile Cleaning", service_type="Cleaning", hourly_rate=20, location="31.53, 74.35", working_hours="24/7"
+    ))
+    assert _names(p for p, _ in find_nearby_providers(31.52, 74.36, 50, service_type="Cleaning")) == ["Mobile Cleaning"]
+    assert find_nearby_providers(24.86, 67.0, 50) == []
+
+
+def test_listings_page_with_bounded_limits(client, make_user, make_provider):
+    for _ in range(3):
+        make_provider()
+        make_user()
+
+    for path in ("/api/providers/", "/api/users/"):
+        first = client.get(path, params={"limit": 2})
+        second = client.get(path, params={"limit": 2, "cursor": first.headers["x-next-cursor"]})
+        assert len(first.json()) == 2 and len(second.json()) == 1
+        assert "x-next-cursor" not in second.headers
+        for params in ({"limit": 0}, {"limit": -1}, {"limit": 1001}, {"skip": -1}):
+            assert client.get(path, params=params).status_code == 422
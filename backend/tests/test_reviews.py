@@ -0,0 +1,63 @@
+import pytest
+
+
+@pytest.fixture
+def completed_booking(client, make_user, make_provider):
+    """(customer token headers, booking id, provider id) for a completed booking"""
+    from modules.users.service import create_access_token
+
+    email = "reviewer@example.com"
+    user_id, provider_id = make_user(email), make_provider()
+    booking_id = client.post("/api/me/bookings", data={
+        "provider_id": provider_id, "user_id": user_id, "date": "2030-01-07", "time": "10:00", "location": "Home"
+    }).json()["id"]
+    for status in ("confirmed", "completed"):
+        client.patch(f"/api/me/bookings/{booking_id}/status", params={"status": status})
+    token = create_access_token({"sub": email, "user_type": "customer"})
+    return {"Authorization": f"Bearer {token}"}, booking_id, provider_id
+
+
+def _other_customer(make_user):
+    from modules.users.service import create_access_token
+
+    make_user("other@example.com")
+    return {"Authorization": f"Bearer {create_access_token({'sub': 'other@example.com', 'user_type': 'customer'})}"}
+
+
+def test_only_the_customer_reviews_with_their_token(client, make_user, completed_booking):
+    headers, booking_id, _ = completed_booking
+
+    assert client.post(f"/api/me/bookings/{booking_id}/review", json={"rating": 5}).status_code == 401
+    assert client.post(f"/api/me/bookings/{booking_id}/review", json={"rating": 5}, headers=_other_customer(make_user)).status_code == 403
+    assert client.post(f"/api/me/bookings/{booking_id}/review", json={"rating": 5}, headers=headers).status_code == 200
+    assert client.post(f"/api/me/bookings/{booking_id}/review", json={"rating": 4}, headers=headers).status_code == 409
+
+
+def test_only_the_author_edits_or_deletes(client, make_user, completed_booking):
+    headers, booking_id, _ = completed_booking
+    review_id = client.post(f"/api/me/bookings/{booking_id}/review", json={"rating": 5}, headers=headers).json()["id"]
+    other = _other_customer(make_user)
+
+    assert client.patch(f"/api/reviews/{review_id}", json={"rating": 1}).status_code == 401
+    assert client.patch(f"/api/reviews/{review_id}", json={"rating": 1}, headers=other).status_code == 403
+    assert client.delete(f"/api/reviews/{review_id}", headers=other).status_code == 403
+    assert client.patch(f"/api/reviews/{review_id}", json={"rating": 3}, headers=headers).json()["rating"] == 3
+    assert client.delete(f"/api/reviews/{review_id}", headers=headers).status_code == 204
+
+
+def test_review_writes_keep_provider_aggregates(db, client, completed_booking):
+    from modules.providers.service import get_provider
+    from modules.reviews.ratings import bayesian_score
+
+    headers, booking_id, provider_id = completed_booking
+    review_id = client.post(f"/api/me/bookings/{booking_id}/review", json={"rating": 5}, headers=headers).json()["id"]
+    provider = get_provider(provider_id)
+    assert (provider.rating, provider.reviews_count) == (5, 1)
+    assert provider.rating_score == pytest.approx(bayesian_score(5, 1))
+
+    client.patch(f"/api/reviews/{review_id}", json={"rating": 2}, headers=headers)
+    assert get_provider(provider_id).rating == 2
+
+    client.delete(f"/api/reviews/{review_id}", headers=headers)
+    provider = get_provider(provider_id)
+    assert (provider.rating, provider.reviews_count, provider.rating_score) == (0, 0, pytest.approx(bayesian_score(0, 0)))
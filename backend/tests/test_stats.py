@@ -0,0 +1,86 @@
+def _insert_booking(db, booking_id, user_id, provider_id, service_date, status="pending", duration=60):
+    db.execute_query(
+        "INSERT INTO bookings (id, customer_id, provider_id, service_date, service_time, duration_minutes, location, status, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (booking_id, user_id, provider_id, service_date, "10:00", duration, "Home", status, "2030-01-01", "2030-01-01")
+    )
+
+
+def _verify(db):
+    from modules.bookings.stats import verify_stats
+
+    with db.get_db_connection() as conn:
+        return verify_stats(conn)
+
+
+def test_triggers_follow_inserts_updates_and_deletes(db, make_user, make_provider):
+    from modules.bookings.stats import get_provider_stats
+
+    user_id, provider_id = make_user(), make_provider()
+    _insert_booking(db, "b1", user_id, provider_id, "2030-01-07", duration=90)
+    _insert_booking(db, "b2", user_id, provider_id, "2030-01-20")
+    _insert_booking(db, "b3", user_id, provider_id, "2030-02-03", status="confirmed")
+
+    stats = get_provider_stats(provider_id)
+    assert stats["bookings"] == 3
+    assert stats["by_status"] == {"pending": 2, "confirmed": 1, "completed": 0, "cancelled": 0}
+    assert [(m["month"], m["bookings"]) for m in stats["by_month"]] == [("2030-01", 2), ("2030-02", 1)]
+
+    db.execute_query("UPDATE bookings SET status = ? WHERE id = ?", ("completed", "b1"))
+    db.execute_query("UPDATE bookings SET service_date = ? WHERE id = ?", ("2030-02-10", "b2"))
+    db.execute_query("DELETE FROM bookings WHERE id = ?", ("b3",))
+
+    stats = get_provider_stats(provider_id)
+    assert stats["by_status"] == {"pending": 1, "confirmed": 0, "completed": 1, "cancelled": 0}
+    assert stats["completed_hours"] == 1.5
+    assert [(m["month"], m["by_status"]["pending"]) for m in stats["by_month"]] == [("2030-01", 0), ("2030-02", 1)]
+    # Emptied (provider, month, status) rows are removed rather than left at zero
+    assert db.execute_query_one("SELECT COUNT(*) AS n FROM provider_booking_stats WHERE bookings = 0") == {"n": 0}
+    assert _verify(db) == (0, [])
+
+
+def test_month_ranges_and_undated_bookings(db, make_user, make_provider):
+    from modules.bookings.stats import get_provider_stats
+
+    user_id, provider_id = make_user(), make_provider()
+    _insert_booking(db, "b1", user_id, provider_id, "2030-01-07")
+    _insert_booking(db, "b2", user_id, provider_id, "2030-03-07")
+    _insert_booking(db, "b3", user_id, provider_id, "next tuesday")
+
+    assert [m["month"] for m in get_provider_stats(provider_id)["by_month"]] == [None, "2030-01", "2030-03"]
+    ranged = get_provider_stats(provider_id, from_month="2030-02", to_month="2030-12")
+    assert (ranged["bookings"], [m["month"] for m in ranged["by_month"]]) == (1, ["2030-03"])
+    assert _verify(db) == (0, [])
+
+
+def test_stats_follow_the_booking_api(client, make_user, make_provider, provider_headers):
+    from modules.bookings.stats import get_provider_stats
+
+    user_id, provider_id = make_user(), make_provider()
+    booking = client.post("/api/me/bookings", data={
+        "provider_id": provider_id, "user_id": user_id, "date": "2030-01-07", "time": "10:00", "location": "Home"
+    }).json()
+    client.patch("/api/me/bookings/status", json={"status": "confirmed", "ids": [booking["id"]]}, headers=provider_headers(provider_id))
+
+    response = client.get(f"/api/providers/{provider_id}/stats")
+    assert response.status_code == 200
+    assert response.json()["by_status"]["confirmed"] == 1
+    assert get_provider_stats(provider_id)["by_status"]["pending"] == 0
+
+
+def test_verify_and_rebuild_repair_drift(db, make_user, make_provider):
+    from modules.bookings.stats import rebuild_stats
+
+    user_id, provider_id = make_user(), make_provider()
+    _insert_booking(db, "b1", user_id, provider_id, "2030-01-07")
+    _insert_booking(db, "b2", user_id, provider_id, "2030-01-08", status="cancelled")
+    db.execute_query("UPDATE provider_booking_stats SET bookings = 5 WHERE status = ?", ("pending",))
+    db.execute_query("DELETE FROM provider_booking_stats WHERE status = ?", ("cancelled",))
+
+    differing, sample = _verify(db)
+    assert differing == 3
+    assert {(row[2], row[3], row[5]) for row in sample} == {("pending", 1, "bookings"), ("pending", 5, "stats"), ("cancelled", 1, "bookings")}
+
+    with db.transaction() as conn:
+        assert rebuild_stats(conn) == 2
+    assert _verify(db) == (0, [])
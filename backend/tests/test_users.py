@@ -0,0 +1,108 @@
+import pytest
+from passlib.hash import bcrypt
+
+from conftest import PASSWORD
+
+
+def _login(client, path, email, password=PASSWORD):
+    return client.post(path, data={"username": email, "password": password})
+
+
+def _column(db, table, row_id, column):
+    return db.execute_query_one(f"SELECT {column} FROM {table} WHERE id = ?", (row_id,))[column]
+
+
+def test_entity_caches_serve_reads_until_a_write_invalidates(db, make_user, make_provider):
+    from modules.providers.models import ProviderUpdate
+    from modules.providers.service import get_provider, update_provider
+    from modules.users.models import UserUpdate
+    from modules.users.service import get_user_by_id, update_user
+
+    user_id, provider_id = make_user(), make_provider("Sparkle Cleaning")
+    assert get_user_by_id(user_id)["full_name"] == "Test User"
+    assert get_provider(provider_id).business_name == "Sparkle Cleaning"
+
+    # A write behind the services' back is not seen while the entries live...
+    db.execute_query("UPDATE users SET full_name = ? WHERE id = ?", ("Changed In SQL", user_id))
+    db.execute_query("UPDATE providers SET business_name = ? WHERE id = ?", ("Changed In SQL", provider_id))
+    assert get_user_by_id(user_id)["full_name"] == "Test User"
+    assert get_provider(provider_id).business_name == "Sparkle Cleaning"
+
+    # ...while writes through the services drop them
+    assert update_user(user_id, UserUpdate(email="renamed@example.com"))["full_name"] == "Changed In SQL"
+    assert update_provider(provider_id, ProviderUpdate(phone="123")).business_name == "Changed In SQL"
+
+
+def test_cached_reads_are_copies(db, make_user):
+    from modules.users.service import get_user_by_id
+
+    user_id = make_user()
+    get_user_by_id(user_id)["full_name"] = "Mutated"
+    assert get_user_by_id(user_id)["full_name"] == "Test User"
+
+
+def test_token_cache_follows_updates_and_deletes(client, db, make_user):
+    user_id = make_user()
+    token = _login(client, "/api/users/login", _column(db, "users", user_id, "email")).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/users/me", headers=headers).json()["full_name"] == "Test User"
+
+    db.execute_query("UPDATE users SET full_name = ? WHERE id = ?", ("Changed In SQL", user_id))
+    assert client.get("/api/users/me", headers=headers).json()["full_name"] == "Test User"
+
+    assert client.put(f"/api/users/{user_id}", json={"full_name": "Renamed"}).status_code == 200
+    assert client.get("/api/users/me", headers=headers).json()["full_name"] == "Renamed"
+
+    assert client.delete(f"/api/users/{user_id}").status_code == 204
+    assert client.get("/api/users/me", headers=headers).status_code == 404
+    assert client.get("/api/users/me", headers={"Authorization": "Bearer not-a-token"}).status_code == 401
+
+
+def test_password_change_is_hashed_and_logs_in(client, db, make_user):
+    user_id = make_user()
+    email = _column(db, "users", user_id, "email")
+
+    response = client.put(f"/api/users/{user_id}", json={"password": "new-secret"})
+    assert response.status_code == 200 and "password" not in response.json()
+    stored = _column(db, "users", user_id, "password")
+    assert stored.startswith("$2b$04$") and bcrypt.verify("new-secret", stored)
+
+    assert _login(client, "/api/users/login", email).status_code == 401
+    assert _login(client, "/api/users/login", email, "new-secret").status_code == 200
+
+
+def test_full_password_pool_answers_503(client, monkeypatch):
+    import modules.utils as utils
+
+    monkeypatch.setattr(utils, "_pending", utils.PASSWORD_MAX_PENDING)
+    response = client.post("/api/users/register", json={"email": "busy@example.com", "full_name": "Busy", "password": "pw"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+    monkeypatch.undo()
+    response = client.post("/api/users/register", json={"email": "busy@example.com", "full_name": "Busy", "password": "pw"})
+    assert response.status_code == 200
+    # Every slot taken by the successful request was handed back
+    assert utils.password_pool_stats()["pending"] == 0
+
+
+@pytest.mark.parametrize("table", ["users", "providers"])
+def test_login_rehashes_passwords_stored_with_another_cost(client, db, table):
+    from modules.providers.models import ProviderCreate
+    from modules.providers.service import create_provider
+    from modules.users.models import UserCreate
+    from modules.users.service import create_user
+
+    model, create = (UserCreate, create_user) if table == "users" else (ProviderCreate, create_provider)
+    old_hash = bcrypt.using(rounds=5).hash(PASSWORD)
+    account = create(model(email=f"{table}@example.com", full_name="Old Hash", password=old_hash))
+
+    assert _login(client, f"/api/{table}/login", account.email, "wrong").status_code == 401
+    assert _column(db, table, account.id, "password") == old_hash
+
+    assert _login(client, f"/api/{table}/login", account.email).status_code == 200
+    new_hash = _column(db, table, account.id, "password")
+    assert new_hash.startswith("$2b$04$") and bcrypt.verify(PASSWORD, new_hash)
+    # The upgraded hash keeps working, and is not rewritten again
+    assert _login(client, f"/api/{table}/login", account.email).status_code == 200
+    assert _column(db, table, account.id, "password") == new_hash